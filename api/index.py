@@ -2,12 +2,16 @@
 # -*- coding: utf-8 -*-
 """
 Email Classifier API para Vercel
-Função serverless adaptada do Flask app
+Função serverless adaptada do Flask app; também roda como servidor HTTP/1.1
+com keep-alive e uma thread por conexão (python api/index.py)
 """
 
 import sys
 import os
-from http.server import BaseHTTPRequestHandler
+import io
+import signal
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
 import logging
 from urllib.parse import parse_qs, urlparse
@@ -16,8 +20,13 @@ from urllib.parse import parse_qs, urlparse
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 try:
-    from classifier import EmailClassifier
+    from classifier import DETAIL_LEVELS, DETAIL_NONE, EmailClassifier
     from response_generator import ResponseGenerator
+    from single_flight import content_hash
+    from compression import (
+        COMPRESSION_MIN_SIZE, BodyTooLarge, UnsupportedEncoding,
+        choose_encoding, compress_body, decompress_stream
+    )
 except ImportError as e:
     print(f"Erro ao importar módulos: {e}")
 
@@ -25,16 +34,139 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tamanho máximo do corpo (descomprimido) das requisições
+MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
+
+# Tempo que uma conexão keep-alive ociosa mantém sua thread (segundos)
+KEEPALIVE_TIMEOUT = float(os.getenv('KEEPALIVE_TIMEOUT', '15'))
+
 # Inicializar classificador e gerador de respostas
 try:
     classifier = EmailClassifier()
-    response_generator = ResponseGenerator()
+    response_generator = ResponseGenerator(
+        deterministic=os.getenv('DETERMINISTIC_RESPONSES', 'True').lower() == 'true'
+    )
 except Exception as e:
     logger.error(f"Erro ao inicializar modelos: {e}")
     classifier = None
     response_generator = None
 
+class RequestBodyError(Exception):
+    """Corpo da requisição inválido, com o status HTTP correspondente"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
 class EmailClassifierHandler(BaseHTTPRequestHandler):
+    """
+    Handler da API
+
+    Fala HTTP/1.1: a conexão continua aberta entre requisições (keep-alive)
+    e toda resposta tem Content-Length. Cada resposta (linha de status,
+    cabeçalhos e corpo) sai do buffer de escrita numa única gravação.
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    # wfile com buffer: send_response/end_headers/write acumulam e o
+    # http.server descarrega uma vez ao fim de cada requisição
+    wbufsize = io.DEFAULT_BUFFER_SIZE
+    # Respostas pequenas em conexões persistentes não esperam o algoritmo de Nagle
+    disable_nagle_algorithm = True
+    timeout = KEEPALIVE_TIMEOUT
+    
+    def parse_request(self):
+        """Preparar o estado por requisição (a instância atende a conexão inteira)"""
+        self.body_pending = False
+        if not super().parse_request():
+            return False
+        try:
+            self.body_pending = int(self.headers.get('Content-Length') or 0) > 0
+        except ValueError:
+            self.body_pending = True
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            # Corpo chunked não é lido: a conexão é encerrada após a resposta
+            self.body_pending = True
+        return True
+    
+    def handle_expect_100(self):
+        """Enviar o 100 Continue já: com o buffer, o cliente esperaria pelo corpo da resposta"""
+        if not super().handle_expect_100():
+            return False
+        self.wfile.flush()
+        return True
+    
+    def read_body(self):
+        """Ler o corpo da requisição, descomprimindo gzip/brotli com limite de tamanho"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise RequestBodyError(400, 'Content-Length inválido')
+        if content_length > MAX_CONTENT_LENGTH:
+            raise RequestBodyError(413, 'Arquivo muito grande. Tamanho máximo: 10MB')
+        
+        encoding = self.headers.get('Content-Encoding', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            body = self.rfile.read(content_length)
+            self.body_pending = False
+            return body
+        
+        try:
+            body = decompress_stream(self.rfile, encoding, MAX_CONTENT_LENGTH, content_length)
+            self.body_pending = False
+            return body
+        except BodyTooLarge:
+            raise RequestBodyError(413, 'Arquivo muito grande. Tamanho máximo: 10MB')
+        except UnsupportedEncoding as e:
+            raise RequestBodyError(415, str(e))
+        except ValueError as e:
+            raise RequestBodyError(400, str(e))
+    
+    def requested_detail(self):
+        """Nível de detalhamento pedido via ?detail=none|summary|full (padrão: none)"""
+        query = parse_qs(urlparse(self.path).query)
+        detail = query.get('detail', [DETAIL_NONE])[0].lower()
+        if detail not in DETAIL_LEVELS:
+            raise RequestBodyError(400, f"Parâmetro detail inválido. Use: {', '.join(DETAIL_LEVELS)}")
+        return detail
+    
+    def send_body(self, status, body=b'', headers=None):
+        """
+        Escrever a resposta completa no buffer de saída
+        
+        Único ponto de escrita: cabeçalhos comuns, Content-Length e, se o
+        corpo da requisição não foi lido, Connection: close (o restante
+        dele corromperia a próxima requisição da conexão).
+        """
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            # 304 não tem corpo (nem o Content-Length da resposta completa)
+            self.send_header('Content-Length', str(len(body)))
+        if self.body_pending:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def etag_matches(self, etag):
+        """Se o If-None-Match da requisição inclui a ETag (comparação fraca)"""
+        values = self.headers.get('If-None-Match', '')
+        return any(value.strip() in ('*', etag, f'W/{etag}') for value in values.split(','))
+    
+    def send_json(self, status, payload, headers=None):
+        """Enviar resposta JSON, comprimida conforme o Accept-Encoding"""
+        body = json.dumps(payload).encode()
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'))
+        
+        response_headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+        if encoding and len(body) >= COMPRESSION_MIN_SIZE:
+            body = compress_body(body, encoding)
+            response_headers['Content-Encoding'] = encoding
+        response_headers.update(headers or {})
+        self.send_body(status, body, response_headers)
+    
     def do_GET(self):
         """Handler para requisições GET"""
         parsed_url = urlparse(self.path)
@@ -45,9 +177,7 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
         elif path == '/api/models':
             self.handle_models_info()
         else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Endpoint não encontrado'}).encode())
+            self.send_json(404, {'error': 'Endpoint não encontrado'})
     
     def do_POST(self):
         """Handler para requisições POST"""
@@ -59,9 +189,7 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
         elif path == '/api/analyze-batch':
             self.handle_analyze_batch()
         else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Endpoint não encontrado'}).encode())
+            self.send_json(404, {'error': 'Endpoint não encontrado'})
     
     def handle_health_check(self):
         """Verificação de saúde da API"""
@@ -78,11 +206,7 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                 'version': '1.0.0'
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
             
         except Exception as e:
             logger.error(f"Erro no health check: {str(e)}")
@@ -91,11 +215,7 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                 'error': str(e),
                 'timestamp': '2024-01-01T00:00:00Z'
             }
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(500, response)
     
     def handle_models_info(self):
         """Informações sobre os modelos de IA utilizados"""
@@ -105,55 +225,49 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
             else:
                 models_info = {'error': 'Modelos não carregados'}
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(models_info).encode())
+            self.send_json(200, models_info)
             
         except Exception as e:
             logger.error(f"Erro ao obter informações dos modelos: {str(e)}")
             response = {'error': str(e)}
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(500, response)
     
     def handle_analyze_email(self):
         """Análise de email individual"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
+            detail = self.requested_detail()
+            post_data = self.read_body()
             
             if not post_data:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Dados não fornecidos'}).encode())
+                self.send_json(400, {'error': 'Dados não fornecidos'})
                 return
             
             data = json.loads(post_data.decode('utf-8'))
             email_content = data.get('content', '')
             
             if not email_content:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Conteúdo do email não fornecido'}).encode())
+                self.send_json(400, {'error': 'Conteúdo do email não fornecido'})
                 return
             
             # Classificar email
+            headers = {}
             if classifier:
-                classification_result = classifier.classify_email(email_content)
+                if response_generator.deterministic:
+                    # Mesmo conteúdo e mesmo estado aprendido produzem a mesma resposta
+                    etag = content_hash(f"{content_hash(email_content)}:{detail}:{classifier.state_version()}")
+                    headers['ETag'] = f'W/"{etag}"'
+                    if self.etag_matches(f'"{etag}"'):
+                        self.send_body(304, headers=headers)
+                        return
+                
+                classification_result = classifier.classify_email(email_content, detail)
                 
                 # Gerar resposta
                 ai_response = response_generator.generate_response(
                     classification_result['category'],
                     email_content,
-                    classification_result['confidence']
+                    classification_result['confidence'],
+                    context=classification_result.get('context')
                 )
                 
                 response = {
@@ -162,18 +276,18 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                     'confidence': classification_result['confidence'],
                     'response': ai_response
                 }
+                if 'analysis' in classification_result:
+                    response['details'] = classification_result['analysis']
             else:
                 response = {
                     'success': False,
                     'error': 'Modelos não carregados'
                 }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response, headers)
             
+        except RequestBodyError as e:
+            self.send_json(e.status, {'error': str(e)})
         except Exception as e:
             logger.error(f"Erro na análise de email: {str(e)}")
             response = {
@@ -181,35 +295,23 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                 'error': 'Erro interno do servidor',
                 'details': str(e)
             }
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(500, response)
     
     def handle_analyze_batch(self):
         """Análise em lote de múltiplos emails"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
+            detail = self.requested_detail()
+            post_data = self.read_body()
             
             if not post_data:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Dados não fornecidos'}).encode())
+                self.send_json(400, {'error': 'Dados não fornecidos'})
                 return
             
             data = json.loads(post_data.decode('utf-8'))
             emails = data.get('emails', [])
             
             if not isinstance(emails, list) or len(emails) > 50:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Lista inválida ou muito longa. Máximo: 50 emails'}).encode())
+                self.send_json(400, {'error': 'Lista inválida ou muito longa. Máximo: 50 emails'})
                 return
             
             if not classifier:
@@ -217,11 +319,7 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                     'success': False,
                     'error': 'Modelos não carregados'
                 }
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self.send_json(500, response)
                 return
             
             results = []
@@ -240,22 +338,26 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                         continue
                     
                     # Classificar email
-                    classification_result = classifier.classify_email(email_content)
+                    classification_result = classifier.classify_email(email_content, detail)
                     
                     # Gerar resposta
                     ai_response = response_generator.generate_response(
                         classification_result['category'],
                         email_content,
-                        classification_result['confidence']
+                        classification_result['confidence'],
+                        context=classification_result.get('context')
                     )
                     
-                    results.append({
+                    result = {
                         'index': i,
                         'success': True,
                         'category': classification_result['category'],
                         'confidence': classification_result['confidence'],
                         'response': ai_response
-                    })
+                    }
+                    if 'analysis' in classification_result:
+                        result['details'] = classification_result['analysis']
+                    results.append(result)
                     
                 except Exception as e:
                     results.append({
@@ -270,12 +372,10 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                 'results': results
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
             
+        except RequestBodyError as e:
+            self.send_json(e.status, {'error': str(e)})
         except Exception as e:
             logger.error(f"Erro na análise em lote: {str(e)}")
             response = {
@@ -283,19 +383,14 @@ class EmailClassifierHandler(BaseHTTPRequestHandler):
                 'error': 'Erro interno do servidor',
                 'details': str(e)
             }
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(500, response)
     
     def do_OPTIONS(self):
         """Handler para requisições OPTIONS (CORS preflight)"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        self.send_body(200, headers={
+            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type, Content-Encoding, If-None-Match'
+        })
 
 # Função principal para Vercel
 def handler(request, context):
@@ -319,3 +414,40 @@ def handler(request, context):
         'statusCode': handler.response_code if hasattr(handler, 'response_code') else 200,
         'body': handler.response_body if hasattr(handler, 'response_body') else ''
     }
+
+
+class EmailClassifierServer(ThreadingHTTPServer):
+    """Servidor local/contêiner: uma thread por conexão keep-alive"""
+    
+    daemon_threads = True
+    # Não esperar conexões ociosas no encerramento
+    block_on_close = False
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=8000):
+    """Servidor HTTP/1.1 com o handler da API"""
+    return EmailClassifierServer((host, port), EmailClassifierHandler)
+
+
+def main():
+    """Servir a API fora da plataforma serverless"""
+    parser = argparse.ArgumentParser(description='API do classificador em servidor HTTP/1.1 com threads')
+    parser.add_argument('--host', default=os.getenv('HOST', '127.0.0.1'), help='Endereço de escuta')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')), help='Porta')
+    args = parser.parse_args()
+    
+    server = make_server(args.host, args.port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"API em http://{args.host}:{args.port}/api (keep-alive {KEEPALIVE_TIMEOUT:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Admission Control
+Limite de concorrência com fila limitada por classe de requisição e
+rejeição rápida (503 + Retry-After) quando o servidor está saturado
+"""
+
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Peso da última requisição na média móvel do tempo de serviço
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """Requisição rejeitada por saturação, com o Retry-After sugerido"""
+
+    def __init__(self, pool: str, reason: str, retry_after: int):
+        super().__init__(f"{pool}: {reason}")
+        self.pool = pool
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """
+    Vagas de execução de uma classe de requisição
+
+    Até max_concurrent requisições executam ao mesmo tempo; até max_queue
+    aguardam por no máximo queue_timeout segundos. Com a fila cheia, a
+    requisição é rejeitada imediatamente, antes de ler o corpo ou gastar CPU.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        """
+        Args:
+            name: Nome da classe (single/batch/upload)
+            max_concurrent: Requisições executando simultaneamente
+            max_queue: Requisições aguardando vaga
+            queue_timeout: Tempo máximo de espera na fila em segundos
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.max_waiting = 0
+        self.service_time = 0.0
+
+    def _retry_after(self) -> int:
+        """Segundos estimados até haver vaga (fila atual / vazão)"""
+        estimate = self.service_time * (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(estimate))
+
+    def acquire(self):
+        """Obter uma vaga, aguardando na fila até o prazo"""
+        with self._condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return
+
+            if self.waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                raise Overloaded(self.name, 'queue_full', self._retry_after())
+
+            deadline = time.monotonic() + self.queue_timeout
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed_timeout += 1
+                        # Repassar um eventual aviso de vaga ao próximo da fila
+                        self._condition.notify()
+                        raise Overloaded(self.name, 'queue_timeout', self._retry_after())
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+
+    def release(self, service_time: float):
+        """Liberar a vaga e atualizar a média do tempo de serviço"""
+        with self._condition:
+            self.active -= 1
+            self.service_time += SERVICE_TIME_SMOOTHING * (service_time - self.service_time)
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        """Executar o bloco ocupando uma vaga"""
+        self.acquire()
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start_time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores da classe"""
+        with self._condition:
+            return {
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_timeout': self.shed_timeout,
+                'avg_service_time': round(self.service_time, 4)
+            }
+
+
+class AdmissionController:
+    """Conjunto de pools por classe de requisição"""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], queue_timeout: float):
+        """
+        Args:
+            limits: {classe: {'concurrency': n, 'queue': n}}
+            queue_timeout: Tempo máximo de espera na fila em segundos
+        """
+        self.pools = {
+            name: AdmissionPool(name, limit['concurrency'], limit['queue'], queue_timeout)
+            for name, limit in limits.items()
+        }
+
+    def slot(self, name: str):
+        """Vaga na classe informada (context manager)"""
+        return self.pools[name].slot()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores de todas as classes"""
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
@@ -5,13 +5,26 @@ Email Classifier Backend
 Sistema de classificação inteligente de emails usando IA
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response, g
 from flask_cors import CORS
 import os
 import logging
-from werkzeug.utils import secure_filename
-from classifier import EmailClassifier
+from functools import wraps
+from classifier import DETAIL_LEVELS, DETAIL_NONE, DETAIL_SUMMARY, EmailClassifier
 from response_generator import ResponseGenerator
+from single_flight import SingleFlight, content_hash
+from request_parsing import RequestError, parse_batch_emails, parse_email_content, parse_feedback
+from compression import (
+    COMPRESSION_MIN_SIZE, DecompressionMiddleware, choose_encoding, compress_body, decompress_environ
+)
+from admission import AdmissionController, Overloaded
+from history import HistoryStore, sqlite_path_from_url
+from profiling import DEFAULT_DIRECTORY, PROFILE_HEADER, RequestProfiler
+from memory_diagnostics import (
+    DEFAULT_TRACE_FRAMES, AllocationTracer, BatchMemoryStats,
+    classifier_structure_sizes, process_memory
+)
+from datetime import datetime
 import traceback
 
 # Configuração de logging
@@ -29,17 +42,260 @@ app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'txt', 'pdf'}
 
+# Corpos gzip/brotli: validados antes do Flask e descomprimidos (com limite
+# pós-descompressão) só depois do controle de admissão, ver decompress_request
+app.wsgi_app = DecompressionMiddleware(app.wsgi_app, app.config['MAX_CONTENT_LENGTH'])
+
 # Criar pasta de uploads se não existir
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Inicializar classificador e gerador de respostas
 classifier = EmailClassifier()
-response_generator = ResponseGenerator()
+# Respostas determinísticas (mesmo email, mesma resposta) permitem cache HTTP via
+# ETag, com If-None-Match respondido por 304 sem reclassificar
+deterministic_responses = os.getenv('DETERMINISTIC_RESPONSES', 'True').lower() == 'true'
+response_generator = ResponseGenerator(deterministic=deterministic_responses)
 
-def allowed_file(filename):
-    """Verifica se o arquivo tem extensão permitida"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+# Coalescência de análises concorrentes do mesmo conteúdo
+analysis_flight = SingleFlight()
+
+# Controle de admissão: vagas e filas separadas por classe de requisição.
+# A espera na fila é limitada a uma fração do REQUEST_TIMEOUT (mesma
+# variável de Config), deixando o restante do prazo para o processamento.
+request_timeout = int(os.getenv('REQUEST_TIMEOUT', 30))
+admission = AdmissionController(
+    {
+        'single': {'concurrency': int(os.getenv('ADMISSION_SINGLE_CONCURRENCY', 8)),
+                   'queue': int(os.getenv('ADMISSION_SINGLE_QUEUE', 32))},
+        'batch': {'concurrency': int(os.getenv('ADMISSION_BATCH_CONCURRENCY', 2)),
+                  'queue': int(os.getenv('ADMISSION_BATCH_QUEUE', 4))},
+        'upload': {'concurrency': int(os.getenv('ADMISSION_UPLOAD_CONCURRENCY', 4)),
+                   'queue': int(os.getenv('ADMISSION_UPLOAD_QUEUE', 8))}
+    },
+    queue_timeout=request_timeout * float(os.getenv('ADMISSION_QUEUE_FRACTION', 0.5))
+)
+
+def decompress_request():
+    """
+    Descomprimir o corpo com Content-Encoding da requisição atual
+    
+    Returns:
+        Resposta de erro (corpo inválido, truncado ou grande demais) ou None
+    """
+    error = decompress_environ(request.environ)
+    if error is None:
+        return None
+    status, message = error
+    return jsonify({'error': message}), status
+
+def admission_controlled(batch=False):
+    """
+    Executar a rota dentro de uma vaga do controle de admissão
+    
+    A classe é escolhida antes de ler o corpo: uploads multipart, lotes
+    ou análises individuais. Sem vaga nem lugar na fila, responde 503
+    com Retry-After. Corpos comprimidos só são descomprimidos com a vaga
+    obtida.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.mimetype == 'multipart/form-data':
+                pool = 'upload'
+            else:
+                pool = 'batch' if batch else 'single'
+            try:
+                with admission.slot(pool):
+                    return decompress_request() or view(*args, **kwargs)
+            except Overloaded as e:
+                logger.warning(f"Requisição rejeitada por saturação ({e.pool}: {e.reason})")
+                response = jsonify({'error': 'Servidor sobrecarregado. Tente novamente em instantes'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        wrapper.admission_controlled = True
+        return wrapper
+    return decorator
+
+@app.before_request
+def decompress_uncontrolled_request():
+    """Rotas fora do controle de admissão recebem o corpo já descomprimido"""
+    view = app.view_functions.get(request.endpoint)
+    if not getattr(view, 'admission_controlled', False):
+        return decompress_request()
+
+# Histórico das classificações (mesmo DATABASE_URL de Config; SQLite), opcional:
+# grava o conteúdo completo dos emails
+history = None
+if os.getenv('HISTORY_ENABLED', 'False').lower() == 'true':
+    history_path = sqlite_path_from_url(os.getenv('DATABASE_URL', 'sqlite:///email_classifier.db'))
+    if history_path:
+        history = HistoryStore(history_path)
+    else:
+        logger.warning("DATABASE_URL não é SQLite, histórico desativado")
+
+# Perfil de requisições sob demanda (cabeçalho X-Profile e/ou amostragem).
+# Desativado, as rotas não recebem nenhum invólucro.
+profiler = None
+profile_sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+profile_header_enabled = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+if profile_header_enabled or profile_sample_rate > 0:
+    profiler = RequestProfiler(
+        os.getenv('PROFILE_DIR', DEFAULT_DIRECTORY),
+        sample_rate=profile_sample_rate,
+        header_enabled=profile_header_enabled,
+        mode=os.getenv('PROFILE_MODE', 'cprofile')
+    )
+
+def profiled(view):
+    """
+    Perfilar a rota quando pedido; o id do perfil volta em X-Profile-Id
+    
+    Fica dentro do controle de admissão: a espera na fila não entra no perfil.
+    """
+    if profiler is None:
+        return view
+    
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = profiler.requested_mode(request.headers.get(PROFILE_HEADER))
+        if mode is None:
+            return view(*args, **kwargs)
+        profile_id, result = profiler.run(mode, f'{request.method} {request.path}',
+                                          lambda: view(*args, **kwargs))
+        response = make_response(result)
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+    return wrapper
+
+# Diagnóstico de memória: o pico por lote é sempre medido; os endpoints
+# /debug/memory exigem MEMORY_DIAGNOSTICS_ENABLED=True
+memory_diagnostics_enabled = os.getenv('MEMORY_DIAGNOSTICS_ENABLED', 'False').lower() == 'true'
+allocation_tracer = AllocationTracer()
+batch_memory = BatchMemoryStats()
+
+def batch_memory_measured(view):
+    """Registrar o pico de memória da requisição de lote (ver BatchMemoryStats)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with batch_memory.measure() as measurement:
+            response = view(*args, **kwargs)
+            measurement.emails = g.get('batch_emails', 0)
+            measurement.payload_bytes = request.content_length or 0
+        return response
+    return wrapper
+
+def analysis_detail(detail):
+    """
+    Nível de detalhamento calculado
+    
+    Com o histórico ativo, o resultado inclui ao menos o resumo (pontuações,
+    final_score e idioma são gravados); a resposta continua seguindo o
+    detail pedido. Sem histórico, detail=none mantém o caminho rápido.
+    """
+    if history is not None and detail == DETAIL_NONE:
+        return DETAIL_SUMMARY
+    return detail
+
+def run_analysis(email_content, key=None, detail=DETAIL_NONE):
+    """
+    Classificar o email e gerar a resposta automática
+    
+    Requisições concorrentes com o mesmo conteúdo (e o mesmo nível de
+    detalhamento) aguardam uma única execução e compartilham o resultado.
+    """
+    key = key or content_hash(email_content)
+    detail = analysis_detail(detail)
+    
+    def compute():
+        classification_result = classifier.classify_email(email_content, detail)
+        ai_response = response_generator.generate_response(
+            classification_result['category'],
+            email_content,
+            classification_result['confidence'],
+            context=classification_result.get('context')
+        )
+        if history is not None:
+            history.record(key, email_content, classification_result)
+        return classification_result, ai_response
+    
+    return analysis_flight.do(f"{key}:{detail}", compute)
+
+def run_batch_analysis(contents, detail=DETAIL_NONE):
+    """
+    Classificar vários emails e gerar as respostas automáticas
+    
+    Cada email coalesce com execuções em andamento do mesmo conteúdo (as
+    mesmas chaves de run_analysis); os demais são classificados juntos por
+    classify_batch.
+    
+    Returns:
+        ((classificação, resposta), exceção) de cada email, na mesma ordem
+    """
+    detail = analysis_detail(detail)
+    keys = [content_hash(content) for content in contents]
+    
+    def compute(positions):
+        led = [contents[position] for position in positions]
+        outcomes = []
+        for position, email_content, classification_result in zip(
+                positions, led, classifier.classify_batch(led, detail)):
+            try:
+                ai_response = response_generator.generate_response(
+                    classification_result['category'],
+                    email_content,
+                    classification_result['confidence'],
+                    context=classification_result.get('context')
+                )
+            except Exception as e:
+                outcomes.append((None, e))
+                continue
+            if history is not None:
+                history.record(keys[position], email_content, classification_result, 'batch')
+            outcomes.append(((classification_result, ai_response), None))
+        return outcomes
+    
+    return analysis_flight.do_many([f"{key}:{detail}" for key in keys], compute)
+
+def analysis_etag(key, detail):
+    """
+    ETag do resultado: conteúdo, nível de detalhamento e estado aprendido do
+    classificador (reputação e feedback mudam o resultado do mesmo conteúdo)
+    """
+    return content_hash(f"{key}:{detail}:{classifier.state_version()}")
+
+def requested_detail():
+    """
+    Nível de detalhamento pedido via ?detail=none|summary|full
+    
+    Por padrão a resposta é enxuta; a análise detalhada é opcional.
+    """
+    detail = request.args.get('detail', DETAIL_NONE).lower()
+    if detail not in DETAIL_LEVELS:
+        raise RequestError(400, f"Parâmetro detail inválido. Use: {', '.join(DETAIL_LEVELS)}")
+    return detail
+
+@app.after_request
+def compress_response(response):
+    """Comprimir respostas conforme o Accept-Encoding do cliente"""
+    response.vary.add('Accept-Encoding')
+    
+    if (response.direct_passthrough or response.status_code < 200
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if not encoding:
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 @app.route('/')
 def home():
@@ -51,11 +307,15 @@ def home():
         'endpoints': {
             '/analyze': 'POST - Analisar email (texto ou arquivo)',
             '/health': 'GET - Status da API',
-            '/models': 'GET - Informações dos modelos de IA'
+            '/models': 'GET - Informações dos modelos de IA',
+            '/metrics': 'GET - Métricas de processamento',
+            '/history': 'GET - Buscar classificações anteriores',
+            '/feedback': 'POST - Corrigir a categoria de um email'
         }
     })
 
 @app.route('/health')
+@app.route('/api/health')
 def health_check():
     """Verificação de saúde da API"""
     try:
@@ -77,6 +337,7 @@ def health_check():
         }), 500
 
 @app.route('/models')
+@app.route('/api/models')
 def models_info():
     """Informações sobre os modelos de IA utilizados"""
     try:
@@ -86,49 +347,168 @@ def models_info():
         logger.error(f"Erro ao obter informações dos modelos: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Métricas de processamento da API"""
+    return jsonify({
+        'coalescing': analysis_flight.get_stats(),
+        'admission': admission.get_stats(),
+        'history': history.get_stats() if history is not None else None,
+        'online_learning': classifier.learner.get_stats() if classifier.learner is not None else None,
+        'profiling': profiler.get_stats() if profiler is not None else None,
+        'batch_memory': batch_memory.get_stats()
+    })
+
+def parse_timestamp(value):
+    """Timestamp em segundos a partir de epoch ou data ISO 8601"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise RequestError(400, f"Data inválida: {value}. Use ISO 8601 ou segundos desde a época")
+
+@app.route('/history')
+@app.route('/api/history')
+def history_search():
+    """
+    Consultar classificações anteriores
+    Parâmetros: q (palavras do conteúdo), category, since, until,
+    limit e cursor (next_cursor da página anterior)
+    """
+    if history is None:
+        return jsonify({'error': 'Histórico desativado'}), 404
+    
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        try:
+            limit = int(request.args.get('limit', 50))
+            cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            raise RequestError(400, 'limit e cursor devem ser números inteiros')
+        
+        page = history.query(
+            text=request.args.get('q'),
+            category=request.args.get('category'),
+            since=parse_timestamp(since) if since else None,
+            until=parse_timestamp(until) if until else None,
+            limit=limit,
+            cursor=cursor
+        )
+        return jsonify(page)
+        
+    except RequestError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        logger.error(f"Erro na consulta ao histórico: {str(e)}")
+        return jsonify({'error': 'Erro ao consultar o histórico'}), 500
+
+@app.route('/debug/profiles')
+def list_profiles():
+    """Perfis de requisições gravados (mais recentes primeiro)"""
+    if profiler is None:
+        return jsonify({'error': 'Perfil de requisições desativado'}), 404
+    return jsonify({'profiles': profiler.list_profiles()})
+
+@app.route('/debug/profiles/<profile_id>')
+def show_profile(profile_id):
+    """
+    Conteúdo de um perfil: texto do pstats (cprofile) ou pilhas colapsadas
+    (sample, para flamegraph.pl/speedscope). Parâmetros: sort e limit (pstats)
+    """
+    if profiler is None:
+        return jsonify({'error': 'Perfil de requisições desativado'}), 404
+    
+    try:
+        limit = int(request.args.get('limit', 50))
+        text, fmt = profiler.render(profile_id, request.args.get('sort', 'cumulative'), limit)
+    except KeyError:
+        return jsonify({'error': 'Perfil não encontrado'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = make_response(text)
+    response.mimetype = 'text/plain'
+    if fmt == 'collapsed':
+        response.headers['Content-Disposition'] = f'attachment; filename={profile_id}.collapsed'
+    return response
+
+@app.route('/debug/memory')
+def memory_report():
+    """Memória do worker, tamanho das estruturas do classificador e picos por lote"""
+    if not memory_diagnostics_enabled:
+        return jsonify({'error': 'Diagnóstico de memória desativado'}), 404
+    return jsonify({
+        'process': process_memory(),
+        'structures': classifier_structure_sizes(classifier),
+        'tracemalloc': allocation_tracer.status(),
+        'batch': batch_memory.get_stats()
+    })
+
+@app.route('/debug/memory/tracemalloc', methods=['POST'])
+def memory_tracing():
+    """
+    Iniciar ou parar o tracemalloc neste worker
+    Corpo JSON ou formulário: action (start/stop) e frames
+    """
+    if not memory_diagnostics_enabled:
+        return jsonify({'error': 'Diagnóstico de memória desativado'}), 404
+    
+    data = request.get_json(silent=True) or request.form
+    action = data.get('action')
+    if action == 'start':
+        try:
+            frames = int(data.get('frames', DEFAULT_TRACE_FRAMES))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'frames deve ser um número inteiro'}), 400
+        return jsonify(allocation_tracer.start(frames))
+    if action == 'stop':
+        return jsonify(allocation_tracer.stop())
+    return jsonify({'error': 'Ação inválida. Use start ou stop'}), 400
+
+@app.route('/debug/memory/top', methods=['GET', 'POST'])
+def memory_top():
+    """
+    Maiores sítios de alocação, em diferença ao snapshot de referência
+    GET compara com a referência; POST também a substitui pelo snapshot
+    atual. Parâmetros: limit e group (lineno, filename, traceback)
+    """
+    if not memory_diagnostics_enabled:
+        return jsonify({'error': 'Diagnóstico de memória desativado'}), 404
+    
+    try:
+        limit = int(request.args.get('limit', 20))
+        top = allocation_tracer.top(limit, request.args.get('group', 'lineno'),
+                                    new_baseline=request.method == 'POST')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': f'{e}. Inicie com POST /debug/memory/tracemalloc'}), 409
+    top['pid'] = os.getpid()
+    return jsonify(top)
+
 @app.route('/analyze', methods=['POST'])
+@app.route('/api/analyze', methods=['POST'])
+@admission_controlled()
+@profiled
 def analyze_email():
     """
     Endpoint principal para análise de emails
-    Aceita texto direto ou arquivo (.txt, .pdf)
+    Aceita texto (JSON, formulário ou texto puro) ou arquivo (.txt, .pdf)
     """
     try:
-        # Verificar se há arquivo ou texto
-        if 'file' in request.files:
-            file = request.files['file']
-            
-            if file.filename == '':
-                return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
-            
-            if not allowed_file(file.filename):
-                return jsonify({'error': 'Tipo de arquivo não suportado. Use apenas .txt ou .pdf'}), 400
-            
-            # Salvar arquivo temporariamente
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            try:
-                # Extrair texto do arquivo
-                if filename.endswith('.txt'):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        email_content = f.read()
-                elif filename.endswith('.pdf'):
-                    email_content = classifier.extract_pdf_text(filepath)
-                else:
-                    return jsonify({'error': 'Tipo de arquivo não suportado'}), 400
-                
-            finally:
-                # Limpar arquivo temporário
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                    
-        elif 'text' in request.form:
-            email_content = request.form['text'].strip()
-            if not email_content:
-                return jsonify({'error': 'Texto do email não fornecido'}), 400
-        else:
-            return jsonify({'error': 'Forneça um arquivo ou texto para análise'}), 400
+        # Ler o conteúdo de JSON, formulário, multipart (arquivo) ou texto puro
+        try:
+            detail = requested_detail()
+            email_content = parse_email_content(
+                request, classifier,
+                app.config['ALLOWED_EXTENSIONS'], app.config['MAX_CONTENT_LENGTH']
+            )
+        except RequestError as e:
+            return jsonify({'error': e.message}), e.status
         
         # Validar tamanho do conteúdo
         if len(email_content) > 10000:  # Máximo 10k caracteres
@@ -136,15 +516,16 @@ def analyze_email():
         
         logger.info(f"Analisando email com {len(email_content)} caracteres")
         
-        # Classificar email
-        classification_result = classifier.classify_email(email_content)
+        key = content_hash(email_content)
+        etag = analysis_etag(key, detail) if deterministic_responses else None
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            # O cliente já tem o resultado deste conteúdo com o estado atual
+            response = make_response('', 304)
+            response.set_etag(etag, weak=True)
+            return response
         
-        # Gerar resposta automática
-        ai_response = response_generator.generate_response(
-            classification_result['category'],
-            email_content,
-            classification_result['confidence']
-        )
+        # Classificar email e gerar resposta automática
+        classification_result, ai_response = run_analysis(email_content, key, detail)
         
         # Preparar resposta
         result = {
@@ -158,10 +539,16 @@ def analyze_email():
                 'model_used': classification_result.get('model_used', 'default')
             }
         }
+        if detail != DETAIL_NONE and 'analysis' in classification_result:
+            result['details'] = classification_result['analysis']
         
         logger.info(f"Email classificado como {classification_result['category']} com {classification_result['confidence']:.2f} de confiança")
         
-        return jsonify(result)
+        response = jsonify(result)
+        if etag is not None:
+            # Mesmo conteúdo e estado produzem o mesmo resultado (exceto métricas de tempo)
+            response.set_etag(etag, weak=True)
+        return response
         
     except Exception as e:
         logger.error(f"Erro na análise: {str(e)}")
@@ -174,59 +561,73 @@ def analyze_email():
         }), 500
 
 @app.route('/analyze/batch', methods=['POST'])
+@app.route('/api/analyze-batch', methods=['POST'])
+@admission_controlled(batch=True)
+@profiled
+@batch_memory_measured
 def analyze_batch():
     """
     Endpoint para análise em lote de múltiplos emails
+    Aceita JSON ({"emails": [...]}) ou multipart com vários arquivos
     """
     try:
-        data = request.get_json()
+        try:
+            detail = requested_detail()
+            emails = parse_batch_emails(
+                request, classifier,
+                app.config['ALLOWED_EXTENSIONS'], app.config['MAX_CONTENT_LENGTH']
+            )
+        except RequestError as e:
+            return jsonify({'error': e.message}), e.status
         
-        if not data or 'emails' not in data:
-            return jsonify({'error': 'Lista de emails não fornecida'}), 400
+        g.batch_emails = len(emails)
         
-        emails = data['emails']
-        if not isinstance(emails, list) or len(emails) > 50:  # Máximo 50 emails por lote
-            return jsonify({'error': 'Lista inválida ou muito longa. Máximo: 50 emails'}), 400
-        
-        results = []
+        results = [None] * len(emails)
+        pending = []  # (índice, conteúdo, nome do arquivo)
         for i, email_data in enumerate(emails):
-            try:
-                if isinstance(email_data, str):
-                    email_content = email_data
-                elif isinstance(email_data, dict) and 'content' in email_data:
-                    email_content = email_data['content']
-                else:
-                    results.append({
-                        'index': i,
-                        'success': False,
-                        'error': 'Formato inválido'
-                    })
-                    continue
-                
-                # Classificar email
-                classification_result = classifier.classify_email(email_content)
-                
-                # Gerar resposta
-                ai_response = response_generator.generate_response(
-                    classification_result['category'],
-                    email_content,
-                    classification_result['confidence']
-                )
-                
-                results.append({
+            if isinstance(email_data, str):
+                pending.append((i, email_data, None))
+            elif isinstance(email_data, dict) and 'error' in email_data:
+                results[i] = {
                     'index': i,
-                    'success': True,
-                    'category': classification_result['category'],
-                    'confidence': classification_result['confidence'],
-                    'response': ai_response
-                })
-                
-            except Exception as e:
-                results.append({
+                    'success': False,
+                    'error': email_data['error'],
+                    'filename': email_data.get('filename')
+                }
+            elif isinstance(email_data, dict) and isinstance(email_data.get('content'), str):
+                pending.append((i, email_data['content'], email_data.get('filename')))
+            else:
+                results[i] = {
+                    'index': i,
+                    'success': False,
+                    'error': 'Formato inválido'
+                }
+        
+        # Classificar todos os emails válidos de uma vez (filtragem de tokens vetorizada)
+        outcomes = run_batch_analysis([content for _, content, _ in pending], detail)
+        
+        for (i, email_content, filename), (outcome, error) in zip(pending, outcomes):
+            if error is not None:
+                results[i] = {
                     'index': i,
                     'success': False,
-                    'error': str(e)
-                })
+                    'error': str(error)
+                }
+                continue
+            
+            classification_result, ai_response = outcome
+            result = {
+                'index': i,
+                'success': True,
+                'category': classification_result['category'],
+                'confidence': classification_result['confidence'],
+                'response': ai_response
+            }
+            if detail != DETAIL_NONE and 'analysis' in classification_result:
+                result['details'] = classification_result['analysis']
+            if filename is not None:
+                result['filename'] = filename
+            results[i] = result
         
         return jsonify({
             'success': True,
@@ -242,6 +643,35 @@ def analyze_batch():
             'details': str(e) if app.debug else 'Erro durante a análise em lote'
         }), 500
 
+@app.route('/feedback', methods=['POST'])
+@app.route('/api/feedback', methods=['POST'])
+@admission_controlled()
+def feedback():
+    """
+    Receber a categoria correta de um email classificado errado
+    Aceita JSON ou formulário com content e category; o treino do modelo
+    ocorre em segundo plano (202)
+    
+    A rota não tem autenticação: só existe com ONLINE_LEARNING_ENABLED=True
+    ou REPUTATION_ENABLED=True (ambos desativados por padrão).
+    """
+    if classifier.learner is None and classifier.reputation is None:
+        return jsonify({'error': 'Aprendizado por feedback desativado'}), 404
+    
+    try:
+        email_content, category = parse_feedback(request)
+    except RequestError as e:
+        return jsonify({'error': e.message}), e.status
+    
+    if not classifier.record_feedback(email_content, category):
+        response = jsonify({'error': 'Fila de correções cheia. Tente novamente em instantes'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    logger.info(f"Correção recebida: {category}")
+    return jsonify({'success': True, 'category': category}), 202
+
 @app.errorhandler(413)
 def too_large(e):
     """Handler para arquivos muito grandes"""
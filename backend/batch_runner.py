@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Runner
+Classificação offline de corpora grandes (JSONL/CSV) em shards processados
+em paralelo, com checkpoints para retomar execuções interrompidas
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Campos reconhecidos em cada registro do corpus
+ID_FIELDS = ('id', 'request_id', 'message_id')
+SUBJECT_FIELDS = ('subject', 'title')
+CONTENT_FIELDS = ('content', 'text', 'body')
+
+# Registros processados entre dois checkpoints
+CHECKPOINT_INTERVAL = 500
+
+# Registros classificados juntos por classify_batch (divisor dos intervalos
+# de checkpoint, para que os checkpoints caiam no fim de um bloco)
+CLASSIFY_CHUNK_SIZE = 250
+
+# No formato colunar cada checkpoint grava uma parte; partes pequenas
+# prejudicariam a compressão e a leitura
+COLUMNAR_CHECKPOINT_INTERVAL = 20000
+
+# Formatos de saída: JSONL por registro ou colunar (ver columnar_export)
+OUTPUT_FORMATS = ('jsonl', 'parquet', 'feather')
+
+SUMMARY_FILENAME = 'summary.json'
+
+# Classificador do processo worker (criado uma vez por processo)
+_classifier = None
+_detail = 'none'
+
+
+def _first_field(record: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[str]:
+    """Valor do primeiro campo presente e não vazio do registro"""
+    for field in fields:
+        value = record.get(field)
+        if value:
+            return str(value)
+    return None
+
+
+def parse_record(index: int, raw: Any) -> Tuple[str, Optional[str]]:
+    """
+    Converter um registro bruto em (id, conteúdo)
+
+    Strings são o próprio conteúdo; objetos usam os campos de ID_FIELDS,
+    SUBJECT_FIELDS e CONTENT_FIELDS (assunto e corpo são concatenados).
+    """
+    if isinstance(raw, str):
+        return str(index), raw
+    if not isinstance(raw, dict):
+        return str(index), None
+
+    record_id = _first_field(raw, ID_FIELDS) or str(index)
+    content = _first_field(raw, CONTENT_FIELDS)
+    subject = _first_field(raw, SUBJECT_FIELDS)
+    if subject and content:
+        content = f"{subject}\n\n{content}"
+    return record_id, content or subject
+
+
+def iter_raw_records(path: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Percorrer os registros do corpus sem decodificá-los
+
+    Args:
+        path: Arquivo .jsonl (um objeto ou string por linha) ou .csv (com cabeçalho)
+
+    Yields:
+        Tuplas (índice, linha JSON ainda não decodificada ou linha do CSV)
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            # O CSV precisa ser lido linha a linha para achar os limites dos registros
+            yield from enumerate(csv.DictReader(f))
+            return
+
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            yield index, line
+            index += 1
+
+
+def read_corpus(path: str, shard: int = 0, num_shards: int = 1) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """
+    Ler o corpus em fluxo, sem carregá-lo inteiro na memória
+
+    Só os registros do shard (índice % num_shards == shard) são decodificados:
+    cada worker percorre o arquivo inteiro, mas não paga o json.loads dos
+    registros dos outros shards.
+
+    Args:
+        path: Arquivo .jsonl (um objeto ou string por linha) ou .csv (com cabeçalho)
+        shard: Shard lido
+        num_shards: Número de shards
+
+    Yields:
+        Tuplas (índice, id, conteúdo); o conteúdo é None em registros inválidos
+    """
+    is_jsonl = not path.lower().endswith('.csv')
+    for index, raw in iter_raw_records(path):
+        if index % num_shards != shard:
+            continue
+        if is_jsonl:
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                raw = None
+        yield (index,) + parse_record(index, raw)
+
+
+def shard_path(output_dir: str, shard: int) -> str:
+    """Arquivo de resultados de um shard"""
+    return os.path.join(output_dir, f'shard-{shard:05d}.jsonl')
+
+
+def checkpoint_path(output_dir: str, shard: int) -> str:
+    """Arquivo de checkpoint de um shard"""
+    return os.path.join(output_dir, f'shard-{shard:05d}.checkpoint.json')
+
+
+def load_checkpoint(output_dir: str, shard: int) -> Dict[str, Any]:
+    """
+    Carregar o checkpoint de um shard
+
+    Returns:
+        Estado salvo ou o estado inicial (nada processado)
+    """
+    try:
+        with open(checkpoint_path(output_dir, shard), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'shard': shard, 'processed': 0, 'offset': 0, 'errors': 0,
+                'parts': 0, 'counts': {}, 'elapsed': 0.0, 'done': False}
+
+
+def save_checkpoint(output_dir: str, state: Dict[str, Any]):
+    """Gravar o checkpoint de forma atômica (arquivo temporário + rename)"""
+    path = checkpoint_path(output_dir, state['shard'])
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _init_worker(detail: str):
+    """Criar o classificador uma única vez em cada processo worker"""
+    global _classifier, _detail
+    from classifier import EmailClassifier
+
+    # Um log por email tornaria a saída ilegível em corpora grandes
+    logging.getLogger('classifier').setLevel(logging.WARNING)
+    _classifier = EmailClassifier()
+    # Reputação e modelo de feedback aprendem com o uso: resultados dependeriam da
+    # ordem dos emails e o snapshot de produção poderia ser sobrescrito
+    _classifier.reputation = None
+    _classifier.learner = None
+    _detail = detail
+
+
+class JsonlShardWriter:
+    """Saída JSONL de um shard; o checkpoint guarda o offset em bytes"""
+
+    checkpoint_interval = CHECKPOINT_INTERVAL
+
+    def __init__(self, output_dir: str, shard: int, state: Dict[str, Any]):
+        self.output = open(shard_path(output_dir, shard), 'ab')
+        # Descartar o que foi gravado após o último checkpoint
+        self.output.truncate(state['offset'])
+        self.output.seek(state['offset'])
+
+    def append(self, record_id: str, result: Dict[str, Any]):
+        entry = {'id': record_id, 'category': result['category'],
+                 'confidence': result['confidence']}
+        if 'analysis' in result:
+            entry['analysis'] = result['analysis']
+        self.output.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    def append_error(self, record_id: str, message: str):
+        entry = {'id': record_id, 'error': message}
+        self.output.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    def commit(self, state: Dict[str, Any]):
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        state['offset'] = self.output.tell()
+
+    def close(self):
+        self.output.close()
+
+
+class ColumnarShardWriter:
+    """
+    Saída Parquet/Feather de um shard: cada checkpoint grava uma parte
+    (<formato>/shard-NNNNN-part-NNNNN.<formato>) com as linhas acumuladas
+    em colunas; o subdiretório pode ser lido inteiro com pandas
+    """
+
+    checkpoint_interval = COLUMNAR_CHECKPOINT_INTERVAL
+
+    def __init__(self, output_dir: str, shard: int, state: Dict[str, Any], fmt: str,
+                 score_categories: Optional[List[str]] = None):
+        from columnar_export import ColumnarResults
+
+        self.output_dir = os.path.join(output_dir, fmt)
+        self.shard = shard
+        self.fmt = fmt
+        self.results = ColumnarResults(score_categories)
+
+        # Partes gravadas após o último checkpoint serão regravadas
+        os.makedirs(self.output_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(self.output_dir, f'shard-{shard:05d}-part-*.{fmt}')):
+            part = int(path.rsplit('-', 1)[1].split('.')[0])
+            if part >= state['parts']:
+                os.remove(path)
+
+    def append(self, record_id: str, result: Dict[str, Any]):
+        self.results.append(record_id, result)
+
+    def append_error(self, record_id: str, message: str):
+        # Colunas de largura fixa: registros inválidos só entram na contagem de erros
+        pass
+
+    def commit(self, state: Dict[str, Any]):
+        if not len(self.results):
+            return
+        path = os.path.join(self.output_dir, f"shard-{self.shard:05d}-part-{state['parts']:05d}.{self.fmt}")
+        self.results.write(path, self.fmt)
+        self.results.clear()
+        state['parts'] += 1
+
+    def close(self):
+        pass
+
+
+def process_shard(task: Tuple[str, str, int, int, str, bool]) -> Dict[str, Any]:
+    """
+    Classificar os registros de um shard (índice % shards == shard)
+
+    A saída é descartada a partir do último checkpoint antes de continuar,
+    de modo que registros gravados após o checkpoint por uma execução
+    interrompida não são duplicados.
+
+    Args:
+        task: (corpus, diretório de saída, shard, número de shards, formato,
+               colunas de pontuação por categoria)
+
+    Returns:
+        Estado final do shard
+    """
+    corpus, output_dir, shard, num_shards, fmt, keyword_scores = task
+    state = load_checkpoint(output_dir, shard)
+    if state['done']:
+        return state
+
+    start_time = time.time()
+    elapsed_before = state['elapsed']
+    position = 0
+
+    if fmt == 'jsonl':
+        writer = JsonlShardWriter(output_dir, shard, state)
+    else:
+        score_categories = list(_classifier.keyword_weights) if keyword_scores else None
+        writer = ColumnarShardWriter(output_dir, shard, state, fmt, score_categories)
+
+    def flush(chunk):
+        """Classificar um bloco de registros com classify_batch e gravá-lo em ordem"""
+        results = iter(_classifier.classify_batch([content for _, content in chunk if content], _detail))
+        for record_id, content in chunk:
+            if content:
+                result = next(results)
+                writer.append(record_id, result)
+                state['counts'][result['category']] = state['counts'].get(result['category'], 0) + 1
+            else:
+                writer.append_error(record_id, 'Registro sem conteúdo')
+                state['errors'] += 1
+        state['processed'] += len(chunk)
+
+        if state['processed'] % writer.checkpoint_interval == 0:
+            writer.commit(state)
+            state['elapsed'] = elapsed_before + time.time() - start_time
+            save_checkpoint(output_dir, state)
+
+    try:
+        chunk = []
+        for _, record_id, content in read_corpus(corpus, shard, num_shards):
+            position += 1
+            if position <= state['processed']:
+                continue
+
+            chunk.append((record_id, content))
+            if len(chunk) == CLASSIFY_CHUNK_SIZE:
+                flush(chunk)
+                chunk = []
+
+        if chunk:
+            flush(chunk)
+        writer.commit(state)
+    finally:
+        writer.close()
+
+    state['elapsed'] = elapsed_before + time.time() - start_time
+    state['done'] = True
+    save_checkpoint(output_dir, state)
+    return state
+
+
+def merge_summary(states, wall_time: float) -> Dict[str, Any]:
+    """
+    Consolidar os estados dos shards em um resumo
+
+    Args:
+        states: Estados finais de cada shard
+        wall_time: Duração da execução atual em segundos
+
+    Returns:
+        Contagem por categoria, erros e vazão
+    """
+    counts: Dict[str, int] = {}
+    processed = errors = 0
+    worker_time = 0.0
+
+    for state in states:
+        processed += state['processed']
+        errors += state['errors']
+        worker_time += state['elapsed']
+        for category, count in state['counts'].items():
+            counts[category] = counts.get(category, 0) + count
+
+    return {
+        'total_processed': processed,
+        'errors': errors,
+        'counts': counts,
+        'shards': len(states),
+        'wall_time': round(wall_time, 3),
+        'worker_time': round(worker_time, 3),
+        'throughput_per_worker': round(processed / worker_time, 1) if worker_time else 0.0
+    }
+
+
+def run_batch(corpus: str, output_dir: str, shards: int, processes: int,
+              detail: str = 'none', fmt: str = 'jsonl', keyword_scores: bool = False) -> Dict[str, Any]:
+    """
+    Classificar um corpus em shards paralelos, retomando checkpoints existentes
+
+    Args:
+        corpus: Arquivo .jsonl ou .csv
+        output_dir: Diretório dos resultados por shard, checkpoints e resumo
+        shards: Número de shards (deve ser o mesmo ao retomar)
+        processes: Processos worker
+        detail: Nível de detalhamento gravado por registro (none/summary/full)
+        fmt: Formato de saída (jsonl/parquet/feather)
+        keyword_scores: Gravar a pontuação de cada categoria de palavras-chave
+
+    Returns:
+        Resumo consolidado
+    """
+    if fmt != 'jsonl':
+        from columnar_export import columnar_export_available
+        # Falhar antes de classificar, não no primeiro checkpoint de cada worker
+        if not columnar_export_available():
+            raise ValueError(f"Formato {fmt} requer pandas e pyarrow (pip install -r requirements.txt)")
+
+    if keyword_scores and detail == 'none':
+        # As pontuações por categoria só existem na análise detalhada
+        detail = 'summary'
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # O número de shards define a partição; mudá-lo invalidaria os checkpoints
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    manifest = {'corpus': os.path.abspath(corpus), 'shards': shards, 'detail': detail,
+                'format': fmt, 'keyword_scores': keyword_scores}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f"Diretório {output_dir} pertence a outra execução: {previous}")
+    else:
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    tasks = [(corpus, output_dir, shard, shards, fmt, keyword_scores) for shard in range(shards)]
+    pending = sum(1 for shard in range(shards) if not load_checkpoint(output_dir, shard)['done'])
+    logger.info(f"{shards} shards ({pending} pendentes) em {processes} processos")
+
+    start_time = time.time()
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(detail,)) as pool:
+        states = []
+        for state in pool.imap_unordered(process_shard, tasks):
+            states.append(state)
+            logger.info(f"Shard {state['shard']} concluído: {state['processed']} registros")
+
+    summary = merge_summary(sorted(states, key=lambda state: state['shard']), time.time() - start_time)
+    with open(os.path.join(output_dir, SUMMARY_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
+
+
+def main(argv=None):
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Classificação offline de corpora em shards paralelos')
+    parser.add_argument('corpus', help='Arquivo .jsonl ou .csv com os emails')
+    parser.add_argument('output', help='Diretório de saída (reutilize-o para retomar)')
+    parser.add_argument('--shards', type=int, default=16, help='Número de shards')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Processos worker')
+    parser.add_argument('--detail', choices=('none', 'summary', 'full'), default='none',
+                        help='Detalhamento gravado por registro')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='jsonl',
+                        help='Formato de saída (parquet/feather para análise colunar)')
+    parser.add_argument('--keyword-scores', action='store_true',
+                        help='Incluir a pontuação de cada categoria de palavras-chave')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        summary = run_batch(args.corpus, args.output, max(1, args.shards), max(1, args.processes),
+                            args.detail, args.format, args.keyword_scores)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Confidence Calibration
+Ajuste offline (isotônico ou Platt) da probabilidade de um email ser
+produtivo a partir do final_score, gravado como tabela de consulta
+interpolada em O(log n) no classificador
+"""
+
+import sys
+import csv
+import json
+import math
+import argparse
+import logging
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('isotonic', 'platt')
+
+# Pontos da tabela gerada a partir da curva de Platt
+PLATT_TABLE_POINTS = 64
+
+# Limite da probabilidade antes do deslocamento de log-odds (evita log(0))
+PROBABILITY_EPSILON = 1e-6
+
+
+class CalibrationTable:
+    """
+    Função monótona final_score -> P(produtivo) definida por pontos (x, y)
+
+    Entre dois pontos a probabilidade é interpolada linearmente; fora do
+    intervalo, vale a do ponto mais próximo.
+    """
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float], method: str = 'isotonic'):
+        """
+        Args:
+            xs: Pontuações em ordem crescente
+            ys: Probabilidades correspondentes (não decrescentes)
+            method: Método usado no ajuste (apenas informativo)
+        """
+        if not xs or len(xs) != len(ys):
+            raise ValueError("Tabela de calibração vazia ou inconsistente")
+        if any(b < a for a, b in zip(xs, xs[1:])):
+            raise ValueError("Pontuações da tabela de calibração fora de ordem")
+
+        # Tuplas imutáveis: a tabela é compartilhada entre threads e workers
+        self.xs: Tuple[float, ...] = tuple(float(x) for x in xs)
+        self.ys: Tuple[float, ...] = tuple(float(y) for y in ys)
+        self.method = method
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def probability(self, score: float, shift: float = 0.0) -> float:
+        """
+        Probabilidade calibrada de o email ser produtivo
+
+        Args:
+            score: Pontuação das regras, a mesma usada no ajuste (final_score
+                   sem os termos de reputação e do modelo de feedback)
+            shift: Deslocamento somado ao log-odds da probabilidade calibrada
+                   (os termos aprendidos em runtime, fora do ajuste)
+
+        Returns:
+            Probabilidade entre 0 e 1
+        """
+        probability = self._interpolate(score)
+        if not shift:
+            return probability
+        probability = min(1 - PROBABILITY_EPSILON, max(PROBABILITY_EPSILON, probability))
+        return _sigmoid(math.log(probability / (1 - probability)) + shift)
+
+    def _interpolate(self, score: float) -> float:
+        """Probabilidade da tabela, interpolada entre os pontos vizinhos"""
+        xs, ys = self.xs, self.ys
+        index = bisect_right(xs, score)
+        if index == 0:
+            return ys[0]
+        if index == len(xs):
+            return ys[-1]
+
+        x0, x1 = xs[index - 1], xs[index]
+        y0, y1 = ys[index - 1], ys[index]
+        if x1 == x0:
+            return y1
+        return y0 + (y1 - y0) * (score - x0) / (x1 - x0)
+
+    def to_dict(self) -> dict:
+        """Representação serializável"""
+        return {'method': self.method, 'x': list(self.xs), 'y': list(self.ys)}
+
+
+def fit_isotonic(scores: Sequence[float], labels: Sequence[int]) -> CalibrationTable:
+    """
+    Regressão isotônica (pool adjacent violators)
+
+    As probabilidades de cada bloco recebem suavização de Laplace para que
+    poucos exemplos não produzam confiança 0 ou 1.
+
+    Args:
+        scores: final_score de cada exemplo
+        labels: 1 para produtivo, 0 para improdutivo
+
+    Returns:
+        Tabela com dois pontos (início e fim) por bloco
+    """
+    # Agrupar pontuações iguais: [soma dos rótulos, contagem, menor x, maior x]
+    pairs = sorted(zip(scores, labels))
+    blocks: List[List[float]] = []
+    for score, label in pairs:
+        if blocks and blocks[-1][2] == score:
+            blocks[-1][0] += label
+            blocks[-1][1] += 1
+        else:
+            blocks.append([label, 1, score, score])
+
+    # Unir blocos vizinhos enquanto a média não for crescente
+    merged: List[List[float]] = []
+    for block in blocks:
+        merged.append(block)
+        while len(merged) > 1 and merged[-2][0] / merged[-2][1] >= merged[-1][0] / merged[-1][1]:
+            last = merged.pop()
+            merged[-1][0] += last[0]
+            merged[-1][1] += last[1]
+            merged[-1][3] = last[3]
+
+    xs: List[float] = []
+    ys: List[float] = []
+    previous = 0.0
+    for positives, count, low, high in merged:
+        # A suavização pode quebrar a monotonicidade entre blocos de tamanhos diferentes
+        probability = max(previous, (positives + 1) / (count + 2))
+        previous = probability
+        xs.append(low)
+        ys.append(probability)
+        if high != low:
+            xs.append(high)
+            ys.append(probability)
+
+    return CalibrationTable(xs, ys, 'isotonic')
+
+
+def fit_platt(scores: Sequence[float], labels: Sequence[int], iterations: int = 100) -> CalibrationTable:
+    """
+    Escalonamento de Platt: sigmoide 1 / (1 + exp(-(a * score + b)))
+
+    Ajustado por Newton-Raphson com os alvos suavizados de Platt e
+    tabulado em PLATT_TABLE_POINTS pontos no intervalo observado.
+
+    Args:
+        scores: final_score de cada exemplo
+        labels: 1 para produtivo, 0 para improdutivo
+        iterations: Máximo de iterações de Newton
+
+    Returns:
+        Tabela com a sigmoide amostrada
+    """
+    positives = sum(labels)
+    negatives = len(labels) - positives
+    high_target = (positives + 1) / (positives + 2)
+    low_target = 1 / (negatives + 2)
+    targets = [high_target if label else low_target for label in labels]
+
+    # Inicialização de Platt: sigmoide constante na proporção de positivos
+    a, b = 0.0, math.log((positives + 1) / (negatives + 1))
+    loss = _platt_loss(scores, targets, a, b)
+
+    for _ in range(iterations):
+        # Gradiente e hessiana da log-verossimilhança
+        g_a = g_b = 0.0
+        h_aa = h_bb = 1e-12
+        h_ab = 0.0
+        for score, target in zip(scores, targets):
+            p = _sigmoid(a * score + b)
+            error = p - target
+            weight = p * (1 - p)
+            g_a += error * score
+            g_b += error
+            h_aa += weight * score * score
+            h_ab += weight * score
+            h_bb += weight
+        determinant = h_aa * h_bb - h_ab * h_ab
+        if determinant <= 0:
+            break
+        step_a = (h_bb * g_a - h_ab * g_b) / determinant
+        step_b = (h_aa * g_b - h_ab * g_a) / determinant
+
+        # Busca em linha: o passo de Newton puro diverge longe do ótimo
+        step = 1.0
+        while step > 1e-10:
+            new_a, new_b = a - step * step_a, b - step * step_b
+            new_loss = _platt_loss(scores, targets, new_a, new_b)
+            if new_loss < loss + 1e-12:
+                break
+            step /= 2
+        else:
+            break
+
+        a, b = new_a, new_b
+        if loss - new_loss < 1e-9:
+            break
+        loss = new_loss
+
+    low, high = min(scores), max(scores)
+    if high == low:
+        xs = [low]
+    else:
+        step = (high - low) / (PLATT_TABLE_POINTS - 1)
+        xs = [low + i * step for i in range(PLATT_TABLE_POINTS)]
+    ys = [_sigmoid(a * x + b) for x in xs]
+
+    logger.info(f"Platt: a={a:.4f}, b={b:.4f}")
+    return CalibrationTable(xs, ys, 'platt')
+
+
+def _platt_loss(scores: Sequence[float], targets: Sequence[float], a: float, b: float) -> float:
+    """Entropia cruzada da sigmoide em relação aos alvos suavizados"""
+    loss = 0.0
+    for score, target in zip(scores, targets):
+        z = a * score + b
+        # log(1 + exp(z)) estável
+        softplus = z + math.log1p(math.exp(-z)) if z > 0 else math.log1p(math.exp(z))
+        loss += softplus - target * z
+    return loss
+
+
+def _sigmoid(value: float) -> float:
+    """Sigmoide numericamente estável"""
+    if value >= 0:
+        return 1 / (1 + math.exp(-value))
+    exp_value = math.exp(value)
+    return exp_value / (1 + exp_value)
+
+
+def save_calibration_table(table: CalibrationTable, path: str):
+    """Salvar a tabela em JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table.to_dict(), f)
+
+
+def load_calibration_table(path: str) -> CalibrationTable:
+    """Carregar a tabela de um arquivo JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return CalibrationTable(data['x'], data['y'], data.get('method', 'isotonic'))
+
+
+def parse_label(value) -> Optional[int]:
+    """
+    Converter um rótulo em 1 (produtivo) ou 0 (improdutivo)
+
+    Aceita o nome da categoria, booleanos e 1/0; retorna None se não reconhecido.
+    """
+    text = str(value).strip().lower()
+    if text in ('produtivo', 'productive', '1', 'true'):
+        return 1
+    if text in ('improdutivo', 'unproductive', '0', 'false'):
+        return 0
+    return None
+
+
+def load_labeled_emails(path: str) -> Iterable[Tuple[str, int]]:
+    """
+    Ler emails rotulados de um .jsonl ou .csv
+
+    Cada registro usa os campos de conteúdo do batch_runner e um campo
+    'label' ou 'category' com a categoria esperada.
+
+    Yields:
+        Tuplas (conteúdo, rótulo)
+    """
+    from batch_runner import parse_record
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                continue
+            _, content = parse_record(index, row)
+            label = parse_label(row.get('label', row.get('category')))
+            if content and label is not None:
+                yield content, label
+
+
+def main():
+    """Função principal"""
+    from classifier import EmailClassifier, DETAIL_SUMMARY
+    from corpus import load_example_emails
+
+    parser = argparse.ArgumentParser(description='Ajustar a tabela de calibração da confiança')
+    parser.add_argument('output', help='Arquivo JSON de saída')
+    parser.add_argument('labeled', nargs='*', help='Arquivos .jsonl/.csv rotulados (label/category)')
+    parser.add_argument('--method', choices=METHODS, default='isotonic', help='Método de calibração')
+    parser.add_argument('--no-examples', action='store_true',
+                        help='Não incluir os emails de exemplo (rótulo pelo título da seção)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('classifier').setLevel(logging.WARNING)
+    classifier = EmailClassifier()
+    # O ajuste usa apenas o final_score do pipeline de NLP, sem reputação nem correções
+    classifier.reputation = None
+    classifier.learner = None
+
+    examples: List[Tuple[str, int]] = []
+    if not args.no_examples:
+        examples.extend((content, 0 if 'IMPRODUTIVO' in title.upper() else 1)
+                        for title, content in load_example_emails())
+    for path in args.labeled:
+        examples.extend(load_labeled_emails(path))
+
+    if not examples:
+        print("Nenhum email rotulado encontrado")
+        return 1
+
+    scores: List[float] = []
+    labels: List[int] = []
+    skipped = 0
+    for content, label in examples:
+        result = classifier.classify_email(content, DETAIL_SUMMARY)
+        if result['model_used'] != 'rule_based_nlp':
+            # Resultado de fallback: não há final_score para ajustar
+            skipped += 1
+            continue
+        scores.append(result['analysis']['final_score'])
+        labels.append(label)
+
+    if skipped:
+        logger.warning(f"{skipped} emails ignorados (erro na classificação)")
+    if not scores:
+        print("Nenhum email classificado pelo pipeline de NLP")
+        return 1
+
+    fit = fit_platt if args.method == 'platt' else fit_isotonic
+    table = fit(scores, labels)
+    save_calibration_table(table, args.output)
+    print(f"Tabela salva em {args.output} ({len(table)} pontos, {len(scores)} emails)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
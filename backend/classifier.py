@@ -5,17 +5,30 @@ Email Classifier
 Sistema de classificação de emails usando NLP e IA
 """
 
+import os
 import re
 import time
 import logging
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 import nltk
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer, WordNetLemmatizer
 from nltk.tokenize import word_tokenize, sent_tokenize
 import PyPDF2
 import io
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from language import ENGLISH, SUPPORTED_LANGUAGES, get_detector, get_pipeline
+from keyword_table import KeywordTable
+from lemma_table import load_lemma_table
+from calibration import load_calibration_table
+from reputation import SenderReputation, parse_sender
+from email_context import extract_context
+from online_learning import OnlineLearner, online_learning_available
+
 # Download NLTK data (executar apenas uma vez)
 try:
     nltk.data.find('tokenizers/punkt')
@@ -32,27 +45,93 @@ try:
 except LookupError:
     nltk.download('wordnet')
 
+try:
+    nltk.data.find('stemmers/rslp')
+except LookupError:
+    nltk.download('rslp')
+
 logger = logging.getLogger(__name__)
 
+# Níveis de detalhamento do resultado da classificação
+DETAIL_NONE = 'none'          # apenas categoria e confiança
+DETAIL_SUMMARY = 'summary'    # pontuações por categoria e padrões
+DETAIL_FULL = 'full'          # resumo + posição de cada palavra-chave encontrada
+DETAIL_LEVELS = (DETAIL_NONE, DETAIL_SUMMARY, DETAIL_FULL)
+
+# Peso de uma correção do usuário na reputação do remetente (classificações valem 1)
+FEEDBACK_REPUTATION_WEIGHT = 5.0
+
+
+def _freeze_groups(groups: Dict[str, List[str]]) -> Mapping[str, Tuple[str, ...]]:
+    """Grupos de palavras-chave em estrutura somente leitura"""
+    return MappingProxyType({name: tuple(keywords) for name, keywords in groups.items()})
+
+
 class EmailClassifier:
     """
     Classe principal para classificação de emails
+
+    Uma instância é compartilhada por todas as threads do servidor: as
+    estruturas montadas no __init__ (palavras-chave, pesos, tabelas,
+    pipelines) são somente leitura e os corpora do NLTK são carregados no
+    aquecimento; o estado de cada classificação fica em variáveis locais.
+    Reputação e modelo de feedback têm sincronização própria.
     """
     
-    def __init__(self):
-        """Inicializar o classificador"""
-        self.stemmer = PorterStemmer()
-        self.lemmatizer = WordNetLemmatizer()
+    def __init__(self, warmup: bool = True, lemma_table_path: Optional[str] = None,
+                 calibration_path: Optional[str] = None, reputation: Optional[SenderReputation] = None,
+                 learner: Optional[OnlineLearner] = None):
+        """
+        Inicializar o classificador
         
-        # Carregar stop words em português e inglês
-        try:
-            self.stop_words = set(stopwords.words('portuguese') + stopwords.words('english'))
-        except:
-            # Fallback para inglês se português não estiver disponível
-            self.stop_words = set(stopwords.words('english'))
+        Args:
+            warmup: Carregar os recursos preguiçosos do NLTK já na inicialização
+                    (desligar só em ferramentas de uma thread: o primeiro
+                    carregamento do WordNet não é thread-safe)
+            lemma_table_path: Tabela de lemas pré-computada (padrão: LEMMA_TABLE_PATH);
+                              quando informada, o WordNet não é carregado
+            calibration_path: Tabela de calibração da confiança (padrão:
+                              CALIBRATION_TABLE_PATH); sem ela, a confiança
+                              usa a fórmula linear
+            reputation: Tabela de reputação de remetentes (padrão: criada
+                        apenas com REPUTATION_ENABLED=True, com snapshot em
+                        REPUTATION_SNAPSHOT_PATH, se definido)
+            learner: Modelo treinado com as correções dos usuários (padrão:
+                     criado apenas com ONLINE_LEARNING_ENABLED=True, com
+                     snapshot em ONLINE_MODEL_PATH, se definido)
+        """
+        # Detector de idioma e pipelines (stop words + stemmer) por idioma
+        self.language_detector = get_detector()
+        self.pipelines = MappingProxyType({language: get_pipeline(language) for language in SUPPORTED_LANGUAGES})
+        
+        lemma_table_path = lemma_table_path or os.getenv('LEMMA_TABLE_PATH')
+        if lemma_table_path:
+            lemma_table = load_lemma_table(lemma_table_path)
+            for pipeline in self.pipelines.values():
+                pipeline.use_lemma_table(lemma_table)
+            logger.info(f"Tabela de lemas carregada: {len(lemma_table)} entradas")
+        
+        # Calibração offline final_score -> probabilidade (ver calibration.py)
+        self.calibration = None
+        calibration_path = calibration_path or os.getenv('CALIBRATION_TABLE_PATH')
+        if calibration_path:
+            self.calibration = load_calibration_table(calibration_path)
+            logger.info(f"Tabela de calibração carregada: {len(self.calibration)} pontos ({self.calibration.method})")
+        
+        # Reputação de remetentes (prior da pontuação), opcional: aprende a cada classificação
+        if reputation is None and os.getenv('REPUTATION_ENABLED', 'False').lower() == 'true':
+            reputation = SenderReputation(os.getenv('REPUTATION_SNAPSHOT_PATH'))
+        self.reputation = reputation
+        
+        # Aprendizado online a partir das correções enviadas em /feedback, opcional:
+        # qualquer cliente da API pode enviar correções e mover a pontuação de todos
+        if (learner is None and online_learning_available()
+                and os.getenv('ONLINE_LEARNING_ENABLED', 'False').lower() == 'true'):
+            learner = OnlineLearner(self.feedback_tokens, os.getenv('ONLINE_MODEL_PATH'))
+        self.learner = learner
         
         # Palavras-chave para classificação
-        self.productive_keywords = {
+        self.productive_keywords = _freeze_groups({
             'trabalho': ['reunião', 'projeto', 'cliente', 'negócio', 'estratégia', 'deadline', 
                         'relatório', 'apresentação', 'planejamento', 'objetivo', 'meta', 'resultado',
                         'análise', 'desenvolvimento', 'implementação', 'cooperação', 'colaboração',
@@ -62,9 +141,9 @@ class EmailClassifier:
                            'certificação', 'especialização', 'graduação', 'pós-graduação'],
             'comercial': ['venda', 'compra', 'produto', 'serviço', 'preço', 'desconto', 'oferta',
                          'promoção', 'marketing', 'publicidade', 'campanha', 'mercado', 'concorrência']
-        }
+        })
         
-        self.unproductive_keywords = {
+        self.unproductive_keywords = _freeze_groups({
             'spam': ['corrente', 'sorte', 'loteria', 'herança', 'prêmio', 'ganhe', 'grátis', 'urgente',
                     'limitado', 'exclusivo', 'confidencial', 'secreto', 'oportunidade única'],
             'corrente': ['fwd:', 'reencaminhar', 'encaminhar', 'passe adiante', 'envie para', 
@@ -73,10 +152,51 @@ class EmailClassifier:
                                   'não perca', 'garantido', '100% seguro', 'sem risco'],
             'phishing': ['verificar conta', 'atualizar dados', 'confirmar identidade', 'segurança',
                         'suspensão', 'bloqueio', 'acesso restrito', 'clique aqui']
-        }
+        })
+        
+        # Formas em inglês das palavras-chave (tabela do pipeline inglês): casam
+        # como a palavra-chave em português, que continua sendo o tópico da resposta
+        self.keyword_variants = MappingProxyType({
+            ENGLISH: _freeze_groups({
+                'reunião': ['meeting'], 'projeto': ['project'], 'cliente': ['client', 'customer'],
+                'negócio': ['business'], 'estratégia': ['strategy'], 'relatório': ['report'],
+                'apresentação': ['presentation'], 'planejamento': ['planning'],
+                'objetivo': ['objective', 'goal'], 'meta': ['target'], 'resultado': ['result'],
+                'análise': ['analysis'], 'desenvolvimento': ['development'],
+                'implementação': ['implementation'], 'cooperação': ['cooperation'],
+                'colaboração': ['collaboration'], 'parceria': ['partnership'], 'contrato': ['contract'],
+                'proposta': ['proposal'], 'orçamento': ['budget'], 'cronograma': ['schedule', 'timeline'],
+                'equipe': ['team'],
+                'curriculum': ['resume'], 'entrevista': ['interview'], 'vaga': ['job opening', 'position'],
+                'emprego': ['job', 'employment'], 'carreira': ['career'], 'formação': ['education'],
+                'experiência': ['experience'], 'competência': ['competence'], 'habilidade': ['skill'],
+                'treinamento': ['training'], 'certificação': ['certification'],
+                'especialização': ['specialization'], 'graduação': ['degree'],
+                'pós-graduação': ['postgraduate'],
+                'venda': ['sale'], 'compra': ['purchase'], 'produto': ['product'], 'serviço': ['service'],
+                'preço': ['price'], 'desconto': ['discount'], 'oferta': ['offer'], 'promoção': ['promotion'],
+                'publicidade': ['advertising'], 'campanha': ['campaign'], 'mercado': ['market'],
+                'concorrência': ['competition'],
+                'corrente': ['chain letter'], 'sorte': ['luck'], 'loteria': ['lottery'],
+                'herança': ['inheritance'], 'prêmio': ['prize'], 'ganhe': ['win'], 'grátis': ['free'],
+                'urgente': ['urgent'], 'limitado': ['limited'], 'exclusivo': ['exclusive'],
+                'confidencial': ['confidential'], 'secreto': ['secret'],
+                'oportunidade única': ['unique opportunity', 'once in a lifetime'],
+                'encaminhar': ['forward'], 'passe adiante': ['pass it on'], 'envie para': ['send to'],
+                'reze por': ['pray for'], 'bênção': ['blessing'], 'maldição': ['curse'],
+                '7 dias': ['7 days'], '24 horas': ['24 hours'],
+                'promoção imperdível': ['unmissable deal'], 'oferta limitada': ['limited offer', 'limited time offer'],
+                'última chance': ['last chance'], 'não perca': ['do not miss', "don't miss"],
+                'garantido': ['guaranteed'], '100% seguro': ['100% safe'], 'sem risco': ['risk free', 'no risk'],
+                'verificar conta': ['verify your account'], 'atualizar dados': ['update your information'],
+                'confirmar identidade': ['confirm your identity'], 'segurança': ['security'],
+                'suspensão': ['suspension', 'suspended'], 'bloqueio': ['blocked', 'locked'],
+                'acesso restrito': ['restricted access'], 'clique aqui': ['click here']
+            })
+        })
         
         # Pesos para diferentes tipos de palavras-chave
-        self.keyword_weights = {
+        self.keyword_weights = MappingProxyType({
             'trabalho': 2.0,
             'profissional': 1.5,
             'comercial': 1.0,
@@ -84,10 +204,61 @@ class EmailClassifier:
             'corrente': -1.5,
             'marketing_agressivo': -1.0,
             'phishing': -2.5
-        }
+        })
+        
+        # Tabelas de palavras-chave normalizadas por idioma (mesma normalização da
+        # sequência de tokens do email, com stop words e números)
+        all_keywords = {**self.productive_keywords, **self.unproductive_keywords}
+        self.keyword_tables = MappingProxyType({
+            language: KeywordTable(
+                all_keywords,
+                lambda keyword, language=language: self.tokenize_sequence(self.preprocess_text(keyword), language)[1],
+                self.keyword_variants.get(language)
+            )
+            for language in self.pipelines
+        })
+        
+        self.warmup_time = None
+        if warmup:
+            self.warmup()
         
         logger.info("EmailClassifier inicializado com sucesso")
     
+    def warmup(self) -> float:
+        """
+        Carregar antecipadamente os recursos do NLTK (punkt, regras dos
+        stemmers, WordNet), evitando a latência na primeira requisição
+        
+        Returns:
+            Tempo de aquecimento em segundos
+        """
+        start_time = time.time()
+        
+        word_tokenize('warm up')
+        for pipeline in self.pipelines.values():
+            pipeline.warmup()
+        
+        self.warmup_time = time.time() - start_time
+        logger.info(f"Aquecimento concluído em {self.warmup_time:.3f}s")
+        return self.warmup_time
+    
+    def state_version(self) -> str:
+        """
+        Versão do estado aprendido em runtime (reputação e modelo de feedback)
+        
+        O mesmo conteúdo só produz o mesmo resultado enquanto ela não muda.
+        Esse estado é de cada processo, então a versão inclui o pid assim que
+        houver algo aprendido.
+        
+        Returns:
+            Identificador da versão ('0' sem estado aprendido)
+        """
+        reputation = self.reputation.version if self.reputation is not None else 0
+        learner = self.learner.version if self.learner is not None else 0
+        if not reputation and not learner:
+            return '0'
+        return f'{os.getpid()}.{reputation}.{learner}'
+    
     def extract_pdf_text(self, filepath: str) -> str:
         """
         Extrair texto de arquivo PDF
@@ -100,15 +271,30 @@ class EmailClassifier:
         """
         try:
             with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                logger.info(f"Texto extraído do PDF: {len(text)} caracteres")
-                return text.strip()
-                
+                return self.extract_pdf_text_from_stream(file)
+        except OSError as e:
+            logger.error(f"Erro ao extrair texto do PDF: {str(e)}")
+            raise Exception(f"Não foi possível extrair texto do PDF: {str(e)}")
+    
+    def extract_pdf_text_from_stream(self, stream) -> str:
+        """
+        Extrair texto de um PDF a partir de um arquivo binário aberto
+        (ex.: o fluxo de um upload, sem gravação em disco)
+        
+        Args:
+            stream: Arquivo binário com o PDF
+            
+        Returns:
+            Texto extraído do PDF
+        """
+        try:
+            pdf_reader = PyPDF2.PdfReader(stream)
+            pages = [page.extract_text() for page in pdf_reader.pages]
+            text = "\n".join(pages)
+            
+            logger.info(f"Texto extraído do PDF: {len(text)} caracteres")
+            return text.strip()
+            
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF: {str(e)}")
             raise Exception(f"Não foi possível extrair texto do PDF: {str(e)}")
@@ -126,74 +312,170 @@ class EmailClassifier:
         # Converter para minúsculas
         text = text.lower()
         
-        # Remover caracteres especiais e números
+        # Remover caracteres especiais e separar números das palavras
+        # (números não viram tokens limpos, mas fazem parte de frases como '7 dias')
         text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\d+', ' ', text)
+        text = re.sub(r'(\d+)', r' \1 ', text)
         
         # Remover espaços extras
         text = re.sub(r'\s+', ' ', text).strip()
         
         return text
     
-    def tokenize_and_clean(self, text: str) -> list:
+    def detect_language(self, text: str) -> str:
+        """
+        Detectar o idioma do email
+        
+        Args:
+            text: Texto original ou pré-processado
+            
+        Returns:
+            Nome do idioma (portuguese/english)
+        """
+        return self.language_detector.detect(text)
+    
+    def tokenize_and_clean(self, text: str, language: Optional[str] = None) -> list:
         """
         Tokenizar e limpar texto
         
         Args:
             text: Texto pré-processado
+            language: Idioma do texto (detectado se não informado)
             
         Returns:
             Lista de tokens limpos
         """
+        pipeline = self.pipelines[language or self.detect_language(text)]
+        
         # Tokenizar
         tokens = word_tokenize(text)
         
-        # Remover stop words e aplicar stemming
-        cleaned_tokens = []
-        for token in tokens:
-            if token not in self.stop_words and len(token) > 2:
-                # Aplicar stemming
-                stemmed = self.stemmer.stem(token)
-                # Aplicar lemmatização
-                lemmatized = self.lemmatizer.lemmatize(stemmed)
-                cleaned_tokens.append(lemmatized)
-        
-        return cleaned_tokens
+        # Remover stop words e aplicar stemming/lemmatização do idioma
+        return [pipeline.normalize(token) for token in pipeline.filter_tokens(tokens)]
     
-    def calculate_keyword_score(self, tokens: list) -> Dict[str, float]:
+    def tokenize_sequence(self, text: str, language: Optional[str] = None) -> Tuple[List[str], List[str]]:
         """
-        Calcular pontuação baseada em palavras-chave
+        Tokenizar e limpar texto, mantendo também a sequência completa
         
         Args:
-            tokens: Lista de tokens limpos
+            text: Texto pré-processado
+            language: Idioma do texto (detectado se não informado)
             
         Returns:
-            Dicionário com pontuações por categoria
+            (tokens limpos, sequência normalizada com stop words e números),
+            a sequência é a entrada do casamento de palavras-chave
+        """
+        pipeline = self.pipelines[language or self.detect_language(text)]
+        return pipeline.clean_tokens(word_tokenize(text))
+    
+    def tokenize_and_clean_batch(self, texts: List[str],
+                                 languages: List[str]) -> List[Tuple[List[str], List[str]]]:
         """
-        scores = {}
+        Tokenizar e limpar vários textos de uma vez
         
-        # Inicializar pontuações
-        for category in self.productive_keywords.keys():
-            scores[category] = 0.0
+        Os tokens de todos os textos de um idioma viram ids inteiros de um
+        vocabulário: a máscara de stop words e tokens curtos é calculada e
+        cada token distinto é normalizado uma única vez, e os resultados são
+        expandidos pelos ids. Um array de strings '<U' teria a largura do
+        maior token em todos os elementos.
         
-        for category in self.unproductive_keywords.keys():
-            scores[category] = 0.0
+        Args:
+            texts: Textos pré-processados
+            languages: Idioma de cada texto
+            
+        Returns:
+            (tokens limpos, sequência completa) de cada texto, na ordem dos
+            textos (ver tokenize_sequence)
+        """
+        if np is None:
+            return [self.tokenize_sequence(text, language) for text, language in zip(texts, languages)]
+        
+        results: List[Tuple[List[str], List[str]]] = [([], []) for _ in texts]
         
-        # Calcular pontuações
-        for token in tokens:
-            # Verificar palavras-chave produtivas
-            for category, keywords in self.productive_keywords.items():
-                for keyword in keywords:
-                    if keyword in token or token in keyword:
-                        scores[category] += self.keyword_weights[category]
+        by_language: Dict[str, List[int]] = {}
+        for index, language in enumerate(languages):
+            by_language.setdefault(language, []).append(index)
+        
+        for language, indexes in by_language.items():
+            pipeline = self.pipelines[language]
+            token_lists = [word_tokenize(texts[index]) for index in indexes]
+            
+            # Id de cada token no vocabulário (por ordem de primeira ocorrência)
+            vocabulary: Dict[str, int] = {}
+            ids = np.fromiter((vocabulary.setdefault(token, len(vocabulary))
+                               for token_list in token_lists for token in token_list), dtype=np.int64)
+            if not len(ids):
+                continue
             
-            # Verificar palavras-chave improdutivas
-            for category, keywords in self.unproductive_keywords.items():
-                for keyword in keywords:
-                    if keyword in token or token in keyword:
-                        scores[category] += self.keyword_weights[category]
+            # Máscara e normalização por token distinto
+            words = np.array(list(vocabulary), dtype=object)
+            keep_word = pipeline.keep_mask(words)
+            normalized = np.array([pipeline.normalize(word) if kept else word
+                                   for word, kept in zip(words.tolist(), keep_word.tolist())], dtype=object)
+            
+            # Expandir pelos ids; tokens descartados ficam como estão na sequência
+            keep = keep_word[ids]
+            kept_before = np.concatenate(([0], np.cumsum(keep)))
+            ends = np.cumsum([len(token_list) for token_list in token_lists])
+            cleaned = normalized[ids[keep]].tolist()
+            sequence = normalized[ids].tolist()
+            
+            start = 0
+            for index, end in zip(indexes, ends.tolist()):
+                results[index] = (cleaned[kept_before[start]:kept_before[end]], sequence[start:end])
+                start = end
         
-        return scores
+        return results
+    
+    def feedback_tokens(self, email_content: str) -> List[str]:
+        """
+        Tokens normalizados usados como atributos do modelo de feedback
+        
+        Args:
+            email_content: Conteúdo do email
+            
+        Returns:
+            Lista de tokens limpos
+        """
+        processed_text = self.preprocess_text(email_content)
+        return self.tokenize_and_clean(processed_text, self.detect_language(processed_text))
+    
+    def record_feedback(self, email_content: str, category: str) -> bool:
+        """
+        Registrar a categoria correta informada pelo usuário
+        
+        A reputação do remetente é atualizada na hora (com peso maior que o
+        de uma classificação); o modelo de feedback é treinado em segundo plano.
+        
+        Args:
+            email_content: Conteúdo do email
+            category: Categoria correta (produtivo/improdutivo)
+            
+        Returns:
+            False se a correção não pôde ser enfileirada para treino
+        """
+        productive = category == 'produtivo'
+        if self.reputation is not None:
+            self.reputation.update(parse_sender(email_content), productive, FEEDBACK_REPUTATION_WEIGHT)
+        if self.learner is not None:
+            return self.learner.submit(email_content, productive)
+        return True
+    
+    def calculate_keyword_score(self, tokens: list, language: Optional[str] = None) -> Dict[str, float]:
+        """
+        Calcular pontuação baseada em palavras-chave
+        
+        Args:
+            tokens: Sequência de tokens normalizados (ver tokenize_sequence)
+            language: Idioma usado na normalização dos tokens
+            
+        Returns:
+            Dicionário com pontuações por categoria
+        """
+        language = language or self.detect_language(' '.join(tokens))
+        
+        # Termos e frases (n-gramas de tokens) via busca em dicionário
+        return self.keyword_tables[language].score(tokens, self.keyword_weights)
     
     def analyze_text_patterns(self, text: str) -> Dict[str, float]:
         """
@@ -243,12 +525,14 @@ class EmailClassifier:
         
         return patterns
     
-    def classify_email(self, email_content: str) -> Dict[str, Any]:
+    def classify_email(self, email_content: str, detail: str = DETAIL_SUMMARY) -> Dict[str, Any]:
         """
         Classificar email como produtivo ou improdutivo
         
         Args:
             email_content: Conteúdo do email
+            detail: Nível de detalhamento da análise (none/summary/full);
+                    'none' não monta as estruturas de explicação
             
         Returns:
             Dicionário com resultado da classificação
@@ -256,31 +540,118 @@ class EmailClassifier:
         start_time = time.time()
         
         try:
+            # Remetente do cabeçalho: o conteúdo vem do usuário, então a
+            # reputação só entra como prior limitado, nunca decide sozinha
+            sender = parse_sender(email_content) if self.reputation is not None else None
+            
             # Pré-processar texto
             processed_text = self.preprocess_text(email_content)
             
-            # Tokenizar e limpar
-            tokens = self.tokenize_and_clean(processed_text)
-            
-            # Calcular pontuação de palavras-chave
-            keyword_scores = self.calculate_keyword_score(tokens)
+            # Detectar idioma para escolher o pipeline
+            language = self.detect_language(processed_text)
             
-            # Analisar padrões
-            pattern_scores = self.analyze_text_patterns(email_content)
+            # Tokenizar e limpar
+            tokens, sequence = self.tokenize_sequence(processed_text, language)
             
-            # Calcular pontuação total
-            total_productive = sum(score for category, score in keyword_scores.items() 
-                                 if category in self.productive_keywords)
-            total_unproductive = sum(score for category, score in keyword_scores.items() 
-                                   if category in self.unproductive_keywords)
+            return self._classify_tokens(email_content, tokens, sequence, language, detail,
+                                         time.time() - start_time, sender)
             
-            # Adicionar pontuações de padrões
-            pattern_bonus = sum(pattern_scores.values())
+        except Exception as e:
+            logger.error(f"Erro na classificação: {str(e)}")
+            return self._fallback_result(e, detail)
+    
+    def classify_batch(self, emails: List[str], detail: str = DETAIL_SUMMARY) -> List[Dict[str, Any]]:
+        """
+        Classificar vários emails de uma vez
+        
+        A filtragem de tokens roda vetorizada sobre todo o lote e cada token
+        distinto é normalizado uma única vez (ver tokenize_and_clean_batch).
+        
+        Args:
+            emails: Conteúdos dos emails
+            detail: Nível de detalhamento da análise (none/summary/full)
             
-            # Pontuação final
-            final_score = total_productive + total_unproductive + pattern_bonus
+        Returns:
+            Resultados na mesma ordem dos emails
+        """
+        if not emails:
+            return []
+        
+        start_time = time.time()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(emails)
+        try:
+            senders = [parse_sender(email) if self.reputation is not None else None for email in emails]
+            processed_texts = [self.preprocess_text(email) for email in emails]
+            languages = [self.detect_language(text) for text in processed_texts]
+            token_lists = self.tokenize_and_clean_batch(processed_texts, languages)
+        except Exception as e:
+            logger.error(f"Erro na classificação em lote: {str(e)}")
+            return [self.classify_email(email, detail) for email in emails]
+        
+        # Tempo do pré-processamento rateado entre os emails
+        elapsed = (time.time() - start_time) / len(emails)
+        
+        for index, ((tokens, sequence), language) in enumerate(zip(token_lists, languages)):
+            try:
+                results[index] = self._classify_tokens(emails[index], tokens, sequence, language, detail,
+                                                       elapsed, senders[index])
+            except Exception as e:
+                logger.error(f"Erro na classificação: {str(e)}")
+                results[index] = self._fallback_result(e, detail)
+        return results
+    
+    def _classify_tokens(self, email_content: str, tokens: List[str], sequence: List[str], language: str,
+                         detail: str, elapsed: float = 0.0, sender: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pontuar os tokens já normalizados e montar o resultado
+        
+        Args:
+            email_content: Conteúdo original (análise de padrões)
+            tokens: Tokens normalizados (modelo de feedback)
+            sequence: Sequência completa (casamento de palavras-chave)
+            language: Idioma detectado
+            detail: Nível de detalhamento da análise
+            elapsed: Tempo já gasto com o email (pré-processamento)
+            sender: Remetente do email (reputação como prior)
             
-            # Determinar categoria
+        Returns:
+            Dicionário com resultado da classificação
+        """
+        start_time = time.time()
+        
+        # Analisar padrões
+        pattern_scores = self.analyze_text_patterns(email_content)
+        # Termos aprendidos em runtime (fora do ajuste da calibração)
+        learned = 0.0
+        if sender is not None:
+            pattern_scores['sender_reputation'] = round(self.reputation.prior(sender), 3)
+            learned += pattern_scores['sender_reputation']
+        if self.learner is not None:
+            adjustment = self.learner.score(tokens)
+            if adjustment is not None:
+                pattern_scores['feedback_model'] = round(adjustment, 3)
+                learned += pattern_scores['feedback_model']
+        pattern_bonus = sum(pattern_scores.values())
+        
+        if detail == DETAIL_NONE:
+            # Caminho rápido: apenas a soma dos pesos
+            keyword_total = self.keyword_tables[language].total_score(sequence, self.keyword_weights)
+        else:
+            # Calcular pontuação de palavras-chave por categoria
+            keyword_scores = self.calculate_keyword_score(sequence, language)
+            keyword_total = sum(keyword_scores.values())
+        
+        # Pontuação final
+        final_score = keyword_total + pattern_bonus
+        
+        # Determinar categoria
+        if self.calibration is not None:
+            # Probabilidade calibrada de ser produtivo: a tabela foi ajustada sem
+            # os termos aprendidos, que entram como deslocamento do log-odds
+            probability = self.calibration.probability(final_score - learned, learned)
+            category = 'produtivo' if probability >= 0.5 else 'improdutivo'
+            confidence = max(probability, 1 - probability)
+        else:
             if final_score > 0:
                 category = 'produtivo'
                 confidence = min(0.95, 0.7 + (final_score * 0.1))
@@ -290,35 +661,54 @@ class EmailClassifier:
             
             # Garantir confiança mínima
             confidence = max(0.6, confidence)
-            
-            processing_time = time.time() - start_time
-            
-            result = {
-                'category': category,
-                'confidence': round(confidence, 3),
-                'processing_time': round(processing_time, 3),
-                'model_used': 'rule_based_nlp',
-                'analysis': {
-                    'keyword_scores': keyword_scores,
-                    'pattern_scores': pattern_scores,
-                    'final_score': round(final_score, 3),
-                    'tokens_analyzed': len(tokens)
-                }
-            }
-            
-            logger.info(f"Email classificado como {category} com confiança {confidence:.3f}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Erro na classificação: {str(e)}")
-            # Retornar classificação padrão em caso de erro
-            return {
-                'category': 'produtivo',
-                'confidence': 0.6,
-                'processing_time': 0.0,
-                'model_used': 'fallback',
-                'analysis': {'error': str(e)}
+        
+        # Personalização da resposta: remetente, assunto e tópico (só para produtivos)
+        topic = None
+        if category == 'produtivo':
+            topic = self.keyword_tables[language].topic(sequence, self.productive_keywords)
+        
+        processing_time = elapsed + time.time() - start_time
+        
+        result = {
+            'category': category,
+            'confidence': round(confidence, 3),
+            'processing_time': round(processing_time, 3),
+            'model_used': 'rule_based_nlp',
+            'context': extract_context(email_content, topic)
+        }
+        
+        if detail != DETAIL_NONE:
+            result['analysis'] = {
+                'keyword_scores': keyword_scores,
+                'pattern_scores': pattern_scores,
+                'final_score': round(final_score, 3),
+                'tokens_analyzed': len(tokens),
+                'language': language
             }
+        
+        if detail == DETAIL_FULL:
+            result['analysis']['keyword_matches'] = [
+                {'position': position, 'token': sequence[position], 'category': category_name, 'keyword': keyword}
+                for position, category_name, keyword in self.keyword_tables[language].iter_matches(sequence)
+            ]
+        
+        if sender is not None:
+            self.reputation.update(sender, category == 'produtivo')
+        
+        logger.info(f"Email classificado como {category} com confiança {confidence:.3f}")
+        return result
+    
+    def _fallback_result(self, error: Exception, detail: str) -> Dict[str, Any]:
+        """Classificação padrão em caso de erro"""
+        result = {
+            'category': 'produtivo',
+            'confidence': 0.6,
+            'processing_time': 0.0,
+            'model_used': 'fallback'
+        }
+        if detail != DETAIL_NONE:
+            result['analysis'] = {'error': str(error)}
+        return result
     
     def check_models_status(self) -> Dict[str, Any]:
         """
@@ -333,9 +723,20 @@ class EmailClassifier:
                     'nltk': 'loaded',
                     'stopwords': 'available',
                     'stemmer': 'available',
-                    'lemmatizer': 'available'
+                    'lemmatizer': 'lemma_table' if any(
+                        pipeline.lemma_table is not None for pipeline in self.pipelines.values()
+                    ) else 'available',
+                    'language_detector': 'available',
+                    'pipelines': {
+                        language: type(pipeline.stemmer).__name__
+                        for language, pipeline in self.pipelines.items()
+                    }
                 },
                 'classification_model': 'rule_based_nlp',
+                'calibration': self.calibration.method if self.calibration is not None else 'linear',
+                'sender_reputation': self.reputation.get_stats() if self.reputation is not None else None,
+                'online_learning': self.learner.get_stats() if self.learner is not None else None,
+                'warmup_time': round(self.warmup_time, 3) if self.warmup_time is not None else None,
                 'status': 'operational'
             }
         except Exception as e:
@@ -361,7 +762,8 @@ class EmailClassifier:
                     'Processamento de texto',
                     'Análise de padrões',
                     'Stemming e lemmatização',
-                    'Remoção de stop words'
+                    'Remoção de stop words',
+                    'Detecção de idioma (n-gramas de caracteres)'
                 ],
                 'performance': {
                     'accuracy': '85-90%',
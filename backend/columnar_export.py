@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar Export
+Acúmulo de resultados de classificação em colunas e gravação em
+Parquet/Feather para análise em larga escala
+"""
+
+import array
+import logging
+from typing import Any, Dict, List, Optional
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+# Categorias fixas: todas as partes compartilham o mesmo dicionário
+CATEGORIES = ('produtivo', 'improdutivo')
+
+SCORE_PREFIX = 'score_'
+
+
+def columnar_export_available() -> bool:
+    """Se pandas e pyarrow (motor de Parquet/Feather) estão instalados"""
+    return pd is not None and pyarrow is not None
+
+
+class ColumnarResults:
+    """
+    Resultados em colunas de largura fixa
+
+    Confiança e pontuações ficam em arrays float32 e a categoria em códigos
+    int8, evitando um dicionário por email; o DataFrame só é montado na
+    gravação.
+    """
+
+    def __init__(self, score_categories: Optional[List[str]] = None):
+        """
+        Args:
+            score_categories: Categorias de palavras-chave com coluna própria
+                              (None grava apenas categoria e confiança)
+        """
+        if not columnar_export_available():
+            raise RuntimeError("Exportação colunar requer pandas e pyarrow (pip install -r requirements.txt)")
+
+        self.score_categories = list(score_categories or [])
+        self.clear()
+
+    def clear(self):
+        """Descartar as linhas acumuladas"""
+        self.ids: List[str] = []
+        self.category_codes = array.array('b')
+        self.confidence = array.array('f')
+        self.final_score = array.array('f')
+        self.scores = {category: array.array('f') for category in self.score_categories}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, record_id: str, result: Dict[str, Any]):
+        """
+        Acrescentar o resultado de uma classificação
+
+        Args:
+            record_id: Identificador do email
+            result: Resultado de EmailClassifier.classify_email (com 'analysis'
+                    quando há colunas de pontuação)
+        """
+        self.ids.append(record_id)
+        self.category_codes.append(CATEGORIES.index(result['category']))
+        self.confidence.append(result['confidence'])
+
+        if self.score_categories:
+            analysis = result.get('analysis', {})
+            keyword_scores = analysis.get('keyword_scores', {})
+            self.final_score.append(analysis.get('final_score', float('nan')))
+            for category, column in self.scores.items():
+                column.append(keyword_scores.get(category, float('nan')))
+
+    def to_dataframe(self):
+        """
+        Montar o DataFrame sem cópias por linha
+
+        Returns:
+            DataFrame com id, category (categórica), confidence (float32) e,
+            opcionalmente, final_score e score_<categoria> (float32)
+        """
+        data = {
+            'id': pd.array(self.ids, dtype='string'),
+            'category': pd.Categorical.from_codes(self.category_codes, categories=CATEGORIES),
+            'confidence': pd.array(self.confidence, dtype='float32')
+        }
+        if self.score_categories:
+            data['final_score'] = pd.array(self.final_score, dtype='float32')
+            for category, column in self.scores.items():
+                data[f'{SCORE_PREFIX}{category}'] = pd.array(column, dtype='float32')
+        return pd.DataFrame(data)
+
+    def write(self, path: str, fmt: str):
+        """
+        Gravar as linhas acumuladas
+
+        Args:
+            path: Arquivo de saída
+            fmt: 'parquet' ou 'feather'
+        """
+        frame = self.to_dataframe()
+        if fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        elif fmt == 'feather':
+            frame.to_feather(path)
+        else:
+            raise ValueError(f"Formato não suportado: {fmt}")
+        logger.debug(f"{len(frame)} linhas gravadas em {path}")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP Compression
+Descompressão de corpos de requisição (gzip/brotli) com limite de tamanho
+e negociação de compressão das respostas
+"""
+
+import io
+import json
+import zlib
+import gzip
+import logging
+from typing import BinaryIO, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Descompressão brotli com saída limitada (output_buffer_limit, brotli >= 1.1);
+# sem ela um bloco pequeno pode expandir sem limite, então 'br' é recusado
+BROTLI_DECOMPRESSION = brotli is not None and hasattr(brotli.Decompressor, 'can_accept_more_data')
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do corpo comprimido
+CHUNK_SIZE = 64 * 1024
+
+# Respostas menores que isso não compensam a compressão
+COMPRESSION_MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+
+# Chave do environ WSGI com a descompressão adiada pelo middleware
+DEFERRED_BODY_KEY = 'compression.deferred_body'
+
+
+class BodyTooLarge(Exception):
+    """Corpo descomprimido excede o tamanho máximo permitido"""
+
+
+class UnsupportedEncoding(Exception):
+    """Content-Encoding da requisição não suportado"""
+
+
+def supported_encoding(encoding: str) -> bool:
+    """Content-Encoding de requisição que sabemos descomprimir"""
+    return encoding in ('gzip', 'x-gzip', 'deflate') or (encoding == 'br' and BROTLI_DECOMPRESSION)
+
+
+def decompress_stream(stream: BinaryIO, encoding: str, max_size: int,
+                      compressed_length: Optional[int] = None) -> bytes:
+    """
+    Descomprimir um corpo de requisição lendo-o em blocos
+
+    O limite é verificado sobre o tamanho descomprimido a cada bloco, de modo
+    que um corpo malicioso (zip bomb) é rejeitado sem ser expandido por inteiro.
+
+    Args:
+        stream: Fluxo com o corpo comprimido
+        encoding: Valor do Content-Encoding (gzip/deflate/br)
+        max_size: Tamanho máximo do corpo descomprimido em bytes
+        compressed_length: Bytes a ler do fluxo (None lê até o fim)
+
+    Returns:
+        Corpo descomprimido
+    """
+    encoding = encoding.strip().lower()
+
+    if encoding in ('gzip', 'x-gzip'):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        process = decompressor.decompress
+        finished = lambda: decompressor.eof
+    elif encoding == 'deflate':
+        decompressor = zlib.decompressobj()
+        process = decompressor.decompress
+        finished = lambda: decompressor.eof
+    elif encoding == 'br' and BROTLI_DECOMPRESSION:
+        decompressor = brotli.Decompressor()
+
+        def process(chunk: bytes, limit: int) -> bytes:
+            data = decompressor.process(chunk, output_buffer_limit=limit)
+            # Saída cortada no limite: o restante do bloco fica retido no decompressor
+            while len(data) < limit and not decompressor.can_accept_more_data():
+                data += decompressor.process(b'', output_buffer_limit=limit - len(data))
+            return data
+
+        finished = decompressor.is_finished
+    else:
+        raise UnsupportedEncoding(f"Content-Encoding não suportado: {encoding}")
+
+    output = io.BytesIO()
+    remaining = compressed_length
+
+    while remaining is None or remaining > 0:
+        chunk = stream.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+
+        try:
+            # Pedir no máximo um byte além do limite basta para detectar o excesso
+            data = process(chunk, max_size - output.tell() + 1)
+        except Exception as e:
+            raise ValueError(f"Corpo comprimido inválido: {str(e)}")
+
+        output.write(data)
+        if output.tell() > max_size:
+            raise BodyTooLarge(f"Corpo descomprimido excede {max_size} bytes")
+
+    # Fluxo que termina antes do fim do formato (upload interrompido, corpo cortado)
+    if not finished():
+        raise ValueError("Corpo comprimido inválido: fluxo truncado")
+
+    return output.getvalue()
+
+
+def decompress_body(body: bytes, encoding: str, max_size: int) -> bytes:
+    """
+    Descomprimir um corpo já lido em memória
+
+    Args:
+        body: Corpo comprimido
+        encoding: Valor do Content-Encoding
+        max_size: Tamanho máximo do corpo descomprimido em bytes
+
+    Returns:
+        Corpo descomprimido
+    """
+    return decompress_stream(io.BytesIO(body), encoding, max_size, len(body))
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Escolher a codificação da resposta a partir do Accept-Encoding
+
+    Args:
+        accept_encoding: Valor do cabeçalho Accept-Encoding
+
+    Returns:
+        'br', 'gzip' ou None (sem compressão)
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        parts = item.strip().split(';')
+        name = parts[0].strip().lower()
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    def quality_of(name):
+        return accepted.get(name, accepted.get('*', 0.0))
+
+    if brotli is not None and quality_of('br') > 0 and quality_of('br') >= quality_of('gzip'):
+        return 'br'
+    if quality_of('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Comprimir o corpo de uma resposta
+
+    Args:
+        body: Corpo original
+        encoding: 'br' ou 'gzip'
+
+    Returns:
+        Corpo comprimido
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class DecompressionMiddleware:
+    """
+    Middleware WSGI que valida o Content-Encoding da requisição e adia a
+    descompressão
+
+    Aqui só rodam as verificações baratas (codificação suportada, tamanho
+    comprimido, corpo delimitado); o corpo é expandido por
+    decompress_environ, chamada pela aplicação depois do controle de
+    admissão, para que requisições rejeitadas não paguem a descompressão.
+    """
+
+    def __init__(self, app, max_size: int):
+        """
+        Args:
+            app: Aplicação WSGI
+            max_size: Tamanho máximo do corpo descomprimido em bytes
+        """
+        self.app = app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            return self.app(environ, start_response)
+
+        if not supported_encoding(encoding):
+            return self._error(start_response, '415 Unsupported Media Type',
+                               f"Content-Encoding não suportado: {encoding}")
+
+        try:
+            content_length = int(environ.get('CONTENT_LENGTH') or 0) or None
+        except ValueError:
+            return self._error(start_response, '400 Bad Request', 'Content-Length inválido')
+
+        # Sem Content-Length só é seguro ler até o fim se o servidor delimitar a entrada
+        if content_length is None and not environ.get('wsgi.input_terminated'):
+            return self._error(start_response, '411 Length Required',
+                               'Corpo comprimido sem Content-Length não suportado por este servidor')
+
+        # O corpo comprimido também não pode exceder o limite
+        if content_length is not None and content_length > self.max_size:
+            return self._error(start_response, '413 Request Entity Too Large',
+                               'Arquivo muito grande. Tamanho máximo: 10MB')
+
+        environ[DEFERRED_BODY_KEY] = (encoding, content_length, self.max_size)
+        return self.app(environ, start_response)
+
+    @staticmethod
+    def _error(start_response, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        start_response(status, [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Access-Control-Allow-Origin', '*')
+        ])
+        return [body]
+
+
+def decompress_environ(environ) -> Optional[Tuple[int, str]]:
+    """
+    Descomprimir o corpo adiado pelo DecompressionMiddleware
+
+    Substitui wsgi.input e CONTENT_LENGTH pelo corpo descomprimido; sem
+    descompressão pendente, não faz nada. Deve rodar antes de qualquer
+    leitura do corpo.
+
+    Args:
+        environ: Environ WSGI da requisição
+
+    Returns:
+        None ou (status HTTP, mensagem) do erro
+    """
+    deferred = environ.pop(DEFERRED_BODY_KEY, None)
+    if deferred is None:
+        return None
+    encoding, content_length, max_size = deferred
+
+    try:
+        body = decompress_stream(environ['wsgi.input'], encoding, max_size, content_length)
+    except BodyTooLarge:
+        return 413, 'Arquivo muito grande. Tamanho máximo: 10MB'
+    except ValueError as e:
+        return 400, str(e)
+
+    environ['wsgi.input'] = io.BytesIO(body)
+    environ['CONTENT_LENGTH'] = str(len(body))
+    del environ['HTTP_CONTENT_ENCODING']
+    return None
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Corpus Utilities
+Leitura dos emails de exemplo usados em relatórios e ferramentas offline
+"""
+
+import os
+import re
+from typing import List, Tuple
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), '..', 'examples', 'test_emails.txt')
+
+_SECTION_PATTERN = re.compile(r'^=== (.+?) ===$', re.MULTILINE)
+
+
+def load_example_emails(path: str = EXAMPLES_PATH) -> List[Tuple[str, str]]:
+    """
+    Ler o arquivo de emails de exemplo
+
+    Args:
+        path: Caminho do arquivo com seções '=== TÍTULO ==='
+
+    Returns:
+        Lista de tuplas (título da seção, conteúdo do email)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    parts = _SECTION_PATTERN.split(text)
+    # parts = [preâmbulo, título1, corpo1, título2, corpo2, ...]
+    return [
+        (title.strip(), body.strip())
+        for title, body in zip(parts[1::2], parts[2::2])
+        if body.strip()
+    ]
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Differential Test
+Executa a implementação de referência (reference_classifier.py) e o
+EmailClassifier atual sobre um corpus gerado (mutações dos exemplos, casos
+de borda Unicode e corpos de 10 mil caracteres), relata toda diferença de
+tokens, pontuação ou categoria e a aceleração de cada etapa
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import unicodedata
+from typing import Any, Callable, Dict, List, Tuple
+from classifier import EmailClassifier, DETAIL_NONE, DETAIL_SUMMARY
+from corpus import EXAMPLES_PATH, load_example_emails
+from reference_classifier import ReferenceClassifier
+
+# Diferença de pontuação tolerada (somas em ordem diferente)
+SCORE_TOLERANCE = 1e-9
+
+LONG_BODY_SIZE = 10000
+
+# Mudanças intencionais do classificador desde o congelamento da referência,
+# por (etapa, campo): as diferenças continuam relatadas, com o motivo ao lado
+_KEYWORD_PHRASES = ('[user-027] palavras-chave casadas sobre a sequência completa: stop words, '
+                    'tokens curtos e números ficam nas frases (\'envie para\', \'7 dias\'); '
+                    '[user-026] emails em inglês também casam as formas em inglês (keyword_variants)')
+EXPLAINED_CHANGES = {
+    ('preprocess_text', 'processed'): '[user-027] números separados das palavras em vez de removidos',
+    ('calculate_keyword_score', 'keyword_scores'): _KEYWORD_PHRASES,
+    ('classify_email', 'final_score'): _KEYWORD_PHRASES,
+    ('classify_email', 'confidence'): _KEYWORD_PHRASES,
+    ('classify_email', 'category'): _KEYWORD_PHRASES,
+    ('classify_batch', 'confidence'): _KEYWORD_PHRASES,
+    ('classify_batch', 'category'): _KEYWORD_PHRASES,
+}
+
+# Etapas comparadas, na ordem do pipeline
+STAGES = ('preprocess_text', 'tokenize_and_clean', 'calculate_keyword_score', 'analyze_text_patterns')
+
+# Casos de borda Unicode inseridos nos emails
+_UNICODE_CASES = (
+    ('nfd', lambda text: unicodedata.normalize('NFD', text)),
+    ('zero_width', lambda text: text.replace(' ', ' \u200b', 40)),
+    ('nbsp', lambda text: text.replace(' ', '\u00a0')),
+    ('fullwidth', lambda text: ''.join(chr(ord(c) + 0xFEE0) if 'a' <= c <= 'z' else c for c in text[:300]) + text[300:]),
+    ('dotted_i', lambda text: text.replace('i', 'İ', 20)),
+    ('ligatures', lambda text: text.replace('fi', 'ﬁ').replace('ss', 'ß')),
+    ('emoji', lambda text: text.replace('. ', ' 🚀🔥. ').replace('\n', ' 👍\n', 10)),
+    ('mixed_scripts', lambda text: text + '\nПривет мир! Γειά σου κόσμε! مرحبا بالعالم שלום 你好世界'),
+    ('controls', lambda text: text.replace('\n', '\r\n').replace(' ', '\t', 15) + '\x00\x0b\x0c'),
+    ('math_symbols', lambda text: text + ' ℌ𝔢𝔩𝔩𝔬 ①②③ ½ ™ ©'),
+)
+
+
+def _mutations(rng: random.Random) -> List[Tuple[str, Callable[[str], str]]]:
+    """Mutações textuais aplicadas aos exemplos"""
+
+    def shuffle_words(text: str) -> str:
+        words = text.split(' ')
+        rng.shuffle(words)
+        return ' '.join(words)
+
+    def drop_words(text: str) -> str:
+        return ' '.join(word for word in text.split(' ') if rng.random() > 0.2)
+
+    def punctuate(text: str) -> str:
+        return ''.join(c + rng.choice('.,;:!?-/()"\'') if c == ' ' and rng.random() < 0.2 else c for c in text)
+
+    def digits(text: str) -> str:
+        return ' '.join(word + str(rng.randrange(100)) if rng.random() < 0.1 else word for word in text.split(' '))
+
+    def mix_case(text: str) -> str:
+        return ''.join(c.upper() if rng.random() < 0.3 else c for c in text)
+
+    def truncate(text: str) -> str:
+        return text[:rng.randrange(1, max(2, len(text)))]
+
+    return [
+        ('original', lambda text: text),
+        ('upper', str.upper),
+        ('mixed_case', mix_case),
+        ('shuffled', shuffle_words),
+        ('dropped_words', drop_words),
+        ('punctuation', punctuate),
+        ('digits', digits),
+        ('truncated', truncate),
+        ('forwarded', lambda text: f'Fwd: {text}\n\nhttps://exemplo.com/a?b=1 anexo'),
+    ]
+
+
+def build_corpus(path: str, count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Corpus do teste diferencial
+
+    Args:
+        path: Arquivo de emails de exemplo
+        count: Emails gerados por mutações aleatórias (além dos casos fixos)
+        seed: Semente das mutações
+
+    Returns:
+        Lista de (rótulo, conteúdo)
+    """
+    rng = random.Random(seed)
+    examples = [(title, content) for title, content in load_example_emails(path)]
+    mutations = _mutations(rng)
+    corpus = []
+
+    # Casos fixos: cada exemplo com cada mutação e cada caso Unicode
+    for title, content in examples:
+        for name, mutate in mutations:
+            corpus.append((f'{name}: {title}', mutate(content)))
+        for name, mutate in _UNICODE_CASES:
+            corpus.append((f'unicode_{name}: {title}', mutate(content)))
+
+    # Corpos longos: exemplos concatenados até LONG_BODY_SIZE caracteres
+    for index in range(len(examples)):
+        parts = []
+        while sum(len(part) for part in parts) < LONG_BODY_SIZE:
+            parts.append(examples[(index + len(parts)) % len(examples)][1])
+        corpus.append((f'long_{LONG_BODY_SIZE}: {examples[index][0]}', '\n\n'.join(parts)[:LONG_BODY_SIZE]))
+
+    # Extremos
+    corpus.extend([
+        ('empty', ''),
+        ('whitespace', ' \n\t \r\n '),
+        ('punctuation_only', '!!! ??? ... --- ***'),
+        ('digits_only', '123 456 7890 24 7'),
+        ('single_keyword', 'reunião'),
+        ('phrase_boundary', 'clique aqui'),
+    ])
+
+    # Combinações aleatórias de mutações
+    for _ in range(count):
+        title, content = rng.choice(examples)
+        names = []
+        for name, mutate in rng.sample(mutations[1:], 2) + [rng.choice(_UNICODE_CASES)]:
+            content = mutate(content)
+            names.append(name)
+        corpus.append((f"{'+'.join(names)}: {title}", content))
+    return corpus
+
+
+def _scores_differ(first: Dict[str, float], second: Dict[str, float]) -> bool:
+    if first.keys() != second.keys():
+        return True
+    return any(abs(first[key] - second[key]) > SCORE_TOLERANCE for key in first)
+
+
+def compare(reference: Dict[str, Any], live: Dict[str, Any]) -> List[Tuple[str, Any, Any]]:
+    """
+    Campos diferentes entre a referência e o classificador atual
+
+    Returns:
+        Lista de (campo, valor da referência, valor atual)
+    """
+    differences = []
+    for field in ('processed', 'language', 'tokens', 'category', 'confidence'):
+        if field in live and reference[field] != live[field]:
+            differences.append((field, reference[field], live[field]))
+    for field in ('keyword_scores', 'pattern_scores'):
+        if field in live and _scores_differ(reference[field], live[field]):
+            differences.append((field, reference[field], live[field]))
+    # O resultado do classificador arredonda final_score em 3 casas
+    if 'final_score' in live and abs(reference['final_score'] - live['final_score']) > 1e-3:
+        differences.append(('final_score', reference['final_score'], live['final_score']))
+    return differences
+
+
+def _timed(func: Callable[[], Any]) -> Tuple[float, Any]:
+    start_time = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start_time, result
+
+
+def run(reference: ReferenceClassifier, classifier: EmailClassifier,
+        corpus: List[Tuple[str, str]], rounds: int = 1) -> Dict[str, Any]:
+    """
+    Comparar e cronometrar as duas implementações
+
+    Cada etapa recebe as mesmas entradas nas duas implementações (as
+    saídas da referência), para que uma diferença aponte a etapa que a
+    introduziu. A classificação completa (classify_email e classify_batch)
+    é comparada no fim.
+
+    Args:
+        rounds: Repetições da medição de tempo (a comparação usa a última)
+
+    Returns:
+        Relatório com diferenças e tempos
+    """
+    differences = []
+    timings = {stage: {'reference': 0.0, 'live': 0.0} for stage in STAGES + ('classify_email', 'classify_batch')}
+
+    def measure(stage: str, reference_call: Callable[[], Any], live_call: Callable[[], Any]) -> Tuple[Any, Any]:
+        expected = actual = None
+        for _ in range(rounds):
+            elapsed, expected = _timed(reference_call)
+            timings[stage]['reference'] += elapsed
+            elapsed, actual = _timed(live_call)
+            timings[stage]['live'] += elapsed
+        return expected, actual
+
+    def record(index: int, label: str, stage: str, found: List[Tuple[str, Any, Any]]):
+        for field, expected, actual in found:
+            differences.append({'email': index, 'label': label, 'stage': stage, 'field': field,
+                                'reference': expected, 'live': actual,
+                                'explanation': EXPLAINED_CHANGES.get((stage, field))})
+
+    references = []
+    for index, (label, content) in enumerate(corpus):
+        expected, actual = measure('preprocess_text', lambda: reference.preprocess_text(content),
+                                   lambda: classifier.preprocess_text(content))
+        record(index, label, 'preprocess_text', compare({'processed': expected}, {'processed': actual}))
+        processed = expected
+
+        language = reference.detect_language(processed)
+        live_language = classifier.detect_language(processed)
+        record(index, label, 'detect_language', compare({'language': language}, {'language': live_language}))
+
+        expected, actual = measure('tokenize_and_clean', lambda: reference.tokenize_and_clean(processed, language),
+                                   lambda: classifier.tokenize_and_clean(processed, language))
+        record(index, label, 'tokenize_and_clean', compare({'tokens': expected}, {'tokens': actual}))
+        tokens = expected
+
+        expected, actual = measure('calculate_keyword_score',
+                                   lambda: reference.calculate_keyword_score(tokens, language),
+                                   lambda: classifier.calculate_keyword_score(tokens, language))
+        record(index, label, 'calculate_keyword_score',
+               compare({'keyword_scores': expected}, {'keyword_scores': actual}))
+
+        expected, actual = measure('analyze_text_patterns', lambda: reference.analyze_text_patterns(content),
+                                   lambda: classifier.analyze_text_patterns(content))
+        record(index, label, 'analyze_text_patterns',
+               compare({'pattern_scores': expected}, {'pattern_scores': actual}))
+
+        # Classificação completa: pontuação e categoria finais
+        expected, actual = measure('classify_email', lambda: reference.classify(content),
+                                   lambda: classifier.classify_email(content, DETAIL_SUMMARY))
+        references.append(expected)
+        if actual['model_used'] != 'rule_based_nlp':
+            # Erro no pipeline (resultado de fallback)
+            record(index, label, 'classify_email', [('model_used', 'rule_based_nlp', actual['model_used'])])
+            continue
+        live = {'category': actual['category'], 'confidence': actual['confidence'],
+                'final_score': actual['analysis']['final_score']}
+        record(index, label, 'classify_email', compare(expected, live))
+
+    # Caminho em lote (filtragem vetorizada) contra as mesmas referências
+    contents = [content for _, content in corpus]
+    for _ in range(rounds):
+        elapsed, _ = _timed(lambda: [reference.classify(content) for content in contents])
+        timings['classify_batch']['reference'] += elapsed
+        elapsed, batch = _timed(lambda: classifier.classify_batch(contents, DETAIL_NONE))
+        timings['classify_batch']['live'] += elapsed
+    for index, ((label, _), expected, actual) in enumerate(zip(corpus, references, batch)):
+        record(index, label, 'classify_batch',
+               compare(expected, {'category': actual['category'], 'confidence': actual['confidence']}))
+
+    speedups = {}
+    for stage, timing in timings.items():
+        speedups[stage] = {
+            'reference_ms': round(timing['reference'] * 1000 / rounds, 2),
+            'live_ms': round(timing['live'] * 1000 / rounds, 2),
+            'speedup': round(timing['reference'] / timing['live'], 2) if timing['live'] else None
+        }
+
+    return {
+        'emails': len(corpus),
+        'characters': sum(len(content) for content in contents),
+        'differences': differences,
+        'category_differences': sum(1 for difference in differences if difference['field'] == 'category'),
+        'unexplained_differences': sum(1 for difference in differences if difference['explanation'] is None),
+        'timings': speedups
+    }
+
+
+def print_report(report: Dict[str, Any], show: int):
+    """Diferenças encontradas e tabela de tempos"""
+    print(f"\nTeste diferencial: {report['emails']} emails, {report['characters']} caracteres")
+
+    differences = report['differences']
+    by_stage: Dict[str, int] = {}
+    for difference in differences:
+        by_stage[difference['stage']] = by_stage.get(difference['stage'], 0) + 1
+    for difference in differences[:show]:
+        print(f"\n[{difference['stage']}] email {difference['email']} ({difference['label'][:60]}) "
+              f"campo {difference['field']}:")
+        print(f"  referência: {str(difference['reference'])[:300]}")
+        print(f"  atual:      {str(difference['live'])[:300]}")
+        if difference['explanation']:
+            print(f"  motivo:     {difference['explanation']}")
+    if len(differences) > show:
+        print(f"\n... mais {len(differences) - show} diferenças (--show ou --json para ver todas)")
+
+    print(f"\n{'etapa':<24} {'referência ms':>14} {'atual ms':>10} {'aceleração':>11} {'diferenças':>11}")
+    for stage, timing in report['timings'].items():
+        speedup = f"{timing['speedup']}x" if timing['speedup'] is not None else '-'
+        print(f"{stage:<24} {timing['reference_ms']:>14} {timing['live_ms']:>10} {speedup:>11} "
+              f"{by_stage.get(stage, 0):>11}")
+    if by_stage.get('detect_language'):
+        print(f"{'detect_language':<24} {'-':>14} {'-':>10} {'-':>11} {by_stage['detect_language']:>11}")
+
+    explanations: Dict[str, int] = {}
+    for difference in differences:
+        if difference['explanation']:
+            explanations[difference['explanation']] = explanations.get(difference['explanation'], 0) + 1
+    for explanation, count in explanations.items():
+        print(f"\n{count} diferenças explicadas por: {explanation}")
+
+    unexplained = report['unexplained_differences']
+    if unexplained:
+        print(f"\n❌ {unexplained} diferenças sem explicação "
+              f"({len(differences)} no total, {report['category_differences']} de categoria)")
+    elif differences:
+        print(f"\n⚠️  {len(differences)} diferenças, todas de mudanças intencionais "
+              f"({report['category_differences']} de categoria)")
+    else:
+        print("\n✅ Nenhuma diferença: o classificador atual equivale à referência")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Teste diferencial do classificador contra a referência congelada')
+    parser.add_argument('corpus', nargs='?', default=EXAMPLES_PATH, help='Arquivo de emails de exemplo')
+    parser.add_argument('--count', type=int, default=200, help='Emails com mutações aleatórias')
+    parser.add_argument('--seed', type=int, default=0, help='Semente das mutações')
+    parser.add_argument('--rounds', type=int, default=1, help='Repetições da medição de tempo')
+    parser.add_argument('--show', type=int, default=20, help='Diferenças exibidas')
+    parser.add_argument('--json', metavar='ARQUIVO', help='Gravar o relatório completo em JSON')
+    parser.add_argument('--strict', action='store_true',
+                        help='Falhar também nas diferenças explicadas (EXPLAINED_CHANGES)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Uma linha por email classificado encobriria o relatório
+    logging.getLogger('classifier').setLevel(logging.WARNING)
+
+    classifier = EmailClassifier(calibration_path=None)
+    # Só a pontuação por regras é comparada: sem calibração, reputação ou modelo de feedback
+    classifier.calibration = None
+    classifier.reputation = None
+    classifier.learner = None
+    reference = ReferenceClassifier()
+
+    corpus = build_corpus(args.corpus, args.count, args.seed)
+    report = run(reference, classifier, corpus, args.rounds)
+    print_report(report, args.show)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório gravado em {args.json}")
+    failed = report['differences'] if args.strict else report['unexplained_differences']
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
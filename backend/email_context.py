@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Email Context
+Dados usados para personalizar a resposta, extraídos do cabeçalho do
+email durante a classificação: nome do remetente e assunto
+"""
+
+import re
+from typing import Dict, Optional
+
+# Cabeçalhos nas primeiras linhas do email ('De:' / 'From:', 'Assunto:' / 'Subject:')
+_SENDER_PATTERN = re.compile(r'^\s*(?:de|from)\s*:\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+_SUBJECT_PATTERN = re.compile(r'^\s*(?:assunto|subject)\s*:\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+_ADDRESS_PATTERN = re.compile(r'<?\s*([\w.+-]+)@[\w.-]+\s*>?')
+_REPLY_PREFIX_PATTERN = re.compile(r'^(?:(?:re|res|fw|fwd|enc)\s*:\s*)+', re.IGNORECASE)
+_NAME_PATTERN = re.compile(r"[^\W\d_][^\W\d_'-]*")
+_HEADER_SIZE = 1000
+
+# Caracteres removidos dos valores inseridos na resposta
+_STRIPPED_CHARACTERS = str.maketrans({character: ' ' for character in '"\'<>&'})
+
+# Limites dos valores inseridos na resposta
+MAX_NAME_LENGTH = 40
+MAX_SUBJECT_LENGTH = 80
+
+# Caixas genéricas: o endereço não diz o nome de ninguém
+_GENERIC_MAILBOXES = frozenset((
+    'contato', 'contact', 'equipe', 'team', 'rh', 'hr', 'vendas', 'sales', 'suporte', 'support',
+    'info', 'admin', 'noreply', 'no', 'nao', 'newsletter', 'marketing', 'financeiro', 'comercial'
+))
+
+
+def _clean(value: str, limit: int) -> Optional[str]:
+    """
+    Remover aspas, marcação (<, >, &) e espaços extras e limitar o tamanho
+
+    O valor vem do email e vai para a resposta exibida no navegador: sem
+    esses caracteres, não há como ele virar uma tag HTML.
+    """
+    value = ' '.join(value.translate(_STRIPPED_CHARACTERS).split())
+    if not value:
+        return None
+    if len(value) > limit:
+        value = value[:limit - 1].rstrip() + '…'
+    return value
+
+
+def parse_sender_name(email_content: str) -> Optional[str]:
+    """
+    Primeiro nome do remetente
+
+    Usa o nome de exibição ('De: Maria Santos <maria@...>') ou, na falta
+    dele, um endereço no formato nome.sobrenome (caixas genéricas como
+    contato@ ou rh@ não dão nome).
+
+    Args:
+        email_content: Conteúdo do email
+
+    Returns:
+        Primeiro nome ou None
+    """
+    match = _SENDER_PATTERN.search(email_content[:_HEADER_SIZE])
+    if not match:
+        return None
+    header = match.group(1)
+    address = _ADDRESS_PATTERN.search(header)
+
+    display = header[:address.start()] if address else header
+    if ',' in display:
+        # 'Sobrenome, Nome'
+        display = display.split(',', 1)[1]
+    name = _NAME_PATTERN.search(display)
+    if name is None and address is not None:
+        parts = re.split(r'[._-]', address.group(1))
+        if len(parts) >= 2 and parts[0].lower() not in _GENERIC_MAILBOXES:
+            name = _NAME_PATTERN.fullmatch(parts[0])
+    if name is None or name.group(0).lower() in _GENERIC_MAILBOXES:
+        return None
+    first = name.group(0)
+    return _clean(first[:1].upper() + first[1:], MAX_NAME_LENGTH)
+
+
+def parse_subject(email_content: str) -> Optional[str]:
+    """
+    Assunto do email, sem prefixos de resposta/encaminhamento (Re:, Fwd:)
+
+    Args:
+        email_content: Conteúdo do email
+
+    Returns:
+        Assunto ou None
+    """
+    match = _SUBJECT_PATTERN.search(email_content[:_HEADER_SIZE])
+    if not match:
+        return None
+    return _clean(_REPLY_PREFIX_PATTERN.sub('', match.group(1).strip()), MAX_SUBJECT_LENGTH)
+
+
+def extract_context(email_content: str, topic: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Contexto de personalização da resposta
+
+    Args:
+        email_content: Conteúdo do email
+        topic: Tópico detectado pela classificação (palavra-chave mais frequente)
+
+    Returns:
+        {'sender_name', 'subject', 'topic'} (None quando ausente)
+    """
+    return {
+        'sender_name': parse_sender_name(email_content),
+        'subject': parse_subject(email_content),
+        'topic': topic
+    }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classification History
+Histórico das classificações em SQLite, com gravação em lote fora do
+caminho da requisição, busca textual (FTS5) e paginação por chave
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Registros gravados por transação
+WRITE_BATCH_SIZE = 200
+
+# Espera máxima antes de gravar um lote incompleto (segundos)
+FLUSH_INTERVAL = 0.5
+
+# Registros aguardando gravação; além disso novos registros são descartados
+MAX_PENDING = 10000
+
+MAX_PAGE_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    category TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    final_score REAL,
+    scores TEXT,
+    language TEXT,
+    source TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_category ON classifications (category, id);
+CREATE INDEX IF NOT EXISTS idx_classifications_created_at ON classifications (created_at);
+CREATE INDEX IF NOT EXISTS idx_classifications_hash ON classifications (content_hash);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS classifications_fts USING fts5(
+    content, content='classifications', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_COLUMNS = 'c.id, c.created_at, c.content_hash, c.category, c.confidence, c.final_score, c.scores, c.language, c.source'
+
+
+def sqlite_path_from_url(database_url: str) -> Optional[str]:
+    """
+    Caminho do arquivo a partir de uma URL sqlite:/// (None se não for SQLite)
+
+    Args:
+        database_url: URL no formato de Config.get_database_url()
+    """
+    prefix = 'sqlite:///'
+    if not database_url.startswith(prefix):
+        return None
+    return database_url[len(prefix):] or None
+
+
+def _fts_query(text: str) -> str:
+    """Cada termo entre aspas: a busca não interpreta a sintaxe do FTS5"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+
+class HistoryStore:
+    """
+    Histórico de classificações
+
+    record() apenas enfileira; uma thread grava os registros em lotes numa
+    única transação. A thread é (re)criada no processo que grava, de modo
+    que o store sobrevive ao fork dos workers do servidor pré-fork.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Arquivo do banco SQLite
+        """
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        try:
+            connection.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5: a busca cai para LIKE
+            logger.warning("FTS5 indisponível, busca do histórico usará LIKE")
+            self.fts = False
+        connection.close()
+
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Nova conexão com WAL (leituras não bloqueiam a gravação)"""
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """Conexão de leitura da thread atual"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = self._connect()
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _ensure_writer(self):
+        """Iniciar a thread de gravação no processo atual"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=MAX_PENDING)
+            self._writer = threading.Thread(target=self._write_loop, args=(self._queue,),
+                                            name='history-writer', daemon=True)
+            self._writer.start()
+            self._writer_pid = os.getpid()
+
+    def record(self, content_hash: str, content: str, result: Dict[str, Any], source: str = 'single'):
+        """
+        Enfileirar uma classificação (não bloqueia)
+
+        Args:
+            content_hash: Hash do conteúdo
+            content: Conteúdo do email
+            result: Resultado de classify_email (com 'analysis': pontuações e idioma)
+            source: Origem (single/batch)
+        """
+        self._ensure_writer()
+        analysis = result.get('analysis') or {}
+        row = (
+            time.time(),
+            content_hash,
+            result['category'],
+            result['confidence'],
+            analysis.get('final_score'),
+            json.dumps(analysis['keyword_scores']) if 'keyword_scores' in analysis else None,
+            analysis.get('language'),
+            source,
+            content
+        )
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self, pending: queue.Queue):
+        """Gravar os registros enfileirados em lotes"""
+        connection = self._connect()
+        while True:
+            row = pending.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            stop = False
+            while len(rows) < WRITE_BATCH_SIZE:
+                try:
+                    row = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                rows.append(row)
+
+            try:
+                self._write(connection, rows)
+                self.written += len(rows)
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar histórico ({len(rows)} registros): {str(e)}")
+
+            for _ in rows:
+                pending.task_done()
+            if stop:
+                break
+        pending.task_done()
+        connection.close()
+
+    def _write(self, connection: sqlite3.Connection, rows: List[tuple]):
+        """Inserir um lote numa transação (tabela e índice textual)"""
+        connection.execute('BEGIN')
+        try:
+            for row in rows:
+                cursor = connection.execute(
+                    'INSERT INTO classifications (created_at, content_hash, category, confidence, '
+                    'final_score, scores, language, source, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    row
+                )
+                if self.fts:
+                    connection.execute('INSERT INTO classifications_fts (rowid, content) VALUES (?, ?)',
+                                       (cursor.lastrowid, row[-1]))
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+
+    def flush(self):
+        """Aguardar a gravação de tudo o que foi enfileirado"""
+        if self._writer_pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Gravar os pendentes e encerrar a thread de gravação"""
+        if self._writer_pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+        self._writer_pid = None
+
+    def query(self, text: Optional[str] = None, category: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 50, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Consultar o histórico, do mais recente para o mais antigo
+
+        A paginação é por chave (id < cursor), sem OFFSET: o custo de uma
+        página não cresce com a profundidade.
+
+        Args:
+            text: Palavras a buscar no conteúdo
+            category: Filtrar por categoria
+            since: Timestamp mínimo (segundos desde a época)
+            until: Timestamp máximo
+            limit: Itens por página (até MAX_PAGE_SIZE)
+            cursor: next_cursor da página anterior
+
+        Returns:
+            {'items': [...], 'next_cursor': id ou None}
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions = []
+        params: List[Any] = []
+
+        if text and text.split() and self.fts:
+            source = 'classifications_fts f JOIN classifications c ON c.id = f.rowid'
+            preview = "snippet(classifications_fts, 0, '[', ']', '…', 16)"
+            conditions.append('classifications_fts MATCH ?')
+            params.append(_fts_query(text))
+        else:
+            source = 'classifications c'
+            preview = 'substr(c.content, 1, 200)'
+            if text and text.split():
+                for term in text.split():
+                    conditions.append('c.content LIKE ?')
+                    params.append(f'%{term}%')
+
+        if category:
+            conditions.append('c.category = ?')
+            params.append(category)
+        if since is not None:
+            conditions.append('c.created_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('c.created_at <= ?')
+            params.append(until)
+        if cursor is not None:
+            conditions.append('c.id < ?')
+            params.append(cursor)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f'SELECT {_COLUMNS}, {preview} AS preview FROM {source} {where} ORDER BY c.id DESC LIMIT ?'
+        rows = self._reader().execute(sql, params + [limit + 1]).fetchall()
+
+        items = [
+            {
+                'id': row['id'],
+                'created_at': row['created_at'],
+                'content_hash': row['content_hash'],
+                'category': row['category'],
+                'confidence': row['confidence'],
+                'final_score': row['final_score'],
+                'scores': json.loads(row['scores']) if row['scores'] else None,
+                'language': row['language'],
+                'source': row['source'],
+                'preview': row['preview']
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = items[-1]['id'] if len(rows) > limit else None
+        return {'items': items, 'next_cursor': next_cursor}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de gravação"""
+        pending = self._queue.qsize() if self._writer_pid == os.getpid() else 0
+        return {
+            'written': self.written,
+            'pending': pending,
+            'dropped': self.dropped,
+            'fts': self.fts
+        }
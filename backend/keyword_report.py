@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keyword Scoring Report
+Compara a pontuação por tabelas normalizadas com a comparação por
+substring usada anteriormente, sobre o corpus de exemplos
+"""
+
+import sys
+import argparse
+from typing import Dict, List, Tuple
+from classifier import EmailClassifier
+from corpus import EXAMPLES_PATH, load_example_emails
+
+
+def substring_keyword_score(classifier: EmailClassifier, tokens: List[str]) -> Dict[str, float]:
+    """
+    Pontuação por substring bidirecional (comportamento anterior)
+
+    Args:
+        classifier: Classificador com as listas de palavras-chave
+        tokens: Tokens normalizados do email
+
+    Returns:
+        Dicionário com pontuações por categoria
+    """
+    scores = dict.fromkeys(classifier.keyword_weights, 0.0)
+    all_keywords = {**classifier.productive_keywords, **classifier.unproductive_keywords}
+
+    for token in tokens:
+        for category, keywords in all_keywords.items():
+            for keyword in keywords:
+                if keyword in token or token in keyword:
+                    scores[category] += classifier.keyword_weights[category]
+
+    return scores
+
+
+def shrunk_keywords(classifier: EmailClassifier, language: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Palavras-chave com menos tokens normalizados que palavras
+
+    Uma frase que perde palavras na normalização casa um n-grama menor (e
+    mais amplo) que o pretendido.
+
+    Args:
+        classifier: Classificador com as listas de palavras-chave
+        language: Idioma da normalização
+
+    Returns:
+        Lista de (palavra-chave, tokens normalizados)
+    """
+    shrunk = []
+    for keywords in {**classifier.productive_keywords, **classifier.unproductive_keywords}.values():
+        for keyword in keywords:
+            processed = classifier.preprocess_text(keyword)
+            tokens = tuple(classifier.tokenize_sequence(processed, language)[1])
+            if len(tokens) < len(processed.split()):
+                shrunk.append((keyword, tokens))
+    return shrunk
+
+
+def build_report(classifier: EmailClassifier, path: str = EXAMPLES_PATH) -> str:
+    """
+    Montar o relatório de diferenças de pontuação
+
+    Args:
+        classifier: Classificador a avaliar
+        path: Arquivo de emails de exemplo
+
+    Returns:
+        Relatório em texto
+    """
+    lines = []
+    changed_categories = 0
+
+    for title, content in load_example_emails(path):
+        processed = classifier.preprocess_text(content)
+        language = classifier.detect_language(processed)
+        tokens, sequence = classifier.tokenize_sequence(processed, language)
+
+        before = substring_keyword_score(classifier, tokens)
+        after = classifier.calculate_keyword_score(sequence, language)
+        patterns = sum(classifier.analyze_text_patterns(content).values())
+
+        final_before = sum(before.values()) + patterns
+        final_after = sum(after.values()) + patterns
+        category_before = 'produtivo' if final_before > 0 else 'improdutivo'
+        category_after = 'produtivo' if final_after > 0 else 'improdutivo'
+
+        flag = '' if category_before == category_after else '  <-- categoria alterada'
+        if flag:
+            changed_categories += 1
+
+        lines.append(f"{title} [{language}]")
+        lines.append(f"  final_score: {final_before:.1f} -> {final_after:.1f} "
+                     f"({category_before} -> {category_after}){flag}")
+        for category in classifier.keyword_weights:
+            if before[category] != after[category]:
+                lines.append(f"    {category:22} {before[category]:7.1f} -> {after[category]:7.1f}")
+        lines.append('')
+
+    for language, table in classifier.keyword_tables.items():
+        if table.unmatchable:
+            lines.append(f"Palavras-chave sem tokens em {language}: {', '.join(table.unmatchable)}")
+        shrunk = shrunk_keywords(classifier, language)
+        if shrunk:
+            lines.append(f"Palavras-chave que perderam tokens em {language}: "
+                         f"{', '.join(f'{keyword} -> {tokens}' for keyword, tokens in shrunk)}")
+
+    lines.append(f"Emails com categoria alterada: {changed_categories}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Relatório de diferenças da pontuação por palavras-chave')
+    parser.add_argument('corpus', nargs='?', default=EXAMPLES_PATH, help='Arquivo de emails de exemplo')
+    args = parser.parse_args()
+
+    classifier = EmailClassifier()
+    # Só as palavras-chave interessam: sem reputação nem modelo de feedback
+    classifier.reputation = None
+    classifier.learner = None
+    print(build_report(classifier, args.corpus))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keyword Table
+Tabelas de palavras-chave normalizadas e casamento de frases por n-gramas
+"""
+
+import logging
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordTable:
+    """
+    Palavras-chave pré-normalizadas de um idioma
+
+    Cada palavra-chave passa pela mesma normalização aplicada à sequência de
+    tokens do email (stop words e números mantidos), de modo que a pontuação
+    se resume a buscas em dicionário: termos simples por token e frases por
+    n-gramas de tokens.
+    """
+
+    def __init__(self, keyword_groups: Dict[str, List[str]], normalize: Callable[[str], List[str]],
+                 variants: Optional[Mapping[str, Sequence[str]]] = None):
+        """
+        Construir as tabelas de termos e frases
+
+        Args:
+            keyword_groups: Palavras-chave brutas por categoria
+            normalize: Função que transforma texto em tokens normalizados
+                       (a mesma usada nos emails)
+            variants: Outras formas de cada palavra-chave (ex.: tradução no
+                      idioma da tabela); casam como a palavra-chave original
+        """
+        variants = variants or {}
+        terms: Dict[str, List[Tuple[str, str]]] = {}
+        phrases: Dict[str, List[Tuple[Tuple[str, ...], str, str]]] = {}
+        unmatchable: List[str] = []
+
+        for category, keywords in keyword_groups.items():
+            for keyword in keywords:
+                for text in (keyword, *variants.get(keyword, ())):
+                    tokens = tuple(normalize(text))
+                    if not tokens:
+                        # Palavra-chave sem nenhuma palavra (ex.: só pontuação)
+                        unmatchable.append(text)
+                    elif len(tokens) == 1:
+                        terms.setdefault(tokens[0], []).append((category, keyword))
+                    else:
+                        phrases.setdefault(tokens[0], []).append((tokens, category, keyword))
+
+        # Estruturas imutáveis após a construção, compartilhadas entre threads:
+        # o laço de busca usa os dicionários privados (sem o custo do proxy)
+        self._terms: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            token: tuple(entries) for token, entries in terms.items()
+        }
+        self._phrases: Dict[str, Tuple[Tuple[Tuple[str, ...], str, str], ...]] = {
+            token: tuple(entries) for token, entries in phrases.items()
+        }
+        self.terms: Mapping[str, Tuple[Tuple[str, str], ...]] = MappingProxyType(self._terms)
+        self.phrases: Mapping[str, Tuple[Tuple[Tuple[str, ...], str, str], ...]] = MappingProxyType(self._phrases)
+        self.unmatchable: Tuple[str, ...] = tuple(unmatchable)
+
+        if self.unmatchable:
+            logger.debug(f"Palavras-chave sem tokens após normalização: {self.unmatchable}")
+
+    def iter_matches(self, tokens: List[str]) -> Iterator[Tuple[int, str, str]]:
+        """
+        Percorrer as ocorrências de palavras-chave nos tokens
+
+        Args:
+            tokens: Sequência de tokens normalizados do email
+
+        Yields:
+            Tuplas (posição do token, categoria, palavra-chave original)
+        """
+        terms = self._terms
+        phrases = self._phrases
+
+        for position, token in enumerate(tokens):
+            for category, keyword in terms.get(token, ()):
+                yield position, category, keyword
+
+            for phrase, category, keyword in phrases.get(token, ()):
+                end = position + len(phrase)
+                if tuple(tokens[position:end]) == phrase:
+                    yield position, category, keyword
+
+    def score(self, tokens: List[str], weights: Mapping[str, float]) -> Dict[str, float]:
+        """
+        Somar os pesos das palavras-chave encontradas
+
+        Args:
+            tokens: Sequência de tokens normalizados do email
+            weights: Peso de cada categoria
+
+        Returns:
+            Dicionário com pontuações por categoria
+        """
+        scores = dict.fromkeys(weights, 0.0)
+        for _, category, _ in self.iter_matches(tokens):
+            scores[category] += weights[category]
+        return scores
+
+    def total_score(self, tokens: List[str], weights: Mapping[str, float]) -> float:
+        """
+        Somar os pesos das palavras-chave sem montar o detalhamento por categoria
+
+        Args:
+            tokens: Sequência de tokens normalizados do email
+            weights: Peso de cada categoria
+
+        Returns:
+            Pontuação total de palavras-chave
+        """
+        return sum(weights[category] for _, category, _ in self.iter_matches(tokens))
+
+    def topic(self, tokens: List[str], categories: Iterable[str]) -> Optional[str]:
+        """
+        Palavra-chave mais frequente entre as categorias indicadas
+
+        Args:
+            tokens: Sequência de tokens normalizados do email
+            categories: Categorias consideradas (ex.: as produtivas)
+
+        Returns:
+            Palavra-chave original (a primeira encontrada em caso de empate) ou None
+        """
+        categories = frozenset(categories)
+        counts: Dict[str, int] = {}
+        for _, category, keyword in self.iter_matches(tokens):
+            if category in categories:
+                counts[keyword] = counts.get(keyword, 0) + 1
+        return max(counts, key=counts.get) if counts else None
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Language Routing
+Identificação de idioma por n-gramas de caracteres e pipelines de
+normalização específicos por idioma (stop words + stemmer)
+"""
+
+import re
+import math
+import logging
+import threading
+from types import MappingProxyType
+from collections import Counter
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer, RSLPStemmer, WordNetLemmatizer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PORTUGUESE = 'portuguese'
+ENGLISH = 'english'
+SUPPORTED_LANGUAGES = (PORTUGUESE, ENGLISH)
+DEFAULT_LANGUAGE = PORTUGUESE
+
+# Apenas o início do email é usado na detecção (suficiente e barato)
+LANGUAGE_SAMPLE_SIZE = 1000
+
+# Tokens com menos caracteres são descartados antes da normalização
+MIN_TOKEN_LENGTH = 3
+
+# Textos-semente usados para montar os perfis de trigramas de cada idioma
+_SEED_TEXTS = {
+    PORTUGUESE: (
+        "prezados colegas gostaria de agendar uma reunião para discutirmos as estratégias "
+        "do próximo trimestre precisamos definir os objetivos metas e cronogramas dos projetos "
+        "por favor confirmem sua disponibilidade atenciosamente obrigado pelo seu email "
+        "vou analisar as informações e retornarei em breve com uma resposta não perca esta "
+        "oportunidade única clique aqui para atualizar seus dados sua conta será bloqueada "
+        "encaminhe esta mensagem para seus amigos você também ganhará um prêmio ação "
+        "informação situação então também já até você está serviço negócio equipe relatório"
+    ),
+    ENGLISH: (
+        "dear colleagues i would like to schedule a meeting to discuss the strategies for "
+        "the next quarter we need to define the goals targets and schedules of the projects "
+        "please confirm your availability best regards thank you for your email i will "
+        "review the information and get back to you shortly with an answer do not miss this "
+        "unique opportunity click here to update your account details your account will be "
+        "suspended forward this message to your friends and you will also win a prize "
+        "with that this which there their would should could have been the and of to"
+    )
+}
+
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+
+def _word_trigrams(word: str) -> List[str]:
+    """Trigramas de uma palavra com delimitadores de borda"""
+    padded = f' {word} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _load_stopwords(language: str) -> FrozenSet[str]:
+    """Carregar stop words de um idioma (vazio se o corpus não estiver disponível)"""
+    try:
+        return frozenset(stopwords.words(language))
+    except LookupError:
+        logger.warning(f"Stop words em {language} não disponíveis")
+        return frozenset()
+
+
+class LanguageDetector:
+    """
+    Identificador de idioma por perfis de trigramas de caracteres
+
+    Os perfis não mudam após a construção: o detector é compartilhado entre
+    threads sem lock.
+    """
+
+    def __init__(self):
+        """Montar os perfis de log-probabilidade de cada idioma"""
+        profiles: Dict[str, Dict[str, float]] = {}
+        floor: Dict[str, float] = {}
+
+        for language in SUPPORTED_LANGUAGES:
+            words = _WORD_PATTERN.findall(_SEED_TEXTS[language])
+            words.extend(_load_stopwords(language))
+
+            counts = Counter()
+            for word in words:
+                counts.update(_word_trigrams(word))
+
+            total = sum(counts.values()) + len(counts) + 1
+            profiles[language] = {
+                trigram: math.log((count + 1) / total) for trigram, count in counts.items()
+            }
+            # Trigramas desconhecidos recebem a probabilidade de suavização
+            floor[language] = math.log(1 / total)
+
+        # detect() usa os dicionários privados; a visão pública é somente leitura
+        self._profiles = profiles
+        self._floor = floor
+        self.profiles: Mapping[str, Mapping[str, float]] = MappingProxyType(
+            {language: MappingProxyType(profile) for language, profile in profiles.items()}
+        )
+        self.floor: Mapping[str, float] = MappingProxyType(floor)
+
+    def detect(self, text: str) -> str:
+        """
+        Detectar o idioma predominante do texto
+
+        Args:
+            text: Texto original ou pré-processado
+
+        Returns:
+            Nome do idioma (portuguese/english)
+        """
+        words = _WORD_PATTERN.findall(text[:LANGUAGE_SAMPLE_SIZE].lower())
+        if not words:
+            return DEFAULT_LANGUAGE
+
+        profiles = self._profiles
+        floor = self._floor
+        scores = dict.fromkeys(SUPPORTED_LANGUAGES, 0.0)
+        for word in words:
+            for trigram in _word_trigrams(word):
+                for language in SUPPORTED_LANGUAGES:
+                    scores[language] += profiles[language].get(trigram, floor[language])
+
+        # Em caso de empate, o idioma padrão do sistema prevalece
+        return max(SUPPORTED_LANGUAGES, key=lambda language: (scores[language], language == DEFAULT_LANGUAGE))
+
+
+class LanguagePipeline:
+    """
+    Pipeline de normalização de tokens para um idioma específico
+
+    Compartilhado entre threads: stop words e tabela de lemas são
+    imutáveis, e warmup() carrega os recursos preguiçosos do NLTK antes do
+    uso concorrente (o carregamento do WordNet não é thread-safe).
+    """
+
+    def __init__(self, language: str):
+        """
+        Inicializar stop words e stemmer do idioma
+
+        Args:
+            language: Nome do idioma (portuguese/english)
+        """
+        self.language = language
+        self.stop_words = _load_stopwords(language)
+        # Mesmas stop words em array ordenado, para a filtragem vetorizada em lote
+        self.stop_word_array = np.array(sorted(self.stop_words), dtype=object) if np is not None else None
+        if self.stop_word_array is not None:
+            self.stop_word_array.setflags(write=False)
+
+        if language == PORTUGUESE:
+            try:
+                self.stemmer = RSLPStemmer()
+            except LookupError:
+                # Fallback para Porter se o RSLP não estiver disponível
+                logger.warning("Stemmer RSLP não disponível, usando PorterStemmer")
+                self.stemmer = PorterStemmer()
+            # WordNet só cobre inglês
+            self.lemmatizer = None
+        else:
+            self.stemmer = PorterStemmer()
+            self.lemmatizer = WordNetLemmatizer()
+
+        # Tabela radical -> lema pré-computada (dispensa o WordNet em runtime)
+        self._lemma_table: Optional[Dict[str, str]] = None
+        self.lemma_table: Optional[Mapping[str, str]] = None
+
+    def use_lemma_table(self, table: Dict[str, str]):
+        """
+        Usar uma tabela de lemas pré-computada no lugar do WordNet
+
+        Radicais ausentes da tabela são mantidos como estão (a tabela só
+        registra os radicais cujo lema difere do próprio radical).
+
+        Args:
+            table: Dicionário radical -> lema
+        """
+        if self.lemmatizer is not None:
+            self._lemma_table = table
+            self.lemma_table = MappingProxyType(self._lemma_table)
+
+    def warmup(self):
+        """Carregar os recursos preguiçosos do pipeline (regras do stemmer, WordNet)"""
+        # Serializado: dois carregamentos simultâneos do LazyCorpusLoader se atropelam
+        with _warmup_lock:
+            stemmed = self.stemmer.stem('reuniões' if self.language == PORTUGUESE else 'meetings')
+            if self.lemmatizer is not None and self.lemma_table is None:
+                self.lemmatizer.lemmatize(stemmed)
+
+    def filter_tokens(self, tokens: List[str]) -> List[str]:
+        """
+        Remover stop words, tokens curtos e números
+
+        Args:
+            tokens: Tokens em minúsculas
+
+        Returns:
+            Tokens que seguem para a normalização
+        """
+        stop_words = self.stop_words
+        return [token for token in tokens
+                if len(token) >= MIN_TOKEN_LENGTH and token not in stop_words and not token.isdecimal()]
+
+    def clean_tokens(self, tokens: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Filtrar e normalizar os tokens, mantendo também a sequência completa
+
+        Na sequência, os tokens que filter_tokens descartaria (stop words,
+        curtos, números) ficam como estão: é sobre ela que as palavras-chave
+        são casadas, para que frases como 'envie para' e '7 dias' continuem
+        n-gramas reais.
+
+        Args:
+            tokens: Tokens em minúsculas
+
+        Returns:
+            (tokens filtrados e normalizados, sequência completa)
+        """
+        stop_words = self.stop_words
+        cleaned = []
+        sequence = []
+        for token in tokens:
+            if len(token) >= MIN_TOKEN_LENGTH and token not in stop_words and not token.isdecimal():
+                token = self.normalize(token)
+                cleaned.append(token)
+            sequence.append(token)
+        return cleaned, sequence
+
+    def keep_mask(self, tokens):
+        """
+        Versão vetorizada de filter_tokens
+
+        Args:
+            tokens: Array NumPy de strings com dtype=object
+
+        Returns:
+            Máscara booleana dos tokens mantidos
+        """
+        count = len(tokens)
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+        decimal = np.fromiter(map(str.isdecimal, tokens), dtype=bool, count=count)
+        keep = (lengths >= MIN_TOKEN_LENGTH) & ~decimal
+        if len(self.stop_word_array):
+            keep &= ~np.isin(tokens, self.stop_word_array)
+        return keep
+
+    def normalize(self, token: str) -> str:
+        """
+        Normalizar um token (stemming + lemmatização quando aplicável)
+
+        Args:
+            token: Token em minúsculas
+
+        Returns:
+            Forma normalizada do token
+        """
+        stemmed = self.stemmer.stem(token)
+        lemma_table = self._lemma_table
+        if lemma_table is not None:
+            return lemma_table.get(stemmed, stemmed)
+        if self.lemmatizer is not None:
+            return self.lemmatizer.lemmatize(stemmed)
+        return stemmed
+
+
+_pipelines: Dict[str, LanguagePipeline] = {}
+_pipelines_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_detector = None
+
+
+def get_pipeline(language: str) -> LanguagePipeline:
+    """
+    Obter o pipeline (em cache) de um idioma
+
+    Args:
+        language: Nome do idioma
+
+    Returns:
+        Pipeline compartilhado do idioma
+    """
+    pipeline = _pipelines.get(language)
+    if pipeline is None:
+        with _pipelines_lock:
+            pipeline = _pipelines.get(language)
+            if pipeline is None:
+                pipeline = LanguagePipeline(language)
+                _pipelines[language] = pipeline
+    return pipeline
+
+
+def get_detector() -> LanguageDetector:
+    """Obter o detector de idioma compartilhado"""
+    global _detector
+    if _detector is None:
+        with _pipelines_lock:
+            if _detector is None:
+                _detector = LanguageDetector()
+    return _detector
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lemma Table
+Pré-computação offline dos lemas (WordNet) do vocabulário já reduzido a
+radicais, para que o classificador não precise carregar o WordNet em runtime
+"""
+
+import sys
+import json
+import argparse
+import logging
+from typing import Dict, Iterable
+from nltk.tokenize import word_tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def build_lemma_table(pipeline, texts: Iterable[str]) -> Dict[str, str]:
+    """
+    Calcular os lemas dos radicais encontrados nos textos
+
+    Args:
+        pipeline: LanguagePipeline com stemmer e lemmatizador WordNet
+        texts: Textos já pré-processados (minúsculas, sem pontuação)
+
+    Returns:
+        Dicionário radical -> lema, apenas para radicais cujo lema difere
+    """
+    table = {}
+    seen = set()
+
+    for text in texts:
+        for token in word_tokenize(text):
+            if token in pipeline.stop_words or len(token) <= 2:
+                continue
+            stemmed = pipeline.stemmer.stem(token)
+            if stemmed in seen:
+                continue
+            seen.add(stemmed)
+            lemma = pipeline.lemmatizer.lemmatize(stemmed)
+            if lemma != stemmed:
+                table[stemmed] = lemma
+
+    logger.info(f"Tabela de lemas: {len(seen)} radicais, {len(table)} com lema distinto")
+    return table
+
+
+def save_lemma_table(table: Dict[str, str], path: str):
+    """Salvar a tabela em JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, sort_keys=True, indent=0)
+
+
+def load_lemma_table(path: str) -> Dict[str, str]:
+    """Carregar a tabela de um arquivo JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    """Função principal"""
+    from classifier import EmailClassifier
+    from corpus import load_example_emails
+    from language import ENGLISH
+
+    parser = argparse.ArgumentParser(description='Gerar a tabela de lemas do vocabulário em inglês')
+    parser.add_argument('output', help='Arquivo JSON de saída')
+    parser.add_argument('corpus', nargs='*', help='Arquivos de texto adicionais para o vocabulário')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    classifier = EmailClassifier(warmup=False)
+
+    texts = [content for _, content in load_example_emails()]
+    texts.extend(keyword for keywords in {**classifier.productive_keywords,
+                                          **classifier.unproductive_keywords}.values()
+                 for keyword in keywords)
+    texts.extend(variant for variants in classifier.keyword_variants[ENGLISH].values() for variant in variants)
+    for path in args.corpus:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.extend(f)
+
+    pipeline = classifier.pipelines[ENGLISH]
+    table = build_lemma_table(pipeline, (classifier.preprocess_text(text) for text in texts))
+    save_lemma_table(table, args.output)
+    print(f"Tabela salva em {args.output} ({len(table)} entradas)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
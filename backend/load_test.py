@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load Test
+Gerador de carga HTTP (asyncio, apenas biblioteca padrão) que sobe o
+servidor localmente, envia uma mistura de análises individuais, lotes e
+uploads e relata vazão, percentis de latência, erros e CPU/memória do
+servidor ao longo do tempo
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import random
+import socket
+import signal
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from corpus import load_example_emails
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BACKEND_DIR, '..', 'api')
+
+# Servidores que podem ser iniciados localmente
+TARGETS = ('app', 'production', 'serverless')
+
+REQUEST_KINDS = ('single', 'batch', 'upload')
+DEFAULT_MIX = 'single=0.8,batch=0.1,upload=0.1'
+
+PERCENTILES = (50, 90, 99)
+
+_BOUNDARY = 'load-test-boundary'
+
+
+def free_port() -> int:
+    """Porta TCP livre em localhost"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_serverless(port: int):
+    """
+    Servir o handler de api/index.py no seu servidor local (HTTP/1.1,
+    uma thread por conexão), no lugar da plataforma serverless
+    """
+    sys.path.insert(0, API_DIR)
+    from index import make_server
+
+    server = make_server('127.0.0.1', port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def start_server(target: str, port: int, workers: Optional[int]) -> subprocess.Popen:
+    """
+    Iniciar o servidor alvo num subprocesso
+
+    Args:
+        target: app (Flask de desenvolvimento), production (pré-fork) ou serverless
+        port: Porta de escuta
+        workers: Workers do servidor pré-fork (padrão: MAX_WORKERS)
+    """
+    env = dict(os.environ, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port))
+    if workers:
+        env['MAX_WORKERS'] = str(workers)
+
+    if target == 'serverless':
+        command = [sys.executable, os.path.abspath(__file__), '--serve-serverless', str(port)]
+    else:
+        command = [sys.executable, 'server.py' if target == 'production' else 'app.py']
+
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url: str, process: Optional[subprocess.Popen], timeout: float = 120) -> bool:
+    """Aguardar o servidor responder no /api/health"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def stop_server(process: subprocess.Popen, timeout: float = 30):
+    """Encerrar o servidor (SIGTERM, depois SIGKILL)"""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class ProcessSampler:
+    """
+    CPU e memória de um processo e de seus filhos (workers do pré-fork),
+    lidos de /proc; fora do Linux as amostras ficam vazias
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks_per_second = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.available = os.path.exists(f'/proc/{pid}/stat')
+        self._last: Optional[Tuple[float, float]] = None
+
+    def _process_tree(self) -> List[int]:
+        pids = [self.pid]
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    # O nome do processo (entre parênteses) pode conter espaços
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == self.pid:
+                pids.append(int(entry))
+        return pids
+
+    @staticmethod
+    def _cpu_ticks(pid: int) -> int:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime + stime
+        return int(fields[11]) + int(fields[12])
+
+    @staticmethod
+    def _memory_kb(pid: int) -> int:
+        """PSS (páginas compartilhadas divididas entre os processos) ou, sem ela, RSS"""
+        try:
+            with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+        return 0
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        """
+        Uso desde a amostra anterior
+
+        Returns:
+            {'cpu_percent', 'memory_mb', 'processes'} ou None
+        """
+        if not self.available:
+            return None
+        ticks = 0
+        memory_kb = 0
+        pids = self._process_tree()
+        for pid in pids:
+            try:
+                ticks += self._cpu_ticks(pid)
+                memory_kb += self._memory_kb(pid)
+            except OSError:
+                continue
+
+        now = time.monotonic()
+        cpu_percent = None
+        if self._last is not None:
+            last_time, last_ticks = self._last
+            # Workers reciclados somem da soma: o delta não pode ficar negativo
+            cpu_percent = max(0.0, (ticks - last_ticks) / self.ticks_per_second / (now - last_time) * 100)
+        self._last = (now, ticks)
+        return {
+            'cpu_percent': round(cpu_percent, 1) if cpu_percent is not None else None,
+            'memory_mb': round(memory_kb / 1024, 1),
+            'processes': len(pids)
+        }
+
+
+class RequestFactory:
+    """Corpos das requisições a partir dos emails de exemplo"""
+
+    def __init__(self, emails: List[str], batch_size: int, detail: str, repeat: bool):
+        """
+        Args:
+            emails: Conteúdos de exemplo
+            batch_size: Emails por requisição de lote
+            detail: Nível de detalhamento pedido (?detail=)
+            repeat: Reenviar o conteúdo idêntico; sem isso cada email recebe
+                    uma referência única (não coalescem no servidor)
+        """
+        self.emails = emails
+        self.batch_size = batch_size
+        self.query = f'?detail={detail}' if detail else ''
+        self.repeat = repeat
+        self.counter = 0
+
+    def _email(self) -> str:
+        self.counter += 1
+        email = random.choice(self.emails)
+        return email if self.repeat else f'{email}\n\nRef: {self.counter}'
+
+    def build(self, kind: str) -> Tuple[str, str, bytes]:
+        """
+        Returns:
+            (caminho, Content-Type, corpo)
+        """
+        if kind == 'batch':
+            body = json.dumps({'emails': [self._email() for _ in range(self.batch_size)]})
+            return f'/api/analyze-batch{self.query}', 'application/json', body.encode('utf-8')
+
+        if kind == 'upload':
+            body = (
+                f'--{_BOUNDARY}\r\n'
+                'Content-Disposition: form-data; name="file"; filename="email.txt"\r\n'
+                'Content-Type: text/plain\r\n\r\n'
+                f'{self._email()}\r\n'
+                f'--{_BOUNDARY}--\r\n'
+            )
+            return f'/api/analyze{self.query}', f'multipart/form-data; boundary={_BOUNDARY}', body.encode('utf-8')
+
+        body = json.dumps({'content': self._email()})
+        return f'/api/analyze{self.query}', 'application/json', body.encode('utf-8')
+
+
+async def send_request(host: str, port: int, path: str, content_type: str, body: bytes,
+                       timeout: float) -> int:
+    """
+    Uma requisição POST numa conexão nova (Connection: close)
+
+    Returns:
+        Status HTTP
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        head = (
+            f'POST {path} HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+        # Ler a resposta inteira: a latência inclui a transferência do corpo
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    status_line = response.split(b'\r\n', 1)[0].split()
+    if len(status_line) < 2:
+        raise ConnectionError('Resposta HTTP inválida')
+    return int(status_line[1])
+
+
+class KeepAliveConnection:
+    """
+    Conexão HTTP/1.1 persistente de um cliente da malha fechada
+
+    Reaberta apenas quando o servidor a encerra (Connection: close) ou
+    após um erro.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.opened = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, path: str, content_type: str, body: bytes) -> int:
+        """
+        Uma requisição POST na conexão (aberta se necessário)
+
+        Returns:
+            Status HTTP
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            self.opened += 1
+        try:
+            head = (
+                f'POST {path} HTTP/1.1\r\n'
+                f'Host: {self.host}:{self.port}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'
+            )
+            self._writer.write(head.encode('latin-1') + body)
+            await self._writer.drain()
+            status, headers = await asyncio.wait_for(self._read_head(), self.timeout)
+            # Sem Content-Length a resposta vai até o fechamento da conexão
+            length = headers.get('content-length')
+            if length is None:
+                await asyncio.wait_for(self._reader.read(), self.timeout)
+                self.close()
+            else:
+                await asyncio.wait_for(self._reader.readexactly(int(length)), self.timeout)
+                if headers.get('connection', '').lower() == 'close':
+                    self.close()
+            return status
+        except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError, ValueError):
+            self.close()
+            raise
+
+    async def _read_head(self) -> Tuple[int, Dict[str, str]]:
+        head = await self._reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status_line = lines[0].split()
+        if len(status_line) < 2:
+            raise ConnectionError('Resposta HTTP inválida')
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        return int(status_line[1]), headers
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentil por posição (nearest rank) de uma lista ordenada"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class LoadTest:
+    """
+    Execução de um teste de carga
+
+    Em malha aberta (rate) as requisições chegam no ritmo fixado,
+    independentemente das respostas, e a latência é medida a partir do
+    instante programado: a fila do servidor aparece na latência em vez de
+    reduzir a carga. Em malha fechada (concurrency) cada cliente só envia
+    a próxima requisição depois da resposta da anterior, numa conexão nova
+    ou, com keep_alive, sempre na mesma conexão.
+    """
+
+    def __init__(self, base_url: str, factory: RequestFactory, mix: Dict[str, float],
+                 duration: float, rate: Optional[float], concurrency: int, max_in_flight: int,
+                 timeout: float, poisson: bool = False, sampler: Optional[ProcessSampler] = None,
+                 sample_interval: float = 1.0, keep_alive: bool = False):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.factory = factory
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.duration = duration
+        self.rate = rate
+        self.concurrency = concurrency
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.poisson = poisson
+        self.sampler = sampler
+        self.sample_interval = sample_interval
+        self.keep_alive = keep_alive
+
+        # (instante da conclusão, tipo, latência, status ou erro)
+        self.results: List[Tuple[float, str, float, Any]] = []
+        self.timeline: List[Dict[str, Any]] = []
+        self.skipped = 0
+        self.in_flight = 0
+        self.connections = 0
+        self.start_time = 0.0
+
+    async def _one(self, kind: str, scheduled: float, connection: Optional[KeepAliveConnection] = None):
+        path, content_type, body = self.factory.build(kind)
+        self.in_flight += 1
+        try:
+            if connection is not None:
+                outcome = await connection.request(path, content_type, body)
+            else:
+                self.connections += 1
+                outcome = await send_request(self.host, self.port, path, content_type, body, self.timeout)
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+        except OSError:
+            # Inclui ConnectionError (recusa, reset, resposta inválida)
+            outcome = 'connection_error'
+        finally:
+            self.in_flight -= 1
+        now = time.monotonic()
+        self.results.append((now - self.start_time, kind, now - scheduled, outcome))
+
+    def _next_kind(self) -> str:
+        return random.choices(self.kinds, self.weights)[0]
+
+    async def _open_loop(self):
+        """Chegadas em ritmo fixo (ou Poisson) durante a duração do teste"""
+        tasks = set()
+        next_arrival = self.start_time
+        end_time = self.start_time + self.duration
+        while next_arrival < end_time:
+            delay = next_arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= self.max_in_flight:
+                # Limite do próprio cliente (descritores de arquivo): contado à parte
+                self.skipped += 1
+            else:
+                task = asyncio.ensure_future(self._one(self._next_kind(), next_arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            interval = random.expovariate(self.rate) if self.poisson else 1 / self.rate
+            next_arrival += interval
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _closed_loop(self):
+        """concurrency clientes enviando uma requisição após a outra"""
+        end_time = self.start_time + self.duration
+
+        async def client():
+            connection = KeepAliveConnection(self.host, self.port, self.timeout) if self.keep_alive else None
+            try:
+                while time.monotonic() < end_time:
+                    await self._one(self._next_kind(), time.monotonic(), connection)
+            finally:
+                if connection is not None:
+                    connection.close()
+                    self.connections += connection.opened
+
+        await asyncio.gather(*(client() for _ in range(self.concurrency)))
+
+    async def _sample_loop(self):
+        """Uma linha da série temporal por intervalo"""
+        last_count = 0
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            elapsed = time.monotonic() - self.start_time
+            window = self.results[last_count:]
+            last_count += len(window)
+            latencies = sorted(latency for _, _, latency, _ in window)
+            row = {
+                'elapsed': round(elapsed, 1),
+                'throughput': round(len(window) / self.sample_interval, 1),
+                'p50_ms': _ms(percentile(latencies, 50)),
+                'p99_ms': _ms(percentile(latencies, 99)),
+                'errors': sum(1 for *_, outcome in window if not _is_success(outcome)),
+                'in_flight': self.in_flight
+            }
+            if self.sampler is not None:
+                usage = self.sampler.sample()
+                if usage is not None:
+                    row.update(usage)
+            self.timeline.append(row)
+
+    async def run(self):
+        if self.sampler is not None:
+            self.sampler.sample()
+        self.start_time = time.monotonic()
+        sampler_task = asyncio.ensure_future(self._sample_loop())
+        try:
+            if self.rate:
+                await self._open_loop()
+            else:
+                await self._closed_loop()
+        finally:
+            sampler_task.cancel()
+        self.elapsed = time.monotonic() - self.start_time
+
+    def report(self) -> Dict[str, Any]:
+        """Resumo por tipo de requisição e série temporal"""
+        summary = {}
+        for kind in self.kinds + ['total']:
+            rows = [row for row in self.results if kind == 'total' or row[1] == kind]
+            if not rows:
+                continue
+            latencies = sorted(latency for _, _, latency, _ in rows)
+            outcomes: Dict[str, int] = {}
+            for *_, outcome in rows:
+                outcomes[str(outcome)] = outcomes.get(str(outcome), 0) + 1
+            errors = sum(1 for *_, outcome in rows if not _is_success(outcome))
+            entry = {
+                'requests': len(rows),
+                'throughput': round(len(rows) / self.elapsed, 2),
+                'errors': errors,
+                'error_rate': round(errors / len(rows), 4),
+                'outcomes': outcomes,
+                'max_ms': _ms(latencies[-1])
+            }
+            for pct in PERCENTILES:
+                entry[f'p{pct}_ms'] = _ms(percentile(latencies, pct))
+            summary[kind] = entry
+
+        return {
+            'mode': 'open' if self.rate else 'closed',
+            'rate': self.rate,
+            'concurrency': None if self.rate else self.concurrency,
+            'duration': round(self.elapsed, 2),
+            'skipped': self.skipped,
+            'keep_alive': self.keep_alive,
+            'connections': self.connections,
+            'summary': summary,
+            'timeline': self.timeline
+        }
+
+
+def _is_success(outcome) -> bool:
+    return isinstance(outcome, int) and 200 <= outcome < 300
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'single=0.8,batch=0.1,upload=0.1' -> pesos por tipo de requisição"""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Tipo de requisição desconhecido: {kind}")
+        mix[kind] = float(weight or 1)
+    mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError("Mistura de requisições vazia")
+    return mix
+
+
+def print_report(report: Dict[str, Any]):
+    """Tabelas do resumo e da série temporal"""
+    mode = (f"malha aberta, {report['rate']} req/s" if report['mode'] == 'open'
+            else f"malha fechada, {report['concurrency']} clientes")
+    print(f"\nTeste de carga ({mode}) em {report['duration']}s, "
+          f"{report['connections']} conexões{' (keep-alive)' if report['keep_alive'] else ''}")
+    if report['skipped']:
+        print(f"⚠️  {report['skipped']} chegadas descartadas pelo limite de requisições em andamento do cliente")
+
+    print(f"\n{'tipo':<8} {'reqs':>7} {'req/s':>8} {'erros':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    for kind, entry in report['summary'].items():
+        print(f"{kind:<8} {entry['requests']:>7} {entry['throughput']:>8} "
+              f"{entry['error_rate'] * 100:>6.1f}% {entry['p50_ms']:>9} {entry['p90_ms']:>9} "
+              f"{entry['p99_ms']:>9} {entry['max_ms']:>9}")
+    total = report['summary'].get('total')
+    if total:
+        outcomes = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(total['outcomes'].items()))
+        print(f"\nRespostas: {outcomes}")
+
+    if report['timeline']:
+        print(f"\n{'t (s)':>6} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6} {'em and.':>8} {'CPU %':>7} {'mem MB':>8}")
+        for row in report['timeline']:
+            print(f"{row['elapsed']:>6} {row['throughput']:>7} {str(row['p50_ms']):>8} {str(row['p99_ms']):>8} "
+                  f"{row['errors']:>6} {row['in_flight']:>8} {str(row.get('cpu_percent', '-')):>7} "
+                  f"{str(row.get('memory_mb', '-')):>8}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Teste de carga HTTP do Email Classifier')
+    parser.add_argument('--target', choices=TARGETS, default='production',
+                        help='Servidor iniciado localmente (app, production ou serverless)')
+    parser.add_argument('--url', help='Testar um servidor já em execução em vez de iniciar um')
+    parser.add_argument('--workers', type=int, help='Workers do servidor pré-fork')
+    parser.add_argument('--duration', type=float, default=30, help='Duração do teste em segundos')
+    parser.add_argument('--rate', type=float,
+                        help='Malha aberta: requisições por segundo (sem isso, malha fechada)')
+    parser.add_argument('--poisson', action='store_true', help='Chegadas de Poisson em vez de ritmo fixo')
+    parser.add_argument('--concurrency', type=int, default=8, help='Clientes da malha fechada')
+    parser.add_argument('--keep-alive', action='store_true',
+                        help='Malha fechada: cada cliente reutiliza uma conexão HTTP/1.1')
+    parser.add_argument('--max-in-flight', type=int, default=1000,
+                        help='Limite de requisições em andamento do cliente (malha aberta)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Pesos por tipo (padrão: {DEFAULT_MIX})')
+    parser.add_argument('--batch-size', type=int, default=10, help='Emails por requisição de lote')
+    parser.add_argument('--detail', default='', help='Nível de detalhamento (?detail=)')
+    parser.add_argument('--repeat', action='store_true',
+                        help='Enviar os exemplos sem variação (permite coalescência no servidor)')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout por requisição em segundos')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Intervalo da série temporal')
+    parser.add_argument('--json', metavar='ARQUIVO', help='Gravar o relatório completo em JSON')
+    parser.add_argument('--seed', type=int, help='Semente da mistura e das chegadas')
+    parser.add_argument('--serve-serverless', type=int, metavar='PORTA', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_serverless:
+        serve_serverless(args.serve_serverless)
+        return 0
+
+    if args.keep_alive and args.rate:
+        parser.error('--keep-alive só se aplica à malha fechada (sem --rate)')
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if args.target == 'serverless' and not args.url and mix.pop('upload', None):
+        print("⚠️  O handler serverless não aceita multipart: uploads removidos da mistura")
+        if not mix:
+            return 1
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    emails = [content for _, content in load_example_emails()]
+    factory = RequestFactory(emails, args.batch_size, args.detail, args.repeat)
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        print(f"🚀 Iniciando servidor {args.target} na porta {port}...")
+        process = start_server(args.target, port, args.workers)
+
+    try:
+        if not wait_until_ready(base_url, process):
+            print("❌ Servidor não respondeu ao /api/health")
+            return 1
+
+        sampler = ProcessSampler(process.pid) if process is not None else None
+        test = LoadTest(base_url, factory, mix, args.duration, args.rate, args.concurrency,
+                        args.max_in_flight, args.timeout, args.poisson, sampler, args.sample_interval,
+                        args.keep_alive)
+        asyncio.run(test.run())
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = test.report()
+    report['target'] = base_url if args.url else args.target
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRelatório salvo em {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
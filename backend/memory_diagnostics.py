@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory Diagnostics
+Contabilidade de memória do processo: tamanho das estruturas de longa
+duração do classificador, rastreamento de alocações (tracemalloc) com
+diferença entre snapshots e pico de memória por requisição de lote
+"""
+
+import gc
+import os
+import sys
+import time
+import threading
+import tracemalloc
+import linecache
+from types import MappingProxyType
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Frames guardados por alocação quando o rastreamento é iniciado sem parâmetro
+DEFAULT_TRACE_FRAMES = 10
+
+MAX_TRACE_FRAMES = 50
+
+# Agrupamentos aceitos pelo tracemalloc
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Requisições de lote recentes mantidas nas estatísticas
+RECENT_BATCHES = 50
+
+# Alocações internas que não interessam na lista de maiores
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, '<frozen importlib._bootstrap>',
+                  '<frozen importlib._bootstrap_external>', '<unknown>')
+
+# ru_maxrss é em kB no Linux e em bytes no macOS
+_MAXRSS_KB_FACTOR = 1 / 1024 if sys.platform == 'darwin' else 1
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Tamanho aproximado de um objeto e de tudo o que ele referencia
+
+    Percorre contêineres, atributos de instâncias e arrays numpy (nbytes);
+    objetos compartilhados são contados uma vez.
+
+    Args:
+        obj: Objeto a medir
+        seen: Ids já contados (compartilhado entre chamadas para somar várias estruturas)
+
+    Returns:
+        Tamanho em bytes
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item, 0)
+
+        nbytes = getattr(item, 'nbytes', None)
+        if isinstance(nbytes, int) and hasattr(item, 'dtype'):
+            # Array numpy: getsizeof não inclui o buffer quando é uma visão
+            if getattr(item, 'base', None) is not None:
+                total += nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel().tolist())
+            continue
+
+        if isinstance(item, (dict, MappingProxyType)):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, int, float, bool)) and item is not None:
+            if hasattr(item, '__dict__') and not callable(item):
+                stack.append(item.__dict__)
+            for slot in getattr(type(item), '__slots__', ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+def classifier_structure_sizes(classifier) -> Dict[str, Any]:
+    """
+    Tamanho das estruturas de longa duração do classificador
+
+    Args:
+        classifier: EmailClassifier
+
+    Returns:
+        {estrutura: bytes} (por idioma quando aplicável)
+    """
+    sizes: Dict[str, Any] = {
+        'stop_words': {language: deep_size(pipeline.stop_words) for language, pipeline in classifier.pipelines.items()},
+        'stop_word_arrays': {
+            language: deep_size(pipeline.stop_word_array)
+            for language, pipeline in classifier.pipelines.items() if pipeline.stop_word_array is not None
+        },
+        'keyword_tables': {language: deep_size(table) for language, table in classifier.keyword_tables.items()},
+        'language_detector': deep_size(classifier.language_detector)
+    }
+
+    lemma_tables = {id(pipeline.lemma_table): pipeline.lemma_table
+                    for pipeline in classifier.pipelines.values() if pipeline.lemma_table is not None}
+    if lemma_tables:
+        sizes['lemma_table'] = deep_size(list(lemma_tables.values()))
+    if classifier.calibration is not None:
+        sizes['calibration'] = deep_size(classifier.calibration)
+    if classifier.reputation is not None:
+        sizes['sender_reputation'] = {
+            'entries': len(classifier.reputation.entries),
+            'bytes': deep_size(classifier.reputation.entries)
+        }
+    if classifier.learner is not None and classifier.learner.weights is not None:
+        sizes['feedback_model'] = deep_size(classifier.learner.weights)
+
+    wordnet_size = _wordnet_size()
+    if wordnet_size is not None:
+        sizes['nltk_wordnet'] = wordnet_size
+    return sizes
+
+
+def _wordnet_size() -> Optional[int]:
+    """Índice do WordNet, se já carregado pelo lematizador (None se não carregado)"""
+    wordnet_module = sys.modules.get('nltk.corpus')
+    if wordnet_module is None:
+        return None
+    wordnet = wordnet_module.wordnet
+    # LazyCorpusLoader só é substituído pelo leitor real no primeiro uso
+    if type(wordnet).__name__ == 'LazyCorpusLoader':
+        return None
+    # Índice de lemas, exceções morfológicas e cache de synsets (cresce com o uso)
+    return deep_size([getattr(wordnet, name, None) for name in
+                      ('_lemma_pos_offset_map', '_exception_map', '_synset_offset_cache')])
+
+
+def _max_rss_kb() -> int:
+    """Pico de RSS do processo (0 onde getrusage não existe)"""
+    if resource is None:
+        return 0
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_KB_FACTOR)
+
+
+def process_memory() -> Dict[str, Any]:
+    """Memória do processo atual (RSS/PSS de /proc quando disponível)"""
+    usage = {
+        'pid': os.getpid(),
+        'max_rss_kb': _max_rss_kb(),
+        'gc_objects': len(gc.get_objects()),
+        'gc_counts': gc.get_count()
+    }
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_kb'] = int(line.split()[1])
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    usage['pss_kb'] = int(line.split()[1])
+    except OSError:
+        pass
+    return usage
+
+
+class AllocationTracer:
+    """
+    Controle do tracemalloc com snapshot de referência
+
+    Cada snapshot() é comparado ao anterior: as linhas que mais cresceram
+    entre os dois apontam vazamentos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_time: Optional[float] = None
+
+    def start(self, frames: int = DEFAULT_TRACE_FRAMES) -> Dict[str, Any]:
+        """Iniciar o rastreamento (custo de CPU e memória enquanto ativo)"""
+        frames = max(1, min(frames, MAX_TRACE_FRAMES))
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._baseline = None
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Parar o rastreamento e descartar os snapshots"""
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+            self._baseline_time = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        """Estado e memória rastreada"""
+        tracing = tracemalloc.is_tracing()
+        status = {'tracing': tracing, 'baseline_time': self._baseline_time}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                'frames': tracemalloc.get_traceback_limit(),
+                'traced_kb': current // 1024,
+                'traced_peak_kb': peak // 1024,
+                'overhead_kb': tracemalloc.get_tracemalloc_memory() // 1024
+            })
+        return status
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+
+    def top(self, limit: int = 20, group_by: str = 'lineno', new_baseline: bool = False) -> Dict[str, Any]:
+        """
+        Maiores sítios de alocação
+
+        Com snapshot de referência, lista as maiores diferenças em relação a
+        ele; sem referência, os maiores totais.
+
+        Args:
+            limit: Sítios listados
+            group_by: lineno, filename ou traceback
+            new_baseline: Substituir a referência pelo snapshot atual
+
+        Returns:
+            {'diff': bool, 'stats': [...], ...}
+
+        Raises:
+            RuntimeError: Rastreamento inativo
+            ValueError: Agrupamento inválido
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"Agrupamento inválido. Use: {', '.join(GROUP_BY)}")
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc inativo')
+
+        snapshot = self._take()
+        with self._lock:
+            baseline = self._baseline
+            if new_baseline or baseline is None:
+                self._baseline = snapshot
+                self._baseline_time = time.time()
+
+        if baseline is not None:
+            stats = snapshot.compare_to(baseline, group_by)
+            entries = [
+                {
+                    'location': _format_traceback(stat.traceback, group_by),
+                    'size_kb': round(stat.size / 1024, 1),
+                    'size_diff_kb': round(stat.size_diff / 1024, 1),
+                    'count': stat.count,
+                    'count_diff': stat.count_diff
+                }
+                for stat in stats[:limit]
+            ]
+        else:
+            stats = snapshot.statistics(group_by)
+            entries = [
+                {
+                    'location': _format_traceback(stat.traceback, group_by),
+                    'size_kb': round(stat.size / 1024, 1),
+                    'count': stat.count
+                }
+                for stat in stats[:limit]
+            ]
+
+        return {
+            'diff': baseline is not None,
+            'group_by': group_by,
+            'total_kb': round(sum(stat.size for stat in stats) / 1024, 1),
+            'stats': entries
+        }
+
+
+def _format_traceback(traceback: tracemalloc.Traceback, group_by: str):
+    """Local da alocação ('arquivo:linha'); lista de frames em 'traceback'"""
+    frames = [f'{frame.filename}:{frame.lineno}' for frame in traceback]
+    if group_by == 'filename':
+        return traceback[0].filename
+    return frames if group_by == 'traceback' else frames[0]
+
+
+class BatchMemoryStats:
+    """
+    Pico de memória por requisição de lote
+
+    Sempre mede o crescimento do pico de RSS do processo (getrusage, uma
+    chamada de sistema). Com o tracemalloc ativo, mede também o pico de
+    memória Python rastreada durante a requisição. O pico do tracemalloc é
+    um só para o processo e precisa ser zerado no início da medição, então
+    apenas um lote por vez o mede: lotes que começam enquanto outro está
+    sendo medido ficam com traced_peak_kb nulo. O pico medido inclui
+    alocações de outras requisições (não lotes) atendidas ao mesmo tempo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Dono do pico do tracemalloc (reset_peak zera o pico do processo inteiro)
+        self._peak_lock = threading.Lock()
+        self.requests = 0
+        self.max_rss_growth_kb = 0
+        self.max_traced_peak_kb = 0
+        self.recent = deque(maxlen=RECENT_BATCHES)
+
+    def measure(self):
+        """Context manager em torno do processamento do lote"""
+        return _BatchMeasurement(self)
+
+    def record(self, emails: int, payload_bytes: int, rss_growth_kb: int, traced_peak_kb: Optional[int]):
+        with self._lock:
+            self.requests += 1
+            self.max_rss_growth_kb = max(self.max_rss_growth_kb, rss_growth_kb)
+            if traced_peak_kb is not None:
+                self.max_traced_peak_kb = max(self.max_traced_peak_kb, traced_peak_kb)
+            self.recent.append({
+                'emails': emails,
+                'payload_kb': round(payload_bytes / 1024, 1),
+                'rss_growth_kb': rss_growth_kb,
+                'traced_peak_kb': traced_peak_kb
+            })
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self.recent)
+        traced = [item['traced_peak_kb'] for item in recent if item['traced_peak_kb'] is not None]
+        return {
+            'requests': self.requests,
+            'max_rss_growth_kb': self.max_rss_growth_kb,
+            'max_traced_peak_kb': self.max_traced_peak_kb,
+            'recent_avg_traced_peak_kb': round(sum(traced) / len(traced), 1) if traced else None,
+            'recent': recent[-10:]
+        }
+
+
+class _BatchMeasurement:
+    """Medição de uma requisição de lote (ver BatchMemoryStats)"""
+
+    def __init__(self, stats: BatchMemoryStats):
+        self.stats = stats
+        self.emails = 0
+        self.payload_bytes = 0
+
+    def __enter__(self):
+        self.start_maxrss = _max_rss_kb()
+        # Sem bloquear: se outro lote está medindo o pico, este não mede
+        self.tracing = tracemalloc.is_tracing() and self.stats._peak_lock.acquire(blocking=False)
+        if self.tracing:
+            self.start_traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        rss_growth = _max_rss_kb() - self.start_maxrss
+        traced_peak = None
+        if self.tracing:
+            if tracemalloc.is_tracing():
+                traced_peak = max(0, tracemalloc.get_traced_memory()[1] - self.start_traced) // 1024
+            self.stats._peak_lock.release()
+        self.stats.record(self.emails, self.payload_bytes, rss_growth, traced_peak)
+        return False
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Online Learning
+Modelo linear atualizado em mini-lotes (partial_fit) a partir das
+correções enviadas pelos usuários, sem retreino completo
+"""
+
+import os
+import time
+import queue
+import pickle
+import logging
+import threading
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+except ImportError:
+    np = None
+    HashingVectorizer = None
+    SGDClassifier = None
+
+logger = logging.getLogger(__name__)
+
+# Dimensão do espaço de atributos (hashing dos tokens: sem vocabulário a manter)
+N_FEATURES = 2 ** 16
+
+# Correções aplicadas por chamada de partial_fit
+FEEDBACK_BATCH_SIZE = 32
+
+# Espera máxima antes de aplicar um mini-lote incompleto (segundos)
+FLUSH_INTERVAL = 1.0
+
+# Correções aguardando treino; além disso novas correções são recusadas
+MAX_PENDING = 1000
+
+# Correções necessárias (com as duas categorias) antes de o modelo influenciar a pontuação
+MIN_SAMPLES = 20
+
+# Limite do ajuste (log-odds) somado ao final_score
+MAX_ADJUSTMENT = 2.0
+
+# Pesos publicados: imutáveis e trocados numa única atribuição
+LearnedWeights = namedtuple('LearnedWeights', ['coef', 'intercept', 'samples'])
+
+
+def online_learning_available() -> bool:
+    """Se o scikit-learn está instalado"""
+    return SGDClassifier is not None
+
+
+def _analyzer(tokens: List[str]) -> List[str]:
+    """Os documentos já chegam tokenizados e normalizados"""
+    return tokens
+
+
+class OnlineLearner:
+    """
+    Regressão logística treinada incrementalmente com as correções
+
+    submit() apenas enfileira; uma thread tokeniza e aplica os mini-lotes
+    numa cópia privada do modelo e publica os novos pesos de uma vez. As
+    requisições leem o atributo weights sem lock: veem os pesos antigos ou
+    os novos, nunca um estado intermediário.
+    """
+
+    def __init__(self, featurize: Callable[[str], List[str]], snapshot_path: Optional[str] = None):
+        """
+        Args:
+            featurize: Conteúdo do email -> tokens normalizados
+            snapshot_path: Arquivo do modelo treinado (None mantém só em memória)
+        """
+        if SGDClassifier is None:
+            raise RuntimeError("Aprendizado online requer scikit-learn (pip install -r backend/requirements.txt)")
+
+        self.featurize = featurize
+        self.snapshot_path = snapshot_path
+        self.vectorizer = HashingVectorizer(n_features=N_FEATURES, analyzer=_analyzer, alternate_sign=False)
+        self.weights: Optional[LearnedWeights] = None
+        # Incrementada a cada publicação de pesos
+        self.version = 0
+        self.updates = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: Optional[queue.Queue] = None
+        self._trainer_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self._model = SGDClassifier(loss='log_loss', alpha=1e-4, average=True, random_state=0)
+        self._label_counts = [0, 0]
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, 'rb') as f:
+                    state = pickle.load(f)
+                self._model = state['model']
+                self._label_counts = list(state['label_counts'])
+                self._publish()
+                logger.info(f"Modelo de feedback carregado: {sum(self._label_counts)} correções")
+            except (OSError, pickle.UnpicklingError, KeyError, AttributeError) as e:
+                logger.warning(f"Modelo de feedback ignorado: {str(e)}")
+
+    def _ensure_trainer(self):
+        """Iniciar a thread de treino no processo atual"""
+        if self._trainer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._trainer_pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=MAX_PENDING)
+            threading.Thread(target=self._train_loop, args=(self._queue,),
+                             name='feedback-trainer', daemon=True).start()
+            self._trainer_pid = os.getpid()
+
+    def submit(self, email_content: str, productive: bool) -> bool:
+        """
+        Enfileirar uma correção (não bloqueia)
+
+        Args:
+            email_content: Conteúdo do email
+            productive: Categoria correta
+
+        Returns:
+            False se a fila estiver cheia
+        """
+        self._ensure_trainer()
+        try:
+            self._queue.put_nowait((email_content, int(productive)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _train_loop(self, pending: queue.Queue):
+        """Aplicar as correções enfileiradas em mini-lotes"""
+        while True:
+            items = [pending.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(items) < FEEDBACK_BATCH_SIZE:
+                try:
+                    items.append(pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            try:
+                self._train([self.featurize(content) for content, _ in items],
+                            [label for _, label in items])
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Erro ao aplicar correções ({len(items)}): {str(e)}")
+
+            for _ in items:
+                pending.task_done()
+
+    def _train(self, token_lists: List[List[str]], labels: List[int]):
+        """Um passo de partial_fit e publicação dos novos pesos"""
+        features = self.vectorizer.transform(token_lists)
+        self._model.partial_fit(features, labels, classes=[0, 1])
+        for label in labels:
+            self._label_counts[label] += 1
+        self.updates += 1
+        self._publish()
+        self.snapshot()
+        logger.info(f"Modelo de feedback atualizado com {len(labels)} correções")
+
+    def _publish(self):
+        """Trocar os pesos vistos pelas requisições (cópia somente leitura)"""
+        coef = self._model.coef_[0].copy()
+        coef.setflags(write=False)
+        self.weights = LearnedWeights(coef, float(self._model.intercept_[0]), sum(self._label_counts))
+        self.version += 1
+
+    def ready(self) -> bool:
+        """Se já há correções suficientes, das duas categorias, para usar o modelo"""
+        return self.weights is not None and self.weights.samples >= MIN_SAMPLES and min(self._label_counts) > 0
+
+    def score(self, tokens: List[str]) -> Optional[float]:
+        """
+        Ajuste da pontuação pelo modelo (positivo favorece produtivo)
+
+        Args:
+            tokens: Tokens normalizados do email
+
+        Returns:
+            Log-odds limitado a ±MAX_ADJUSTMENT, ou None se o modelo não estiver pronto
+        """
+        if not self.ready():
+            return None
+        weights = self.weights
+        row = self.vectorizer.transform([tokens])
+        value = float(np.dot(weights.coef[row.indices], row.data)) + weights.intercept
+        return max(-MAX_ADJUSTMENT, min(MAX_ADJUSTMENT, value))
+
+    def flush(self):
+        """Aguardar o treino de tudo o que foi enfileirado"""
+        if self._trainer_pid == os.getpid():
+            self._queue.join()
+
+    def snapshot(self):
+        """
+        Gravar o modelo em disco (arquivo temporário + rename)
+
+        No servidor pré-fork cada worker treina o próprio modelo com as
+        correções que recebeu e grava no mesmo snapshot_path: o arquivo fica
+        com o modelo do último worker a gravar.
+        """
+        if not self.snapshot_path:
+            return
+        temp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump({'model': self._model, 'label_counts': self._label_counts}, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Erro ao gravar o modelo de feedback: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de treino"""
+        pending = self._queue.qsize() if self._trainer_pid == os.getpid() else 0
+        return {
+            'samples': sum(self._label_counts),
+            'productive': self._label_counts[1],
+            'unproductive': self._label_counts[0],
+            'updates': self.updates,
+            'pending': pending,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'active': self.ready()
+        }
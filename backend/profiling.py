@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Profiling
+Perfil opcional de requisições individuais (cProfile ou amostragem de
+pilha), gravado em disco por id e exibido como texto do pstats ou pilhas
+colapsadas para flamegraph
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho que pede o perfil de uma requisição (valor: cprofile, sample ou 1)
+PROFILE_HEADER = 'X-Profile'
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Formato de saída de cada modo
+PROFILE_FORMATS = {'cprofile': 'pstats', 'sample': 'collapsed'}
+
+# Intervalo da amostragem de pilha (na prática limitado pelo switch interval do GIL)
+SAMPLE_INTERVAL = 0.001
+
+MAX_PROFILES = 100
+
+# Ordenações aceitas na exibição do pstats
+PSTATS_SORTS = ('cumulative', 'tottime', 'calls', 'name', 'filename')
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), 'email_classifier_profiles')
+
+_ID_LENGTH = 16
+
+
+def _mtime(path: str) -> float:
+    """Data de modificação (0 se outro worker já apagou o arquivo)"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class StackSampler:
+    """
+    Amostragem periódica da pilha de uma thread
+
+    Uma thread auxiliar lê o frame atual da thread alvo e conta cada pilha;
+    o custo fica fora do código medido.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        """Uma linha 'frame;frame;frame contagem' por pilha (flamegraph.pl, speedscope)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Perfis de requisições sob demanda
+
+    Uma requisição é perfilada quando traz o cabeçalho X-Profile (se
+    permitido) ou cai na taxa de amostragem. Os perfis ficam em disco,
+    para que qualquer worker do servidor pré-fork possa exibi-los; os mais
+    antigos são apagados além de MAX_PROFILES.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, sample_rate: float = 0.0,
+                 header_enabled: bool = False, mode: str = 'cprofile', max_profiles: int = MAX_PROFILES):
+        """
+        Args:
+            directory: Diretório dos perfis
+            sample_rate: Fração das requisições perfiladas sem pedido explícito
+            header_enabled: Aceitar o cabeçalho X-Profile
+            mode: Modo usado pela amostragem e por 'X-Profile: 1'
+            max_profiles: Perfis mantidos em disco
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Modo de perfil inválido: {mode}")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.mode = mode
+        self.max_profiles = max_profiles
+        self.profiled = 0
+        self.skipped = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def requested_mode(self, header_value: Optional[str]) -> Optional[str]:
+        """
+        Modo de perfil da requisição
+
+        Args:
+            header_value: Valor do cabeçalho X-Profile
+
+        Returns:
+            'cprofile', 'sample' ou None (sem perfil)
+        """
+        if header_value and self.header_enabled:
+            value = header_value.strip().lower()
+            return value if value in PROFILE_MODES else self.mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def run(self, mode: str, label: str, func: Callable[[], Any]) -> Tuple[Optional[str], Any]:
+        """
+        Executar func sob o perfil e gravá-lo
+
+        Args:
+            mode: 'cprofile' ou 'sample'
+            label: Descrição da requisição (ex.: 'POST /analyze')
+            func: Trabalho a perfilar
+
+        Returns:
+            (id do perfil ou None se não foi possível perfilar, resultado de func)
+        """
+        profile_id = uuid.uuid4().hex[:_ID_LENGTH]
+        start_time = time.time()
+
+        if mode == 'sample':
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            try:
+                result = func()
+            finally:
+                sampler.stop()
+            data = sampler.collapsed()
+        else:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Outro perfil já ativo (Python 3.12+ permite um por processo)
+                self.skipped += 1
+                return None, func()
+            try:
+                result = func()
+            finally:
+                profile.disable()
+            data = profile
+
+        try:
+            self._save(profile_id, mode, label, time.time() - start_time, data)
+        except OSError as e:
+            logger.error(f"Erro ao gravar o perfil {profile_id}: {str(e)}")
+            return None, result
+        self.profiled += 1
+        return profile_id, result
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f'{profile_id}.{extension}')
+
+    def _save(self, profile_id: str, mode: str, label: str, duration: float, data):
+        if mode == 'sample':
+            with open(self._path(profile_id, 'collapsed'), 'w', encoding='utf-8') as f:
+                f.write(data)
+        else:
+            data.dump_stats(self._path(profile_id, 'prof'))
+
+        # Metadados por último: o perfil só aparece na lista quando completo
+        metadata = {
+            'id': profile_id,
+            'mode': mode,
+            'format': PROFILE_FORMATS[mode],
+            'label': label,
+            'created_at': round(time.time(), 3),
+            'duration': round(duration, 4),
+            'pid': os.getpid()
+        }
+        with open(self._path(profile_id, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        logger.info(f"Perfil {profile_id} gravado ({label}, {duration:.3f}s)")
+        self._prune()
+
+    def _prune(self):
+        """Apagar os perfis mais antigos além do limite"""
+        entries = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        if len(entries) <= self.max_profiles:
+            return
+        entries.sort(key=lambda name: _mtime(os.path.join(self.directory, name)))
+        for name in entries[:len(entries) - self.max_profiles]:
+            profile_id = name[:-len('.json')]
+            for extension in ('json', 'prof', 'collapsed'):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except OSError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Metadados dos perfis gravados, do mais recente para o mais antigo"""
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda profile: profile['created_at'], reverse=True)
+        return profiles
+
+    def render(self, profile_id: str, sort: str = 'cumulative', limit: int = 50) -> Tuple[str, str]:
+        """
+        Conteúdo de um perfil
+
+        Args:
+            profile_id: Id retornado em X-Profile-Id
+            sort: Ordenação do pstats (cumulative, tottime, calls...)
+            limit: Funções listadas pelo pstats
+
+        Returns:
+            (texto, formato: 'pstats' ou 'collapsed')
+
+        Raises:
+            KeyError: Perfil inexistente
+            ValueError: Ordenação inválida
+        """
+        if sort not in PSTATS_SORTS:
+            raise ValueError(f"Ordenação inválida. Use: {', '.join(PSTATS_SORTS)}")
+        if len(profile_id) != _ID_LENGTH or any(c not in '0123456789abcdef' for c in profile_id):
+            raise KeyError(profile_id)
+
+        collapsed_path = self._path(profile_id, 'collapsed')
+        if os.path.exists(collapsed_path):
+            with open(collapsed_path, 'r', encoding='utf-8') as f:
+                return f.read(), 'collapsed'
+
+        prof_path = self._path(profile_id, 'prof')
+        if not os.path.exists(prof_path):
+            raise KeyError(profile_id)
+        stream = io.StringIO()
+        stats = pstats.Stats(prof_path, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue(), 'pstats'
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuração e contadores"""
+        return {
+            'sample_rate': self.sample_rate,
+            'header_enabled': self.header_enabled,
+            'mode': self.mode,
+            'profiled': self.profiled,
+            'skipped': self.skipped
+        }
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reference Classifier
+Implementação de referência da pontuação do EmailClassifier, congelada a
+partir do comportamento atual e escrita da forma mais direta possível.
+Serve apenas de gabarito para o teste diferencial (differential_test.py):
+não deve ser otimizada nem acompanhar mudanças do classificador.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from nltk.stem import PorterStemmer, RSLPStemmer, WordNetLemmatizer
+
+PORTUGUESE = 'portuguese'
+ENGLISH = 'english'
+SUPPORTED_LANGUAGES = (PORTUGUESE, ENGLISH)
+DEFAULT_LANGUAGE = PORTUGUESE
+
+MIN_TOKEN_LENGTH = 3
+
+# Detecção de idioma copiada de language.py no congelamento: mudanças no
+# detector atual aparecem como diferenças na etapa detect_language
+LANGUAGE_SAMPLE_SIZE = 1000
+
+SEED_TEXTS = {
+    PORTUGUESE: (
+        "prezados colegas gostaria de agendar uma reunião para discutirmos as estratégias "
+        "do próximo trimestre precisamos definir os objetivos metas e cronogramas dos projetos "
+        "por favor confirmem sua disponibilidade atenciosamente obrigado pelo seu email "
+        "vou analisar as informações e retornarei em breve com uma resposta não perca esta "
+        "oportunidade única clique aqui para atualizar seus dados sua conta será bloqueada "
+        "encaminhe esta mensagem para seus amigos você também ganhará um prêmio ação "
+        "informação situação então também já até você está serviço negócio equipe relatório"
+    ),
+    ENGLISH: (
+        "dear colleagues i would like to schedule a meeting to discuss the strategies for "
+        "the next quarter we need to define the goals targets and schedules of the projects "
+        "please confirm your availability best regards thank you for your email i will "
+        "review the information and get back to you shortly with an answer do not miss this "
+        "unique opportunity click here to update your account details your account will be "
+        "suspended forward this message to your friends and you will also win a prize "
+        "with that this which there their would should could have been the and of to"
+    )
+}
+
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+PRODUCTIVE_KEYWORDS = {
+    'trabalho': ['reunião', 'projeto', 'cliente', 'negócio', 'estratégia', 'deadline',
+                 'relatório', 'apresentação', 'planejamento', 'objetivo', 'meta', 'resultado',
+                 'análise', 'desenvolvimento', 'implementação', 'cooperação', 'colaboração',
+                 'parceria', 'contrato', 'proposta', 'orçamento', 'cronograma', 'equipe'],
+    'profissional': ['curriculum', 'cv', 'entrevista', 'vaga', 'emprego', 'carreira',
+                     'formação', 'experiência', 'competência', 'habilidade', 'treinamento',
+                     'certificação', 'especialização', 'graduação', 'pós-graduação'],
+    'comercial': ['venda', 'compra', 'produto', 'serviço', 'preço', 'desconto', 'oferta',
+                  'promoção', 'marketing', 'publicidade', 'campanha', 'mercado', 'concorrência']
+}
+
+UNPRODUCTIVE_KEYWORDS = {
+    'spam': ['corrente', 'sorte', 'loteria', 'herança', 'prêmio', 'ganhe', 'grátis', 'urgente',
+             'limitado', 'exclusivo', 'confidencial', 'secreto', 'oportunidade única'],
+    'corrente': ['fwd:', 'reencaminhar', 'encaminhar', 'passe adiante', 'envie para',
+                 'reze por', 'bênção', 'maldição', '7 dias', '24 horas'],
+    'marketing_agressivo': ['promoção imperdível', 'oferta limitada', 'última chance',
+                            'não perca', 'garantido', '100% seguro', 'sem risco'],
+    'phishing': ['verificar conta', 'atualizar dados', 'confirmar identidade', 'segurança',
+                 'suspensão', 'bloqueio', 'acesso restrito', 'clique aqui']
+}
+
+KEYWORD_WEIGHTS = {
+    'trabalho': 2.0,
+    'profissional': 1.5,
+    'comercial': 1.0,
+    'spam': -2.0,
+    'corrente': -1.5,
+    'marketing_agressivo': -1.0,
+    'phishing': -2.5
+}
+
+
+class ReferenceClassifier:
+    """
+    Classificação por regras sem caches, tabelas ou caminhos vetorizados
+
+    O idioma vem de uma cópia congelada do detector por trigramas;
+    reputação, modelo de feedback e calibração não participam.
+    """
+
+    def __init__(self):
+        self.stop_words = {}
+        self.stemmers = {}
+        for language in SUPPORTED_LANGUAGES:
+            try:
+                self.stop_words[language] = set(stopwords.words(language))
+            except LookupError:
+                self.stop_words[language] = set()
+
+        # Perfis de log-probabilidade de trigramas por idioma
+        self.profiles = {}
+        self.floor = {}
+        for language in SUPPORTED_LANGUAGES:
+            counts = Counter()
+            for word in WORD_PATTERN.findall(SEED_TEXTS[language]) + sorted(self.stop_words[language]):
+                counts.update(self.trigrams(word))
+            total = sum(counts.values()) + len(counts) + 1
+            self.profiles[language] = {trigram: math.log((count + 1) / total) for trigram, count in counts.items()}
+            self.floor[language] = math.log(1 / total)
+        try:
+            self.stemmers[PORTUGUESE] = RSLPStemmer()
+        except LookupError:
+            self.stemmers[PORTUGUESE] = PorterStemmer()
+        self.stemmers[ENGLISH] = PorterStemmer()
+        self.lemmatizer = WordNetLemmatizer()
+
+        # Palavras-chave normalizadas por idioma, na ordem das listas
+        self.keywords = {}
+        for language in SUPPORTED_LANGUAGES:
+            self.keywords[language] = []
+            for category, keywords in {**PRODUCTIVE_KEYWORDS, **UNPRODUCTIVE_KEYWORDS}.items():
+                for keyword in keywords:
+                    tokens = self.tokenize_and_clean(self.preprocess_text(keyword), language)
+                    if tokens:
+                        self.keywords[language].append((category, tokens))
+
+    def preprocess_text(self, text: str) -> str:
+        text = text.lower()
+        text = re.sub(r'[^\w\s]', ' ', text)
+        text = re.sub(r'\d+', ' ', text)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def trigrams(self, word: str) -> List[str]:
+        padded = f' {word} '
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    def detect_language(self, text: str) -> str:
+        words = WORD_PATTERN.findall(text[:LANGUAGE_SAMPLE_SIZE].lower())
+        if not words:
+            return DEFAULT_LANGUAGE
+        scores = {}
+        for language in SUPPORTED_LANGUAGES:
+            scores[language] = 0.0
+            for word in words:
+                for trigram in self.trigrams(word):
+                    scores[language] += self.profiles[language].get(trigram, self.floor[language])
+        return max(SUPPORTED_LANGUAGES, key=lambda language: (scores[language], language == DEFAULT_LANGUAGE))
+
+    def tokenize_and_clean(self, text: str, language: str) -> List[str]:
+        tokens = []
+        for token in word_tokenize(text):
+            if len(token) < MIN_TOKEN_LENGTH or token in self.stop_words[language]:
+                continue
+            token = self.stemmers[language].stem(token)
+            if language == ENGLISH:
+                token = self.lemmatizer.lemmatize(token)
+            tokens.append(token)
+        return tokens
+
+    def calculate_keyword_score(self, tokens: List[str], language: str) -> Dict[str, float]:
+        scores = {category: 0.0 for category in KEYWORD_WEIGHTS}
+        for category, keyword_tokens in self.keywords[language]:
+            size = len(keyword_tokens)
+            for position in range(len(tokens) - size + 1):
+                if tokens[position:position + size] == keyword_tokens:
+                    scores[category] += KEYWORD_WEIGHTS[category]
+        return scores
+
+    def analyze_text_patterns(self, text: str) -> Dict[str, float]:
+        patterns = {
+            'has_links': 0.0,
+            'has_attachments': 0.0,
+            'is_forwarded': 0.0,
+            'has_urgent_words': 0.0,
+            'is_formal': 0.0,
+            'has_business_terms': 0.0
+        }
+        if re.search(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text):
+            patterns['has_links'] = -0.3
+        if re.search(r'anexo|attachment|enclosed|attached', text, re.IGNORECASE):
+            patterns['has_attachments'] = 0.2
+        if re.search(r'fwd:|re:|reencaminhar|encaminhar', text, re.IGNORECASE):
+            patterns['is_forwarded'] = -0.4
+        if any(word in text.lower() for word in ['urgente', 'imediato', 'agora', 'hoje', 'crítico', 'emergência']):
+            patterns['has_urgent_words'] = 0.1
+        if any(word in text.lower() for word in ['prezado', 'caro', 'senhor', 'senhora', 'atenciosamente',
+                                                  'cordiais saudações']):
+            patterns['is_formal'] = 0.3
+        if any(term in text.lower() for term in ['empresa', 'corporação', 'sociedade', 'ltda', 's/a', 'cnpj', 'cpf']):
+            patterns['has_business_terms'] = 0.4
+        return patterns
+
+    def classify(self, email_content: str, language: Optional[str] = None) -> Dict[str, object]:
+        """
+        Todas as etapas da classificação de um email
+
+        Returns:
+            processed, language, tokens, keyword_scores, pattern_scores,
+            final_score, category e confidence
+        """
+        processed = self.preprocess_text(email_content)
+        language = language or self.detect_language(processed)
+        tokens = self.tokenize_and_clean(processed, language)
+        keyword_scores = self.calculate_keyword_score(tokens, language)
+        pattern_scores = self.analyze_text_patterns(email_content)
+        final_score = sum(keyword_scores.values()) + sum(pattern_scores.values())
+        category = 'produtivo' if final_score > 0 else 'improdutivo'
+        confidence = max(0.6, min(0.95, 0.7 + abs(final_score) * 0.1))
+        return {
+            'processed': processed,
+            'language': language,
+            'tokens': tokens,
+            'keyword_scores': keyword_scores,
+            'pattern_scores': pattern_scores,
+            'final_score': final_score,
+            'category': category,
+            'confidence': round(confidence, 3)
+        }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sender Reputation
+Reputação de remetentes e domínios atualizada a cada classificação, com
+decaimento exponencial e snapshots periódicos em disco
+"""
+
+import os
+import re
+import json
+import atexit
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Meia-vida das observações: o peso de uma classificação cai pela metade nesse intervalo
+HALF_LIFE = 7 * 24 * 3600
+
+# Observações (já com decaimento) necessárias para confiar na reputação
+MIN_OBSERVATIONS = 20
+
+# Peso máximo da reputação somado ao final_score quando usada como prior
+PRIOR_WEIGHT = 1.0
+
+SNAPSHOT_INTERVAL = 60
+
+# Entradas mantidas; as de menor peso são descartadas no snapshot
+MAX_ENTRIES = 100000
+
+# Remetente no cabeçalho ('De:' / 'From:') das primeiras linhas do email
+_SENDER_PATTERN = re.compile(r'^\s*(?:de|from)\s*:\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+_ADDRESS_PATTERN = re.compile(r'[\w.+-]+@([\w-]+(?:\.[\w-]+)+)')
+_HEADER_SIZE = 1000
+
+
+def parse_sender(email_content: str) -> Optional[str]:
+    """
+    Extrair o endereço do remetente do cabeçalho do email
+
+    Args:
+        email_content: Conteúdo do email
+
+    Returns:
+        Endereço em minúsculas ou None
+    """
+    match = _SENDER_PATTERN.search(email_content[:_HEADER_SIZE])
+    if not match:
+        return None
+    address = _ADDRESS_PATTERN.search(match.group(1))
+    return address.group(0).lower() if address else None
+
+
+def _domain(sender: str) -> str:
+    """Domínio de um endereço"""
+    return sender.rsplit('@', 1)[1]
+
+
+class SenderReputation:
+    """
+    Tabela de reputação por remetente e por domínio
+
+    Cada chave guarda (peso produtivo, peso total, instante da última
+    atualização); os pesos decaem exponencialmente com o tempo. A
+    probabilidade de produtivo usa um prior Beta(1, 1).
+
+    As atualizações substituem a tupla inteira sob o lock: as leituras,
+    sem lock, veem sempre uma entrada consistente.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, half_life: float = HALF_LIFE):
+        """
+        Args:
+            snapshot_path: Arquivo JSON de snapshot (None mantém só em memória)
+            half_life: Meia-vida das observações em segundos
+        """
+        self.snapshot_path = snapshot_path
+        self.half_life = half_life
+        self.entries: Dict[str, Tuple[float, float, float]] = {}
+        # Incrementada a cada atualização (resultados que dependem da tabela mudam)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._snapshot_pid: Optional[int] = None
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, 'r', encoding='utf-8') as f:
+                    self.entries = {key: tuple(value) for key, value in json.load(f).items()}
+                logger.info(f"Reputação carregada: {len(self.entries)} remetentes/domínios")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot de reputação ignorado: {str(e)}")
+
+        if snapshot_path:
+            atexit.register(self.snapshot)
+
+    def _decay(self, entry: Tuple[float, float, float], now: float) -> float:
+        """Fator de decaimento desde a última atualização"""
+        return 0.5 ** (max(0.0, now - entry[2]) / self.half_life)
+
+    def _observe(self, key: str, productive: float, weight: float, now: float):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = (productive * weight, weight, now)
+            return
+        factor = self._decay(entry, now)
+        self.entries[key] = (entry[0] * factor + productive * weight, entry[1] * factor + weight, now)
+
+    def update(self, sender: Optional[str], productive: bool, weight: float = 1.0):
+        """
+        Registrar uma classificação do remetente (e do seu domínio)
+
+        Args:
+            sender: Endereço do remetente
+            productive: Se o email foi classificado como produtivo
+            weight: Peso da observação (ex.: maior para rótulos confirmados)
+        """
+        if not sender:
+            return
+        now = time.time()
+        with self._lock:
+            self._observe(f'sender:{sender}', float(productive), weight, now)
+            self._observe(f'domain:{_domain(sender)}', float(productive), weight, now)
+            self._dirty = True
+            self.version += 1
+        self._ensure_snapshots()
+
+    def lookup(self, sender: Optional[str]) -> Optional[Tuple[float, float, str]]:
+        """
+        Reputação do remetente, ou do domínio se o remetente for pouco conhecido
+
+        Args:
+            sender: Endereço do remetente
+
+        Returns:
+            (probabilidade de produtivo, observações com decaimento, chave) ou None
+        """
+        if not sender:
+            return None
+        now = time.time()
+        best = None
+        for key in (f'sender:{sender}', f'domain:{_domain(sender)}'):
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            factor = self._decay(entry, now)
+            weight = entry[1] * factor
+            probability = (entry[0] * factor + 1) / (weight + 2)
+            if weight >= MIN_OBSERVATIONS:
+                return probability, weight, key
+            if best is None:
+                best = (probability, weight, key)
+        return best
+
+    def prior(self, sender: Optional[str]) -> float:
+        """
+        Ajuste do final_score pela reputação (positivo favorece produtivo)
+
+        Proporcional a 2p - 1 e ao volume de observações, até PRIOR_WEIGHT.
+        """
+        reputation = self.lookup(sender)
+        if reputation is None:
+            return 0.0
+        probability, weight, _ = reputation
+        return PRIOR_WEIGHT * (2 * probability - 1) * min(1.0, weight / MIN_OBSERVATIONS)
+
+    def _ensure_snapshots(self):
+        """Iniciar a thread de snapshots no processo atual (sobrevive ao fork)"""
+        if not self.snapshot_path or self._snapshot_pid == os.getpid():
+            return
+        with self._lock:
+            if self._snapshot_pid == os.getpid():
+                return
+            self._snapshot_pid = os.getpid()
+        threading.Thread(target=self._snapshot_loop, name='reputation-snapshot', daemon=True).start()
+
+    def _snapshot_loop(self):
+        while True:
+            time.sleep(SNAPSHOT_INTERVAL)
+            try:
+                self.snapshot()
+            except OSError as e:
+                logger.error(f"Erro ao gravar snapshot de reputação: {str(e)}")
+
+    def snapshot(self):
+        """Gravar a tabela em disco (arquivo temporário + rename)"""
+        if not self.snapshot_path:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._dirty:
+                return
+            if len(self.entries) > MAX_ENTRIES:
+                ranked = sorted(self.entries, key=lambda key: self.entries[key][1] * self._decay(self.entries[key], now))
+                for key in ranked[:len(self.entries) - MAX_ENTRIES]:
+                    del self.entries[key]
+            data = json.dumps(self.entries)
+            self._dirty = False
+
+        temp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.snapshot_path)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Tamanho da tabela"""
+        return {'entries': len(self.entries)}
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Parsing
+Camada única de leitura do conteúdo do email a partir de corpos JSON,
+formulário, multipart ou texto puro, com rejeição antecipada por tamanho
+"""
+
+import json
+import logging
+from typing import BinaryIO, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de corpos sem arquivo: 10.000 caracteres cabem com folga
+# mesmo com escapes JSON (\uXXXX) ou codificação de formulário (%XX)
+MAX_TEXT_BODY_SIZE = 128 * 1024
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Mesmo limite de caracteres aplicado pelo /analyze
+MAX_EMAIL_LENGTH = 10000
+
+# Emails (ou arquivos) por requisição de lote
+MAX_BATCH_EMAILS = 50
+BATCH_TOO_LONG_MESSAGE = f'Lista inválida ou muito longa. Máximo: {MAX_BATCH_EMAILS} emails'
+
+# Categorias aceitas como correção em /feedback
+FEEDBACK_CATEGORIES = ('produtivo', 'improdutivo')
+
+
+class RequestError(Exception):
+    """Erro de leitura da requisição, com o status HTTP correspondente"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def read_limited(stream: BinaryIO, limit: int) -> bytes:
+    """
+    Ler um fluxo em blocos, abortando assim que o limite for excedido
+
+    Args:
+        stream: Fluxo de entrada
+        limit: Número máximo de bytes
+
+    Returns:
+        Conteúdo lido
+    """
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > limit:
+            raise RequestError(413, 'Conteúdo muito longo')
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def allowed_extension(filename: str, allowed_extensions: Iterable[str]) -> bool:
+    """Verifica se o arquivo tem extensão permitida"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+def read_uploaded_file(file, classifier, allowed_extensions: Iterable[str], max_size: int) -> str:
+    """
+    Extrair o texto de um arquivo enviado, lendo direto do fluxo do upload
+
+    Args:
+        file: FileStorage do upload
+        classifier: EmailClassifier (extração de PDF)
+        allowed_extensions: Extensões aceitas
+        max_size: Tamanho máximo do arquivo em bytes
+
+    Returns:
+        Texto do arquivo
+    """
+    if not file.filename:
+        raise RequestError(400, 'Nenhum arquivo selecionado')
+
+    if not allowed_extension(file.filename, allowed_extensions):
+        raise RequestError(400, 'Tipo de arquivo não suportado. Use apenas .txt ou .pdf')
+
+    extension = file.filename.rsplit('.', 1)[1].lower()
+
+    if extension == 'txt':
+        data = read_limited(file.stream, max_size)
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            raise RequestError(400, 'Arquivo de texto deve estar em UTF-8')
+
+    if extension == 'pdf':
+        return classifier.extract_pdf_text_from_stream(file.stream)
+
+    raise RequestError(400, 'Tipo de arquivo não suportado')
+
+
+def _text_field(data) -> Optional[str]:
+    """Campo de texto do email ('content' é usado pelo frontend, 'text' pelo formulário)"""
+    value = data.get('content')
+    if value is None:
+        value = data.get('text')
+    if value is not None and not isinstance(value, str):
+        raise RequestError(400, 'Conteúdo do email deve ser texto')
+    return value
+
+
+def parse_email_content(request, classifier, allowed_extensions: Iterable[str], max_file_size: int) -> str:
+    """
+    Obter o conteúdo do email de qualquer formato de corpo suportado
+
+    O Content-Length é verificado antes de qualquer leitura: corpos sem
+    arquivo maiores que MAX_TEXT_BODY_SIZE são rejeitados sem serem lidos.
+
+    Args:
+        request: Requisição Flask
+        classifier: EmailClassifier (extração de PDF)
+        allowed_extensions: Extensões de arquivo aceitas
+        max_file_size: Tamanho máximo de arquivos em bytes
+
+    Returns:
+        Conteúdo do email (sem espaços nas bordas)
+    """
+    mimetype = request.mimetype
+    content_length = request.content_length
+
+    if mimetype == 'multipart/form-data':
+        if content_length is not None and content_length > max_file_size:
+            raise RequestError(413, 'Arquivo muito grande. Tamanho máximo: 10MB')
+
+        if 'file' in request.files:
+            return read_uploaded_file(request.files['file'], classifier,
+                                      allowed_extensions, max_file_size).strip()
+        text = _text_field(request.form)
+    else:
+        if content_length is not None and content_length > MAX_TEXT_BODY_SIZE:
+            raise RequestError(413, 'Conteúdo muito longo. Máximo: 10.000 caracteres')
+
+        if request.is_json:
+            body = read_limited(request.stream, MAX_TEXT_BODY_SIZE)
+            try:
+                data = json.loads(body.decode('utf-8')) if body else None
+            except (UnicodeDecodeError, ValueError):
+                raise RequestError(400, 'JSON inválido')
+            if not isinstance(data, dict):
+                raise RequestError(400, 'Forneça um arquivo ou texto para análise')
+            text = _text_field(data)
+        elif mimetype == 'application/x-www-form-urlencoded':
+            text = _text_field(request.form)
+        elif mimetype == 'text/plain':
+            try:
+                text = read_limited(request.stream, MAX_TEXT_BODY_SIZE).decode('utf-8')
+            except UnicodeDecodeError:
+                raise RequestError(400, 'Texto deve estar em UTF-8')
+        else:
+            text = None
+
+    if text is None:
+        raise RequestError(400, 'Forneça um arquivo ou texto para análise')
+
+    text = text.strip()
+    if not text:
+        raise RequestError(400, 'Texto do email não fornecido')
+
+    return text
+
+
+def parse_feedback(request) -> Tuple[str, str]:
+    """
+    Obter o email e a categoria correta de uma correção (JSON ou formulário)
+
+    Args:
+        request: Requisição Flask
+
+    Returns:
+        Tupla (conteúdo do email, categoria)
+    """
+    if request.content_length is not None and request.content_length > MAX_TEXT_BODY_SIZE:
+        raise RequestError(413, 'Conteúdo muito longo. Máximo: 10.000 caracteres')
+
+    if request.is_json:
+        body = read_limited(request.stream, MAX_TEXT_BODY_SIZE)
+        try:
+            data = json.loads(body.decode('utf-8')) if body else None
+        except (UnicodeDecodeError, ValueError):
+            raise RequestError(400, 'JSON inválido')
+        if not isinstance(data, dict):
+            raise RequestError(400, 'Forneça o email e a categoria correta')
+    else:
+        data = request.form
+
+    text = _text_field(data)
+    if text is None or not text.strip():
+        raise RequestError(400, 'Texto do email não fornecido')
+    text = text.strip()
+    if len(text) > MAX_EMAIL_LENGTH:
+        raise RequestError(400, 'Conteúdo muito longo. Máximo: 10.000 caracteres')
+
+    category = data.get('category')
+    if category not in FEEDBACK_CATEGORIES:
+        raise RequestError(400, 'Categoria inválida. Use produtivo ou improdutivo')
+
+    return text, category
+
+
+def _limit_batch_item(item):
+    """Itens JSON acima de MAX_EMAIL_LENGTH viram itens com 'error', como os arquivos"""
+    content = item.get('content') if isinstance(item, dict) else item
+    if not isinstance(content, str) or len(content) <= MAX_EMAIL_LENGTH:
+        return item
+    error = {'error': 'Conteúdo muito longo. Máximo: 10.000 caracteres'}
+    if isinstance(item, dict) and 'filename' in item:
+        error['filename'] = item['filename']
+    return error
+
+
+def parse_batch_emails(request, classifier, allowed_extensions: Iterable[str], max_file_size: int) -> list:
+    """
+    Obter a lista de emails de um lote (JSON ou multipart com vários arquivos)
+
+    Listas com mais de MAX_BATCH_EMAILS itens são rejeitadas antes de
+    qualquer arquivo ser lido. Em multipart, cada arquivo dos campos
+    'files'/'file' vira um item; falhas de leitura de um arquivo viram itens
+    com 'error', sem abortar o lote; emails acima de MAX_EMAIL_LENGTH também
+    viram itens com 'error'.
+
+    Args:
+        request: Requisição Flask
+        classifier: EmailClassifier (extração de PDF)
+        allowed_extensions: Extensões de arquivo aceitas
+        max_file_size: Tamanho máximo do corpo em bytes
+
+    Returns:
+        Lista de emails (str ou dict com 'content'/'error' e 'filename')
+    """
+    if request.mimetype != 'multipart/form-data':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'emails' not in data:
+            raise RequestError(400, 'Lista de emails não fornecida')
+        emails = data['emails']
+        if not isinstance(emails, list) or len(emails) > MAX_BATCH_EMAILS:
+            raise RequestError(400, BATCH_TOO_LONG_MESSAGE)
+        return [_limit_batch_item(item) for item in emails]
+
+    if request.content_length is not None and request.content_length > max_file_size:
+        raise RequestError(413, 'Arquivo muito grande. Tamanho máximo: 10MB')
+
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        raise RequestError(400, 'Lista de emails não fornecida')
+    # Antes de ler e extrair qualquer arquivo (PDFs custam caro)
+    if len(files) > MAX_BATCH_EMAILS:
+        raise RequestError(400, BATCH_TOO_LONG_MESSAGE)
+
+    emails = []
+    for file in files:
+        try:
+            content = read_uploaded_file(file, classifier, allowed_extensions, max_file_size).strip()
+            if len(content) > MAX_EMAIL_LENGTH:
+                raise RequestError(400, 'Conteúdo muito longo. Máximo: 10.000 caracteres')
+            emails.append({'content': content, 'filename': file.filename})
+        except Exception as e:
+            message = e.message if isinstance(e, RequestError) else str(e)
+            emails.append({'error': message, 'filename': file.filename})
+
+    return emails
@@ -2,27 +2,146 @@
 # -*- coding: utf-8 -*-
 """
 Response Generator
-Gerador de respostas automáticas para emails
+Gerador de respostas automáticas para emails, com templates pré-compilados
+e personalizados pelo remetente, assunto e tópico do email
 """
 
+import zlib
 import random
 import logging
-from typing import Dict, Any
+from string import Template
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Sufixos acrescentados conforme a faixa de confiança
+PRODUCTIVE_SUFFIXES = {
+    'high': " Estou confiante de que podemos trabalhar juntos neste projeto.",
+    'medium': "",
+    'low': " Gostaria de entender melhor suas necessidades."
+}
+
+UNPRODUCTIVE_SUFFIXES = {
+    'high': " Por favor, não envie mais este tipo de email.",
+    'medium': "",
+    'low': " Por favor, entre em contato apenas para assuntos profissionais."
+}
+
+# Slots aceitos nos templates ($nome ou ${nome}, sintaxe de string.Template)
+TEMPLATE_SLOTS = ('sender_name', 'subject', 'topic')
+
+# Abertura por (nome do remetente conhecido, assunto conhecido)
+PRODUCTIVE_OPENINGS = {
+    (True, True): 'Olá, ${sender_name}! Recebi sua mensagem "${subject}". ',
+    (True, False): 'Olá, ${sender_name}! ',
+    (False, True): 'Recebi sua mensagem "${subject}". ',
+    (False, False): ''
+}
+
+# Emails improdutivos não têm o assunto repetido (pode ser a isca de um phishing)
+UNPRODUCTIVE_OPENINGS = {
+    (True, True): 'Olá, ${sender_name}. ',
+    (True, False): 'Olá, ${sender_name}. ',
+    (False, True): '',
+    (False, False): ''
+}
+
+# Tópico usado quando a classificação não encontrou palavra-chave
+DEFAULT_TOPICS = {
+    'trabalho': 'o assunto',
+    'profissional': 'a oportunidade',
+    'comercial': 'a proposta'
+}
+
+
+class CompiledTemplate:
+    """
+    Template dividido uma única vez em trechos fixos e slots
+
+    Renderizar apenas coloca os valores nas posições dos slots e faz um
+    join, sem analisar o texto a cada resposta.
+    """
+
+    __slots__ = ('text', 'segments', 'slots')
+
+    def __init__(self, text: str):
+        """
+        Args:
+            text: Template com $slot ou ${slot} ($$ para um cifrão literal)
+
+        Raises:
+            ValueError: Placeholder malformado ou slot desconhecido
+        """
+        segments: List[Optional[str]] = []
+        slots: List[Tuple[int, str]] = []
+        literal: List[str] = []
+        position = 0
+        for match in Template.pattern.finditer(text):
+            literal.append(text[position:match.start()])
+            position = match.end()
+            if match.group('escaped') is not None:
+                literal.append('$')
+                continue
+            name = match.group('named') or match.group('braced')
+            if name not in TEMPLATE_SLOTS:
+                raise ValueError(f"Template inválido ({match.group(0)!r}): {text!r}")
+            segments.append(''.join(literal))
+            literal = []
+            slots.append((len(segments), name))
+            segments.append(None)
+        literal.append(text[position:])
+        segments.append(''.join(literal))
+
+        self.text = text
+        self.segments = tuple(segments)
+        self.slots = tuple(slots)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """
+        Preencher os slots
+
+        Args:
+            values: Valor de cada slot usado pelo template
+
+        Returns:
+            Texto final
+        """
+        if not self.slots:
+            return self.segments[0]
+        parts = list(self.segments)
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return ''.join(parts)
+
+
+def _freeze_templates(templates: Dict[str, list]) -> Mapping[str, Tuple[str, ...]]:
+    """Templates por subcategoria em estrutura somente leitura"""
+    return MappingProxyType({subcategory: tuple(texts) for subcategory, texts in templates.items()})
+
+
 class ResponseGenerator:
     """
     Gerador de respostas automáticas para emails
+
+    Templates e variantes são imutáveis após a construção: uma instância
+    atende todas as threads do servidor sem lock.
     """
     
-    def __init__(self):
-        """Inicializar o gerador de respostas"""
+    def __init__(self, deterministic: bool = False):
+        """
+        Inicializar o gerador de respostas
+        
+        Args:
+            deterministic: Escolher a resposta a partir do hash do conteúdo
+                           (emails idênticos recebem respostas idênticas)
+        """
+        self.deterministic = deterministic
         
         # Templates de resposta para emails produtivos
-        self.productive_templates = {
+        self.productive_templates = _freeze_templates({
             'trabalho': [
-                "Obrigado pelo seu email. Vou analisar as informações e retornarei em breve com uma resposta detalhada.",
+                "Obrigado pelo seu email sobre ${topic}. Vou analisar as informações e retornarei em breve com uma resposta detalhada.",
                 "Perfeito! Este é um assunto importante que merece nossa atenção. Vou agendar uma reunião para discutirmos em detalhes.",
                 "Excelente proposta! Gostaria de agendar uma conversa para explorarmos melhor essa oportunidade.",
                 "Obrigado pelo contato profissional. Vou revisar o material e entrarei em contato nos próximos dias.",
@@ -32,20 +151,20 @@ class ResponseGenerator:
                 "Obrigado pelo interesse em nossa empresa. Vou analisar seu perfil e entrarei em contato em breve.",
                 "Perfeito! Sua experiência é muito relevante. Vou agendar uma entrevista para conhecermos melhor.",
                 "Excelente currículo! Vou compartilhar com nossa equipe de RH e retornarei com informações sobre o processo seletivo.",
-                "Obrigado pela candidatura. Vou analisar suas qualificações e entrarei em contato em breve.",
+                "Obrigado pela mensagem sobre ${topic}. Vou analisar suas qualificações e entrarei em contato em breve.",
                 "Interessante perfil! Vou agendar uma conversa para discutirmos as oportunidades disponíveis."
             ],
             'comercial': [
                 "Obrigado pelo interesse em nossos produtos/serviços. Vou preparar uma proposta personalizada para você.",
                 "Perfeito! Vou analisar suas necessidades e retornarei com uma solução adequada.",
                 "Excelente oportunidade! Vou agendar uma demonstração para apresentarmos nossas soluções.",
-                "Obrigado pelo contato comercial. Vou preparar um orçamento detalhado e entrarei em contato em breve.",
+                "Obrigado pelo contato comercial sobre ${topic}. Vou preparar um orçamento detalhado e entrarei em contato em breve.",
                 "Interessante projeto! Vou analisar a viabilidade e retornarei com uma proposta comercial."
             ]
-        }
+        })
         
         # Templates de resposta para emails improdutivos
-        self.unproductive_templates = {
+        self.unproductive_templates = _freeze_templates({
             'spam': [
                 "Obrigado pelo contato, mas não posso participar deste tipo de proposta.",
                 "Agradeço o envio, mas não tenho interesse neste tipo de oportunidade.",
@@ -74,20 +193,95 @@ class ResponseGenerator:
                 "Agradeço o contato, mas não atualizo dados pessoais por email.",
                 "Obrigado, mas não clico em links de verificação de conta."
             ]
-        }
+        })
         
         # Respostas neutras para casos especiais
-        self.neutral_templates = [
+        self.neutral_templates = (
             "Obrigado pelo seu email. Vou analisar o conteúdo e retornarei em breve.",
             "Agradeço o contato. Vou revisar as informações e entrarei em contato em breve.",
             "Obrigado pela mensagem. Vou analisar o assunto e retornarei em breve.",
             "Agradeço o email. Vou revisar o conteúdo e entrarei em contato em breve.",
             "Obrigado pelo contato. Vou analisar as informações e retornarei em breve."
-        ]
+        )
+        
+        # Variantes completas (abertura + template + sufixo) compiladas por
+        # subcategoria, faixa de confiança e dados de personalização disponíveis
+        self.productive_variants = self._build_variants(self.productive_templates, PRODUCTIVE_SUFFIXES,
+                                                        PRODUCTIVE_OPENINGS)
+        self.unproductive_variants = self._build_variants(self.unproductive_templates, UNPRODUCTIVE_SUFFIXES,
+                                                          UNPRODUCTIVE_OPENINGS)
+        self.neutral_variants = self.neutral_templates
         
         logger.info("ResponseGenerator inicializado com sucesso")
     
-    def generate_response(self, category: str, email_content: str, confidence: float) -> str:
+    def _build_variants(self, templates: Mapping[str, Tuple[str, ...]], suffixes: Dict[str, str],
+                        openings: Dict[Tuple[bool, bool], str]) -> Mapping[tuple, Tuple[CompiledTemplate, ...]]:
+        """
+        Compilar todas as respostas possíveis
+        
+        Args:
+            templates: Templates por subcategoria
+            suffixes: Sufixo de cada faixa de confiança
+            openings: Abertura por (nome conhecido, assunto conhecido)
+            
+        Returns:
+            Mapeamento somente leitura (subcategoria, faixa, chave da abertura)
+            -> tupla de templates compilados
+        """
+        variants = {}
+        for subcategory, subcategory_templates in templates.items():
+            for tier in ('high', 'medium', 'low'):
+                # Baixa confiança usa as respostas neutras
+                bodies = self.neutral_templates if tier == 'low' else subcategory_templates
+                for opening_key, opening in openings.items():
+                    variants[(subcategory, tier, opening_key)] = tuple(
+                        CompiledTemplate(opening + body + suffixes[tier]) for body in bodies
+                    )
+        return MappingProxyType(variants)
+    
+    @staticmethod
+    def _slot_values(context: Optional[Dict[str, Any]], topic: Optional[str] = None) -> Dict[str, Any]:
+        """Valores dos slots a partir do contexto extraído na classificação"""
+        context = context or {}
+        return {
+            'sender_name': context.get('sender_name'),
+            'subject': context.get('subject'),
+            'topic': context.get('topic') or topic
+        }
+    
+    @staticmethod
+    def _opening_key(values: Dict[str, Any]) -> Tuple[bool, bool]:
+        return values['sender_name'] is not None, values['subject'] is not None
+    
+    @staticmethod
+    def _confidence_tier(confidence: float) -> str:
+        """Faixa de confiança usada na escolha da resposta"""
+        if confidence >= 0.9:
+            return 'high'
+        if confidence >= 0.8:
+            return 'medium'
+        return 'low'
+    
+    def _select(self, variants: tuple, email_content: str, seed: Optional[int] = None):
+        """
+        Escolher uma das variantes
+        
+        Args:
+            variants: Respostas possíveis
+            email_content: Conteúdo do email
+            seed: Semente explícita da requisição (opcional)
+            
+        Returns:
+            Variante escolhida
+        """
+        if seed is not None:
+            return variants[seed % len(variants)]
+        if self.deterministic:
+            return variants[zlib.crc32(email_content.encode('utf-8')) % len(variants)]
+        return random.choice(variants)
+    
+    def generate_response(self, category: str, email_content: str, confidence: float,
+                          seed: Optional[int] = None, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Gerar resposta automática baseada na categoria do email
         
@@ -95,89 +289,72 @@ class ResponseGenerator:
             category: Categoria do email (produtivo/improdutivo)
             email_content: Conteúdo do email
             confidence: Nível de confiança da classificação
+            seed: Semente para escolha reprodutível da resposta (opcional)
+            context: Personalização extraída na classificação (resultado['context']:
+                     sender_name, subject, topic); sem ela a resposta é genérica
             
         Returns:
             Resposta automática gerada
         """
         try:
             if category == 'produtivo':
-                return self._generate_productive_response(email_content, confidence)
+                return self._generate_productive_response(email_content, confidence, seed, context)
             else:
-                return self._generate_unproductive_response(email_content, confidence)
+                return self._generate_unproductive_response(email_content, confidence, seed, context)
                 
         except Exception as e:
             logger.error(f"Erro ao gerar resposta: {str(e)}")
-            return random.choice(self.neutral_templates)
+            return self._select(self.neutral_variants, email_content, seed)
     
-    def _generate_productive_response(self, email_content: str, confidence: float) -> str:
+    def _generate_productive_response(self, email_content: str, confidence: float,
+                                      seed: Optional[int] = None, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Gerar resposta para email produtivo
         
         Args:
             email_content: Conteúdo do email
             confidence: Nível de confiança
+            seed: Semente para escolha da resposta (opcional)
+            context: Personalização (remetente, assunto, tópico)
             
         Returns:
             Resposta produtiva
         """
         # Determinar subcategoria baseada no conteúdo
         subcategory = self._identify_productive_subcategory(email_content)
+        if subcategory not in self.productive_templates:
+            subcategory = 'trabalho'  # Default
         
-        # Selecionar template apropriado
-        if subcategory in self.productive_templates:
-            templates = self.productive_templates[subcategory]
-        else:
-            templates = self.productive_templates['trabalho']  # Default
-        
-        # Selecionar resposta baseada na confiança
-        if confidence >= 0.9:
-            # Alta confiança - resposta mais específica
-            response = random.choice(templates)
-            response += " Estou confiante de que podemos trabalhar juntos neste projeto."
-        elif confidence >= 0.8:
-            # Média-alta confiança - resposta padrão
-            response = random.choice(templates)
-        else:
-            # Baixa confiança - resposta mais genérica
-            response = random.choice(self.neutral_templates)
-            response += " Gostaria de entender melhor suas necessidades."
-        
-        return response
+        # Alta confiança: resposta específica com sufixo; média: padrão;
+        # baixa: resposta neutra mais genérica
+        values = self._slot_values(context, DEFAULT_TOPICS[subcategory])
+        variants = self.productive_variants[(subcategory, self._confidence_tier(confidence), self._opening_key(values))]
+        return self._select(variants, email_content, seed).render(values)
     
-    def _generate_unproductive_response(self, email_content: str, confidence: float) -> str:
+    def _generate_unproductive_response(self, email_content: str, confidence: float,
+                                        seed: Optional[int] = None, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Gerar resposta para email improdutivo
         
         Args:
             email_content: Conteúdo do email
             confidence: Nível de confiança
+            seed: Semente para escolha da resposta (opcional)
+            context: Personalização (remetente)
             
         Returns:
             Resposta improdutiva
         """
         # Determinar subcategoria baseada no conteúdo
         subcategory = self._identify_unproductive_subcategory(email_content)
+        if subcategory not in self.unproductive_templates:
+            subcategory = 'spam'  # Default
         
-        # Selecionar template apropriado
-        if subcategory in self.unproductive_templates:
-            templates = self.unproductive_templates[subcategory]
-        else:
-            templates = self.unproductive_templates['spam']  # Default
-        
-        # Selecionar resposta baseada na confiança
-        if confidence >= 0.9:
-            # Alta confiança - resposta mais direta
-            response = random.choice(templates)
-            response += " Por favor, não envie mais este tipo de email."
-        elif confidence >= 0.8:
-            # Média-alta confiança - resposta padrão
-            response = random.choice(templates)
-        else:
-            # Baixa confiança - resposta mais educada
-            response = random.choice(self.neutral_templates)
-            response += " Por favor, entre em contato apenas para assuntos profissionais."
-        
-        return response
+        # Alta confiança: resposta direta com sufixo; média: padrão;
+        # baixa: resposta neutra mais educada
+        values = self._slot_values(context)
+        variants = self.unproductive_variants[(subcategory, self._confidence_tier(confidence), self._opening_key(values))]
+        return self._select(variants, email_content, seed).render(values)
     
     def _identify_productive_subcategory(self, email_content: str) -> str:
         """
@@ -272,7 +449,7 @@ class ResponseGenerator:
             
         except Exception as e:
             logger.error(f"Erro ao gerar resposta customizada: {str(e)}")
-            return random.choice(self.neutral_templates)
+            return self._select(self.neutral_variants, "")
     
     def get_response_templates(self, category: str = None) -> Dict[str, Any]:
         """
@@ -287,12 +464,12 @@ class ResponseGenerator:
         if category:
             if category == 'produtivo':
                 return {
-                    'templates': self.productive_templates,
+                    'templates': dict(self.productive_templates),
                     'count': sum(len(templates) for templates in self.productive_templates.values())
                 }
             elif category == 'improdutivo':
                 return {
-                    'templates': self.unproductive_templates,
+                    'templates': dict(self.unproductive_templates),
                     'count': sum(len(templates) for templates in self.unproductive_templates.values())
                 }
             else:
@@ -300,11 +477,11 @@ class ResponseGenerator:
         
         return {
             'productive': {
-                'templates': self.productive_templates,
+                'templates': dict(self.productive_templates),
                 'count': sum(len(templates) for templates in self.productive_templates.values())
             },
             'unproductive': {
-                'templates': self.unproductive_templates,
+                'templates': dict(self.unproductive_templates),
                 'count': sum(len(templates) for templates in self.unproductive_templates.values())
             },
             'neutral': {
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Production Server
+Servidor pré-fork: o processo mestre carrega os modelos uma única vez e
+cria os workers com fork, compartilhando a memória somente-leitura
+(copy-on-write)
+"""
+
+import gc
+import os
+import atexit
+import sys
+import time
+import errno
+import signal
+import socket
+import logging
+import threading
+from typing import Dict
+from werkzeug.serving import make_server
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Processo worker: atende requisições no socket herdado do mestre
+    """
+
+    def __init__(self, sock: socket.socket, wsgi_app, max_requests: int = 0):
+        """
+        Args:
+            sock: Socket de escuta compartilhado
+            wsgi_app: Aplicação WSGI já carregada
+            max_requests: Requisições atendidas antes da reciclagem (0 = sem limite)
+        """
+        self.sock = sock
+        self.wsgi_app = wsgi_app
+        self.max_requests = max_requests
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.server = None
+
+    def stop(self):
+        """Parar de aceitar conexões e encerrar após as requisições em andamento"""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        # shutdown() bloqueia até o loop terminar; não pode rodar na thread do loop
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def counting_app(self, environ, start_response):
+        """Aplicação WSGI que conta requisições para a reciclagem do worker"""
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            if self.max_requests:
+                with self._lock:
+                    self.requests_served += 1
+                    recycle = self.requests_served >= self.max_requests
+                if recycle:
+                    logger.info(f"Worker {os.getpid()} atingiu {self.max_requests} requisições, reciclando")
+                    self.stop()
+
+    def run(self):
+        """Loop principal do worker"""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        # Ctrl+C e SIGHUP são tratados pelo mestre
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        host, port = self.sock.getsockname()[:2]
+        self.server = make_server(host, port, self.counting_app, threaded=True, fd=self.sock.fileno())
+        # Aguardar as threads de requisição ao encerrar (desligamento gracioso)
+        self.server.daemon_threads = False
+
+        logger.info(f"Worker {os.getpid()} pronto")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+        logger.info(f"Worker {os.getpid()} encerrado")
+
+
+class Master:
+    """
+    Processo mestre: mantém o número de workers, recicla e encerra com elegância
+    """
+
+    def __init__(self, sock: socket.socket, wsgi_app, workers: int, max_requests: int = 0,
+                 graceful_timeout: int = 30):
+        """
+        Args:
+            sock: Socket de escuta
+            wsgi_app: Aplicação WSGI pré-carregada
+            workers: Número de workers
+            max_requests: Requisições por worker antes da reciclagem (0 = sem limite)
+            graceful_timeout: Segundos aguardados antes de forçar o encerramento
+        """
+        self.sock = sock
+        self.wsgi_app = wsgi_app
+        self.num_workers = max(1, workers)
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn_worker(self):
+        """Criar um worker com fork"""
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                Worker(self.sock, self.wsgi_app, self.max_requests).run()
+            except Exception as e:
+                logger.error(f"Erro no worker {os.getpid()}: {str(e)}")
+                exit_code = 1
+            finally:
+                # os._exit ignora o atexit: gravar o que ficou pendente (ex.: histórico)
+                atexit._run_exitfuncs()
+                os._exit(exit_code)
+        self.workers[pid] = time.time()
+
+    def reap_workers(self):
+        """Recolher workers encerrados"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.workers.pop(pid, None) is not None and not self.stopping:
+                logger.info(f"Worker {pid} saiu (status {status})")
+
+    def signal_workers(self, signum: int, pids=None):
+        """Enviar um sinal aos workers"""
+        for pid in list(pids if pids is not None else self.workers):
+            try:
+                os.kill(pid, signum)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+
+    def reload(self):
+        """Reciclar todos os workers: novos são criados antes de parar os antigos"""
+        old_workers = list(self.workers)
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+        self.signal_workers(signal.SIGTERM, old_workers)
+
+    def run(self):
+        """Loop principal do mestre"""
+        def handle_stop(signum, frame):
+            self.stopping = True
+
+        def handle_reload(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, handle_stop)
+        signal.signal(signal.SIGINT, handle_stop)
+        signal.signal(signal.SIGHUP, handle_reload)
+
+        logger.info(f"Mestre {os.getpid()} iniciando {self.num_workers} workers")
+
+        while not self.stopping:
+            self.reap_workers()
+
+            if self.reload_requested:
+                self.reload_requested = False
+                logger.info("Reciclando workers")
+                self.reload()
+
+            while len(self.workers) < self.num_workers and not self.stopping:
+                self.spawn_worker()
+
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Encerrar os workers, aguardando as requisições em andamento"""
+        logger.info("Encerrando workers")
+        self.signal_workers(signal.SIGTERM)
+
+        deadline = time.time() + self.graceful_timeout
+        while self.workers and time.time() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+
+        if self.workers:
+            logger.warning(f"Forçando o encerramento de {len(self.workers)} workers")
+            self.signal_workers(signal.SIGKILL)
+            while self.workers:
+                self.reap_workers()
+                time.sleep(0.1)
+
+        self.sock.close()
+
+
+def preload_app():
+    """
+    Importar a aplicação: o classificador é criado e aquecido (corpora do
+    NLTK, WordNet, tabelas de palavras-chave) ainda no processo mestre
+
+    Returns:
+        Aplicação WSGI pronta
+    """
+    start_time = time.time()
+    import app as app_module
+
+    # Objetos já carregados não são mais visitados pelo GC, evitando
+    # escritas que quebrariam o compartilhamento copy-on-write
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Modelos pré-carregados em {time.time() - start_time:.2f}s")
+    return app_module.app
+
+
+def main():
+    """Função principal"""
+    host = os.getenv('FLASK_HOST', '0.0.0.0')
+    port = int(os.getenv('FLASK_PORT', 5000))
+    workers = int(os.getenv('MAX_WORKERS', 4))
+    max_requests = int(os.getenv('WORKER_MAX_REQUESTS', 0))
+    graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+
+    wsgi_app = preload_app()
+
+    if not hasattr(os, 'fork'):
+        # Sem fork (Windows): servidor multi-thread em processo único
+        logger.warning("fork indisponível, usando servidor de processo único")
+        make_server(host, port, wsgi_app, threaded=True).serve_forever()
+        return
+
+    sock = socket.create_server((host, port), backlog=128)
+    sock.set_inheritable(True)
+    logger.info(f"Servindo Email Classifier API em {host}:{port}")
+
+    Master(sock, wsgi_app, workers, max_requests, graceful_timeout).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
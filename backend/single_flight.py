@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single Flight
+Coalescência de chamadas concorrentes idênticas em uma única execução
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def content_hash(content: str) -> str:
+    """
+    Calcular o hash do conteúdo de um email
+
+    Args:
+        content: Conteúdo do email
+
+    Returns:
+        Hash SHA-256 em hexadecimal
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """Execução em andamento compartilhada pelos chamadores da mesma chave"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Garante que apenas uma execução por chave esteja em andamento;
+    chamadas concorrentes com a mesma chave aguardam e compartilham o resultado
+    """
+
+    def __init__(self):
+        """Inicializar o registro de execuções em andamento"""
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Executar fn uma única vez para as chamadas concorrentes com a mesma chave
+
+        Args:
+            key: Chave da execução (ex.: hash do conteúdo)
+            fn: Função sem argumentos que produz o resultado
+
+        Returns:
+            Resultado de fn (compartilhado entre as chamadas coalescidas)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def do_many(self, keys: List[str],
+                fn: Callable[[List[int]], List[Tuple[Any, Optional[Exception]]]]
+                ) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Versão em lote de do: chaves já em andamento são aguardadas e as
+        demais são calculadas por uma única chamada de fn
+
+        Args:
+            keys: Chave de cada item
+            fn: Recebe as posições das chaves lideradas por esta chamada e
+                devolve (resultado, exceção) de cada uma, na mesma ordem
+
+        Returns:
+            (resultado, exceção) de cada chave; exatamente um dos dois é None
+        """
+        calls = []
+        led = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                call = self._calls.get(key)
+                if call is not None:
+                    self.coalesced += 1
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executed += 1
+                    led.append(position)
+                calls.append(call)
+
+        if led:
+            outcomes = []
+            error = None
+            try:
+                outcomes = fn(led)
+            except Exception as e:
+                error = e
+            finally:
+                with self._lock:
+                    for number, position in enumerate(led):
+                        call = calls[position]
+                        if number < len(outcomes):
+                            call.result, call.error = outcomes[number]
+                        else:
+                            call.error = error or RuntimeError('Execução interrompida')
+                        del self._calls[keys[position]]
+                for position in led:
+                    calls[position].done.set()
+
+        results = []
+        for call in calls:
+            call.done.wait()
+            results.append((call.result, call.error))
+        return results
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Obter contadores de execução
+
+        Returns:
+            Dicionário com execuções, chamadas coalescidas e em andamento
+        """
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
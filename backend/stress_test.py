@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrency Stress Test
+Chama classify_email (e classify_batch / generate_response) de muitas
+threads ao mesmo tempo sobre o corpus de exemplos e confere se cada
+resultado é idêntico ao obtido em uma única thread
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Tuple
+from classifier import EmailClassifier, DETAIL_FULL
+from response_generator import ResponseGenerator
+from corpus import EXAMPLES_PATH, load_example_emails
+
+# Intervalo de troca do GIL durante o teste: trocas frequentes expõem mais intercalações
+SWITCH_INTERVAL = 1e-5
+
+# Emails de cada chamada a classify_batch
+BATCH_SIZE = 8
+
+_ENGLISH_EMAIL = (
+    "Dear team, please confirm your availability for the project meeting next week. "
+    "We need to review the contract proposal and the budget before the client presentation."
+)
+
+
+def build_corpus(path: str) -> List[str]:
+    """
+    Emails usados no teste: exemplos, a versão em inglês e combinações
+
+    Args:
+        path: Arquivo de emails de exemplo
+
+    Returns:
+        Lista de conteúdos (os dois idiomas e ambos os caminhos de pontuação)
+    """
+    emails = [content for _, content in load_example_emails(path)]
+    emails.append(_ENGLISH_EMAIL)
+    # Combinações: textos maiores e mistura de palavras-chave das duas categorias
+    emails.extend(f'{first}\n\n{second}' for first, second in zip(emails, reversed(emails)))
+    return emails
+
+
+def _strip_timing(value: Any) -> Any:
+    """Remover processing_time (único campo que varia entre execuções)"""
+    if isinstance(value, dict):
+        return {key: _strip_timing(item) for key, item in value.items() if key != 'processing_time'}
+    if isinstance(value, list):
+        return [_strip_timing(item) for item in value]
+    return value
+
+
+def run_call(classifier: EmailClassifier, generator: ResponseGenerator,
+             emails: List[str], kind: str, indexes: Tuple[int, ...]) -> List[Any]:
+    """
+    Executar uma operação sobre os emails indicados
+
+    Args:
+        kind: 'classify', 'batch' ou 'response'
+        indexes: Posições dos emails no corpus
+
+    Returns:
+        Um resultado (sem tempos) por email
+    """
+    if kind == 'batch':
+        results = classifier.classify_batch([emails[i] for i in indexes], detail=DETAIL_FULL)
+        return [_strip_timing(result) for result in results]
+
+    results = []
+    for index in indexes:
+        result = _strip_timing(classifier.classify_email(emails[index], detail=DETAIL_FULL))
+        if kind == 'response':
+            result = generator.generate_response(result['category'], emails[index], result['confidence'],
+                                                 context=result.get('context'))
+        results.append(result)
+    return results
+
+
+class StressTest:
+    """
+    Threads concorrentes comparando resultados com a referência serial
+
+    Todas as threads partem juntas (barreira) e sorteiam operação e emails
+    a cada iteração; qualquer diferença ou exceção é registrada.
+    """
+
+    def __init__(self, classifier: EmailClassifier, generator: ResponseGenerator,
+                 emails: List[str], threads: int, iterations: int, seed: int = 0):
+        self.classifier = classifier
+        self.generator = generator
+        self.emails = emails
+        self.threads = threads
+        self.iterations = iterations
+        self.seed = seed
+        self.calls = 0
+        self.mismatches: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+        self.observed: Dict[Tuple[str, int], List[Tuple[int, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def reference(self) -> Dict[Tuple[str, int], Any]:
+        """Resultados de cada email e operação em uma única thread"""
+        expected = {}
+        for index in range(len(self.emails)):
+            for kind in ('classify', 'response'):
+                expected[(kind, index)] = run_call(self.classifier, self.generator, self.emails, kind, (index,))[0]
+        return expected
+
+    def _worker(self, number: int, barrier: threading.Barrier):
+        rng = random.Random(self.seed * 1000 + number)
+        barrier.wait()
+        for _ in range(self.iterations):
+            kind = rng.choice(('classify', 'batch', 'response'))
+            size = BATCH_SIZE if kind == 'batch' else 1
+            indexes = tuple(rng.randrange(len(self.emails)) for _ in range(size))
+            try:
+                results = run_call(self.classifier, self.generator, self.emails, kind, indexes)
+            except Exception as e:
+                with self._lock:
+                    self.errors.append(f'{kind} {indexes}: {type(e).__name__}: {e}')
+                continue
+
+            with self._lock:
+                self.calls += 1
+                for index, result in zip(indexes, results):
+                    key = ('response' if kind == 'response' else 'classify', index)
+                    self.observed.setdefault(key, []).append((number, result))
+
+    def hammer(self) -> float:
+        """
+        Executar as threads
+
+        Returns:
+            Duração em segundos
+        """
+        barrier = threading.Barrier(self.threads)
+        workers = [threading.Thread(target=self._worker, args=(number, barrier), name=f'stress-{number}')
+                   for number in range(self.threads)]
+        start_time = time.time()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.time() - start_time
+
+    def compare(self, expected: Dict[Tuple[str, int], Any]):
+        """Registrar cada resultado concorrente diferente da referência"""
+        for key, results in self.observed.items():
+            for number, result in results:
+                if result != expected[key]:
+                    self.mismatches.append({'operation': key[0], 'email': key[1], 'thread': number,
+                                            'expected': expected[key], 'got': result})
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Teste de estresse de classify_email com muitas threads')
+    parser.add_argument('corpus', nargs='?', default=EXAMPLES_PATH, help='Arquivo de emails de exemplo')
+    parser.add_argument('--threads', type=int, default=16, help='Threads simultâneas')
+    parser.add_argument('--iterations', type=int, default=200, help='Operações por thread')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do sorteio de operações')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Uma linha por email classificado encobriria o relatório
+    logging.getLogger('classifier').setLevel(logging.WARNING)
+
+    classifier = EmailClassifier()
+    # Reputação e modelo de feedback mudam com o uso: desligados para resultados reprodutíveis
+    classifier.reputation = None
+    classifier.learner = None
+    generator = ResponseGenerator(deterministic=True)
+    emails = build_corpus(args.corpus)
+
+    test = StressTest(classifier, generator, emails, args.threads, args.iterations, args.seed)
+    expected = test.reference()
+
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    try:
+        duration = test.hammer()
+    finally:
+        sys.setswitchinterval(previous_interval)
+
+    test.compare(expected)
+
+    print(f"{len(emails)} emails, {args.threads} threads x {args.iterations} operações "
+          f"({test.calls} chamadas em {duration:.2f}s, {test.calls / duration:.0f}/s)")
+    for error in test.errors[:10]:
+        print(f"ERRO {error}")
+    for mismatch in test.mismatches[:10]:
+        print(f"DIFERENÇA {mismatch['operation']} email {mismatch['email']} (thread {mismatch['thread']}):")
+        print(f"  esperado: {mismatch['expected']}")
+        print(f"  obtido:   {mismatch['got']}")
+
+    if test.errors or test.mismatches:
+        print(f"FALHA: {len(test.errors)} exceções, {len(test.mismatches)} resultados divergentes")
+        return 1
+    print("OK: todos os resultados concorrentes iguais à referência serial")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
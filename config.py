@@ -38,6 +38,23 @@ class Config:
     MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 4))
     REQUEST_TIMEOUT = int(os.environ.get('REQUEST_TIMEOUT', 30))
     
+    # Controle de admissão (vagas simultâneas e fila por classe de requisição)
+    ADMISSION_LIMITS = {
+        'single': {'concurrency': int(os.environ.get('ADMISSION_SINGLE_CONCURRENCY', 8)),
+                   'queue': int(os.environ.get('ADMISSION_SINGLE_QUEUE', 32))},
+        'batch': {'concurrency': int(os.environ.get('ADMISSION_BATCH_CONCURRENCY', 2)),
+                  'queue': int(os.environ.get('ADMISSION_BATCH_QUEUE', 4))},
+        'upload': {'concurrency': int(os.environ.get('ADMISSION_UPLOAD_CONCURRENCY', 4)),
+                   'queue': int(os.environ.get('ADMISSION_UPLOAD_QUEUE', 8))}
+    }
+    # Fração do REQUEST_TIMEOUT que uma requisição pode passar na fila
+    ADMISSION_QUEUE_FRACTION = float(os.environ.get('ADMISSION_QUEUE_FRACTION', 0.5))
+    
+    # Perfil de requisições sob demanda (desativado por padrão)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'  # cabeçalho X-Profile
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile')  # cprofile ou sample
+    
     # Configurações de email (para futuras funcionalidades)
     SMTP_SERVER = os.environ.get('SMTP_SERVER', 'localhost')
     SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
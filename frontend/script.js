@@ -1,9 +1,20 @@
 // Email Classifier - Frontend JavaScript
+
+// Limites alinhados com o backend (MAX_CONTENT_LENGTH, MAX_EMAIL_LENGTH e lote máximo)
+const MAX_UPLOAD_SIZE = 10 * 1024 * 1024;
+const MAX_BATCH_FILES = 50;
+const MAX_EMAIL_LENGTH = 10000;
+// Até 4 bytes por caractere em UTF-8: um .txt maior certamente excede MAX_EMAIL_LENGTH
+const MAX_TEXT_FILE_SIZE = MAX_EMAIL_LENGTH * 4;
+const TOO_LONG_MESSAGE = 'Conteúdo muito longo. Máximo: 10.000 caracteres';
+
 class EmailClassifier {
     constructor() {
         this.initializeElements();
         this.bindEvents();
-        this.currentFile = null;
+        this.currentFiles = [];
+        // Conteúdo da última análise de texto (permite enviar uma correção)
+        this.lastContent = null;
     }
 
     initializeElements() {
@@ -18,6 +29,7 @@ class EmailClassifier {
         this.aiResponse = document.getElementById('aiResponse');
         this.copyResponseBtn = document.getElementById('copyResponseBtn');
         this.newAnalysisBtn = document.getElementById('newAnalysisBtn');
+        this.uploadProgress = document.getElementById('uploadProgress');
     }
 
     bindEvents() {
@@ -56,70 +68,103 @@ class EmailClassifier {
         });
 
         uploadArea.addEventListener('drop', (e) => {
-            const files = e.dataTransfer.files;
+            const files = Array.from(e.dataTransfer.files);
             if (files.length > 0) {
-                this.handleFile(files[0]);
+                this.handleFiles(files);
             }
         });
     }
 
     handleFileSelect(event) {
-        const file = event.target.files[0];
-        if (file) {
-            this.handleFile(file);
+        const files = Array.from(event.target.files);
+        if (files.length > 0) {
+            this.handleFiles(files);
         }
     }
 
-    handleFile(file) {
-        // Validate file type
-        const allowedTypes = ['text/plain', 'application/pdf'];
-        if (!allowedTypes.includes(file.type)) {
+    isPdf(file) {
+        return file.type === 'application/pdf' || file.name.toLowerCase().endsWith('.pdf');
+    }
+
+    isText(file) {
+        return file.type === 'text/plain' || file.name.toLowerCase().endsWith('.txt');
+    }
+
+    handleFiles(files) {
+        // Validate file types
+        if (files.some(file => !this.isPdf(file) && !this.isText(file))) {
             this.showNotification('Tipo de arquivo não suportado. Use apenas .txt ou .pdf', 'error');
             return;
         }
 
-        // Validate file size (max 5MB)
-        if (file.size > 5 * 1024 * 1024) {
-            this.showNotification('Arquivo muito grande. Tamanho máximo: 5MB', 'error');
+        if (files.length > MAX_BATCH_FILES) {
+            this.showNotification(`Selecione no máximo ${MAX_BATCH_FILES} arquivos`, 'error');
             return;
         }
 
-        this.currentFile = file;
-        this.fileName.textContent = `📎 ${file.name}`;
+        // Texto acima do limite de caracteres seria recusado pelo backend
+        if (files.some(file => this.isText(file) && file.size > MAX_TEXT_FILE_SIZE)) {
+            this.showNotification(TOO_LONG_MESSAGE, 'error');
+            return;
+        }
+
+        // Validate size (max 10MB, the whole upload goes in a single request)
+        const totalSize = files.reduce((total, file) => total + file.size, 0);
+        if (totalSize > MAX_UPLOAD_SIZE) {
+            this.showNotification('Arquivo muito grande. Tamanho máximo: 10MB', 'error');
+            return;
+        }
+
+        this.currentFiles = files;
+        this.fileName.textContent = files.length === 1
+            ? `📎 ${files[0].name}`
+            : `📎 ${files.length} arquivos selecionados`;
         this.fileName.className = 'mt-3 text-sm text-green-600 font-medium';
 
         // Clear text input when file is selected
         this.emailText.value = '';
 
-        this.showNotification(`Arquivo "${file.name}" selecionado com sucesso!`, 'success');
+        const message = files.length === 1
+            ? `Arquivo "${files[0].name}" selecionado com sucesso!`
+            : `${files.length} arquivos selecionados com sucesso!`;
+        this.showNotification(message, 'success');
     }
 
     async analyzeEmail() {
         const text = this.emailText.value.trim();
 
-        if (!this.currentFile && !text) {
+        if (this.currentFiles.length === 0 && !text) {
             this.showNotification('Por favor, selecione um arquivo ou insira o texto do email', 'error');
             return;
         }
 
         this.showLoading();
+        this.lastContent = null;
 
         try {
-            let emailContent = '';
-
-            if (this.currentFile) {
-                emailContent = await this.readFileContent(this.currentFile);
+            const files = this.currentFiles;
+
+            if (files.length > 1) {
+                // Vários arquivos: uma única requisição ao endpoint de lote
+                const results = await this.uploadBatch(files);
+                this.displayBatchResults(results);
+            } else if (files.length === 1 && this.isPdf(files[0])) {
+                // PDF: o backend extrai o texto do arquivo
+                const result = await this.uploadFile(files[0]);
+                this.displayResults(result);
             } else {
-                emailContent = text;
+                const emailContent = files.length === 1 ? await this.readFileContent(files[0]) : text;
+                // Contagem em caracteres (code points), como no backend
+                if ([...emailContent.trim()].length > MAX_EMAIL_LENGTH) {
+                    throw new Error(TOO_LONG_MESSAGE);
+                }
+                const result = await this.callBackendAPI(emailContent);
+                this.displayResults(result);
             }
 
-            // Simulate API call (replace with actual backend endpoint)
-            const result = await this.callBackendAPI(emailContent);
-            this.displayResults(result);
-
         } catch (error) {
             console.error('Erro na análise:', error);
-            this.showNotification('Erro ao analisar o email. Tente novamente.', 'error');
+            this.showNotification(error.message || 'Erro ao analisar o email. Tente novamente.', 'error');
         } finally {
             this.hideLoading();
         }
@@ -137,24 +182,78 @@ class EmailClassifier {
                 reject(new Error('Erro ao ler arquivo'));
             };
 
-            if (file.type === 'text/plain') {
-                reader.readAsText(file);
-            } else if (file.type === 'application/pdf') {
-                // For PDF files, we'll need to send the file to backend for processing
-                // For now, we'll show a message that PDF processing is handled by backend
-                resolve('PDF_FILE_CONTENT');
-            }
+            reader.readAsText(file);
+        });
+    }
+
+    getApiBaseUrl() {
+        // Determinar a URL base da API baseada no ambiente
+        const isLocalhost = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1';
+        return isLocalhost ? 'http://localhost:5000' : 'https://' + window.location.hostname;
+    }
+
+    postMultipart(path, formData) {
+        // XMLHttpRequest permite acompanhar o progresso do envio (fetch não)
+        return new Promise((resolve, reject) => {
+            const xhr = new XMLHttpRequest();
+            xhr.open('POST', `${this.getApiBaseUrl()}${path}`);
+            xhr.responseType = 'json';
+
+            xhr.upload.onprogress = (e) => {
+                if (e.lengthComputable) {
+                    this.updateProgress(Math.round((e.loaded / e.total) * 100));
+                }
+            };
+            xhr.upload.onload = () => this.updateProgress(100);
+
+            xhr.onload = () => {
+                const result = xhr.response || {};
+                if (xhr.status >= 200 && xhr.status < 300 && result.success) {
+                    resolve(result);
+                } else {
+                    reject(new Error(result.error || `Erro da API: ${xhr.status}`));
+                }
+            };
+            xhr.onerror = () => reject(new Error('Erro de conexão com a API'));
+
+            xhr.send(formData);
         });
     }
 
+    async uploadFile(file) {
+        const formData = new FormData();
+        formData.append('file', file, file.name);
+
+        const result = await this.postMultipart('/api/analyze', formData);
+        return {
+            category: result.category,
+            confidence: result.confidence,
+            response: result.response
+        };
+    }
+
+    async uploadBatch(files) {
+        const formData = new FormData();
+        files.forEach(file => formData.append('files', file, file.name));
+
+        const result = await this.postMultipart('/api/analyze-batch', formData);
+        return result.results.map(item => ({
+            ...item,
+            filename: item.filename || files[item.index].name
+        }));
+    }
+
+    updateProgress(percent) {
+        this.uploadProgress.textContent = percent < 100
+            ? `Enviando arquivo... ${percent}%`
+            : 'Arquivo enviado. Processando...';
+        this.uploadProgress.classList.remove('hidden');
+    }
+
     async callBackendAPI(emailContent) {
         try {
-            // Determinar a URL base da API baseada no ambiente
-            const isLocalhost = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1';
-            const apiBaseUrl = isLocalhost ? 'http://localhost:5000' : 'https://' + window.location.hostname;
-
             // Fazer chamada real para a API
-            const response = await fetch(`${apiBaseUrl}/api/analyze`, {
+            const response = await fetch(`${this.getApiBaseUrl()}/api/analyze`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -171,6 +270,7 @@ class EmailClassifier {
             const result = await response.json();
 
             if (result.success) {
+                this.lastContent = emailContent;
                 return {
                     category: result.category,
                     confidence: result.confidence,
@@ -183,15 +283,6 @@ class EmailClassifier {
         } catch (error) {
             console.error('Erro na chamada da API:', error);
 
-            // Fallback para lógica local se a API falhar
-            if (emailContent === 'PDF_FILE_CONTENT') {
-                return {
-                    category: 'produtivo',
-                    confidence: 0.87,
-                    response: 'Este é um email profissional relacionado ao trabalho. Recomendo responder de forma cordial e objetiva, agradecendo o contato e solicitando mais detalhes se necessário.'
-                };
-            }
-
             // Lógica de classificação local como fallback
             const productiveKeywords = ['reunião', 'projeto', 'trabalho', 'negócio', 'cliente', 'relatório', 'deadline', 'estratégia'];
             const unproductiveKeywords = ['corrente', 'sorte', 'fwd:', 'reencaminhar', 'spam', 'loteria', 'promoção'];
@@ -249,6 +340,15 @@ class EmailClassifier {
             <p class="text-gray-600 mt-2">Email classificado como ${result.category}</p>
         `;
 
+        if (this.lastContent) {
+            const corrected = result.category === 'produtivo' ? 'improdutivo' : 'produtivo';
+            const feedbackBtn = document.createElement('button');
+            feedbackBtn.className = 'mt-3 text-sm text-gray-500 underline hover:text-gray-700';
+            feedbackBtn.textContent = `Classificação errada? Marcar como ${corrected}`;
+            feedbackBtn.addEventListener('click', () => this.sendFeedback(corrected, feedbackBtn));
+            this.categoryResult.appendChild(feedbackBtn);
+        }
+
         // Display confidence
         const confidencePercent = Math.round(result.confidence * 100);
         const confidenceColor = confidencePercent >= 80 ? 'text-green-600' : confidencePercent >= 60 ? 'text-yellow-600' : 'text-red-600';
@@ -261,16 +361,90 @@ class EmailClassifier {
             <p class="text-gray-600">Confiança da classificação</p>
         `;
 
-        // Display AI response
-        this.aiResponse.innerHTML = `
-            <p class="text-gray-800 leading-relaxed">${result.response}</p>
-        `;
+        // Display AI response (texto do servidor: inclui trechos do email, nunca como HTML)
+        const responseText = document.createElement('p');
+        responseText.className = 'text-gray-800 leading-relaxed';
+        responseText.textContent = result.response;
+        this.aiResponse.replaceChildren(responseText);
 
         // Show results
         this.resultsSection.classList.remove('hidden');
         this.resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
 
+    displayBatchResults(results) {
+        const succeeded = results.filter(item => item.success);
+        const productive = succeeded.filter(item => item.category === 'produtivo').length;
+        const unproductive = succeeded.length - productive;
+
+        this.categoryResult.innerHTML = `
+            <div class="text-4xl mb-2">📂</div>
+            <div class="text-2xl font-bold text-green-600">${productive} PRODUTIVO(S)</div>
+            <div class="text-2xl font-bold text-red-600">${unproductive} IMPRODUTIVO(S)</div>
+            <p class="text-gray-600 mt-2">${results.length} arquivos analisados</p>
+        `;
+
+        const averageConfidence = succeeded.length
+            ? succeeded.reduce((total, item) => total + item.confidence, 0) / succeeded.length
+            : 0;
+        const confidencePercent = Math.round(averageConfidence * 100);
+
+        this.confidenceResult.innerHTML = `
+            <div class="text-4xl font-bold text-gray-800 mb-2">${confidencePercent}%</div>
+            <div class="w-full bg-gray-200 rounded-full h-3 mb-2">
+                <div class="bg-gradient-to-r from-green-400 to-blue-500 h-3 rounded-full transition-all duration-1000" style="width: ${confidencePercent}%"></div>
+            </div>
+            <p class="text-gray-600">Confiança média da classificação</p>
+        `;
+
+        // Nomes de arquivo, erros e respostas entram como texto, nunca como HTML
+        this.aiResponse.replaceChildren(...results.map(item => {
+            const paragraph = document.createElement('p');
+            const label = document.createElement('strong');
+            if (!item.success) {
+                paragraph.className = 'text-red-600 mb-3';
+                label.textContent = `${item.filename}:`;
+                paragraph.append(label, ` ${item.error}`);
+            } else {
+                const categoryIcon = item.category === 'produtivo' ? '✅' : '❌';
+                paragraph.className = 'text-gray-800 leading-relaxed mb-3';
+                label.textContent = `${categoryIcon} ${item.filename}:`;
+                paragraph.append(label, ` ${item.response}`);
+            }
+            return paragraph;
+        }));
+
+        this.resultsSection.classList.remove('hidden');
+        this.resultsSection.scrollIntoView({ behavior: 'smooth' });
+    }
+
+    async sendFeedback(category, button) {
+        button.disabled = true;
+        try {
+            const response = await fetch(`${this.getApiBaseUrl()}/api/feedback`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    content: this.lastContent,
+                    category: category
+                })
+            });
+
+            if (!response.ok) {
+                throw new Error(`Erro da API: ${response.status}`);
+            }
+
+            button.remove();
+            this.showNotification('Obrigado! A correção será usada para melhorar a classificação.', 'success');
+        } catch (error) {
+            console.error('Erro ao enviar correção:', error);
+            button.disabled = false;
+            this.showNotification('Erro ao enviar a correção. Tente novamente.', 'error');
+        }
+    }
+
     showLoading() {
         this.loadingSection.classList.remove('hidden');
         this.analyzeBtn.disabled = true;
@@ -279,6 +453,8 @@ class EmailClassifier {
 
     hideLoading() {
         this.loadingSection.classList.add('hidden');
+        this.uploadProgress.classList.add('hidden');
+        this.uploadProgress.textContent = '';
         this.analyzeBtn.disabled = false;
         this.analyzeBtn.classList.remove('opacity-50', 'cursor-not-allowed');
     }
@@ -302,7 +478,7 @@ class EmailClassifier {
     }
 
     resetForm() {
-        this.currentFile = null;
+        this.currentFiles = [];
         this.fileInput.value = '';
         this.fileName.textContent = '';
         this.fileName.className = 'mt-3 text-sm text-gray-500';
@@ -342,12 +518,14 @@ class EmailClassifier {
         notification.innerHTML = `
             <div class="flex items-center">
                 <i class="fas fa-${type === 'success' ? 'check-circle' : type === 'error' ? 'exclamation-circle' : type === 'warning' ? 'exclamation-triangle' : 'info-circle'} mr-3"></i>
-                <span class="font-semibold">${message}</span>
+                <span class="font-semibold"></span>
                 <button class="ml-4 text-white hover:text-gray-200" onclick="this.parentElement.parentElement.remove()">
                     <i class="fas fa-times"></i>
                 </button>
             </div>
         `;
+        // Mensagens podem trazer nomes de arquivo e erros do servidor
+        notification.querySelector('span').textContent = message;
 
         document.body.appendChild(notification);
 
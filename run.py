@@ -7,7 +7,9 @@ Script de inicialização do Email Classifier
 import os
 import sys
 import subprocess
+import time
 import argparse
+import urllib.request
 from pathlib import Path
 
 def check_python_version():
@@ -60,6 +62,7 @@ def setup_nltk_data():
         nltk.download('punkt', quiet=True)
         nltk.download('stopwords', quiet=True)
         nltk.download('wordnet', quiet=True)
+        nltk.download('rslp', quiet=True)
         print("✅ NLTK configurado com sucesso")
         return True
     except Exception as e:
@@ -75,17 +78,59 @@ def create_directories():
     
     print("✅ Diretórios criados")
 
-def start_backend():
+def backend_command(production=False):
+    """Comando para iniciar o backend (servidor de desenvolvimento ou pré-fork)"""
+    return [sys.executable, 'server.py' if production else 'app.py']
+
+def wait_for_backend(process, timeout=60):
+    """Aguardar o backend responder no /health em vez de um tempo fixo"""
+    port = os.getenv('FLASK_PORT', '5000')
+    url = f'http://127.0.0.1:{port}/health'
+    deadline = time.time() + timeout
+    
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    
+    return False
+
+def start_backend(production=False):
     """Iniciar o backend"""
     print("🚀 Iniciando backend...")
+    if production:
+        print(f"🏭 Modo produção: {os.getenv('MAX_WORKERS', 4)} workers com modelos pré-carregados")
     try:
         os.chdir('backend')
-        subprocess.run([sys.executable, 'app.py'])
+        subprocess.run(backend_command(production))
     except KeyboardInterrupt:
         print("\n🛑 Backend interrompido pelo usuário")
     except Exception as e:
         print(f"❌ Erro ao iniciar backend: {e}")
 
+def run_batch(corpus, output, shards=None, processes=None, fmt=None):
+    """Classificar um corpus offline (JSONL/CSV) em shards paralelos, sem HTTP"""
+    print(f"📚 Classificando corpus {corpus}...")
+    command = [sys.executable, 'batch_runner.py', os.path.abspath(corpus), os.path.abspath(output)]
+    if shards:
+        command += ['--shards', str(shards)]
+    if processes:
+        command += ['--processes', str(processes)]
+    if fmt:
+        command += ['--format', fmt]
+    try:
+        result = subprocess.run(command, cwd='backend')
+        return result.returncode == 0
+    except KeyboardInterrupt:
+        print("\n🛑 Processamento interrompido; execute novamente para retomar")
+        return False
+
 def start_frontend():
     """Iniciar o frontend"""
     print("🌐 Iniciando frontend...")
@@ -105,6 +150,16 @@ def main():
     parser.add_argument('--backend', action='store_true', help='Iniciar apenas o backend')
     parser.add_argument('--frontend', action='store_true', help='Iniciar apenas o frontend')
     parser.add_argument('--full', action='store_true', help='Iniciar sistema completo')
+    parser.add_argument('--production', action='store_true',
+                        help='Usar o servidor pré-fork (MAX_WORKERS workers) no backend')
+    parser.add_argument('--batch', metavar='CORPUS',
+                        help='Classificar um corpus .jsonl/.csv offline em shards paralelos')
+    parser.add_argument('--batch-output', metavar='DIR', default='batch_output',
+                        help='Diretório de saída do --batch (reutilize-o para retomar)')
+    parser.add_argument('--shards', type=int, help='Número de shards do --batch')
+    parser.add_argument('--processes', type=int, help='Processos worker do --batch')
+    parser.add_argument('--batch-format', choices=['jsonl', 'parquet', 'feather'],
+                        help='Formato de saída do --batch (parquet/feather para análise colunar)')
     
     args = parser.parse_args()
     
@@ -141,8 +196,11 @@ def main():
     # Configurar NLTK se necessário
     setup_nltk_data()
     
-    if args.backend:
-        start_backend()
+    if args.batch:
+        if not run_batch(args.batch, args.batch_output, args.shards, args.processes, args.batch_format):
+            sys.exit(1)
+    elif args.backend:
+        start_backend(args.production)
     elif args.frontend:
         start_frontend()
     elif args.full:
@@ -153,13 +211,13 @@ def main():
         
         try:
             # Iniciar backend em background
-            backend_process = subprocess.Popen([
-                sys.executable, 'app.py'
-            ], cwd='backend')
+            backend_process = subprocess.Popen(backend_command(args.production), cwd='backend')
             
-            # Aguardar um pouco para o backend inicializar
-            import time
-            time.sleep(3)
+            # Aguardar o backend ficar pronto
+            if not wait_for_backend(backend_process):
+                print("❌ Backend não ficou pronto")
+                backend_process.terminate()
+                sys.exit(1)
             
             # Iniciar frontend
             frontend_process = subprocess.Popen([
@@ -192,6 +250,8 @@ def main():
         print("python run.py --backend     # Iniciar apenas backend")
         print("python run.py --frontend    # Iniciar apenas frontend")
         print("python run.py --full        # Iniciar sistema completo")
+        print("python run.py --backend --production  # Backend com workers pré-fork")
+        print("python run.py --batch emails.jsonl    # Classificar corpus offline em shards")
         print("\n🌐 Após iniciar:")
         print("Backend:  http://localhost:5000")
         print("Frontend: http://localhost:8000")